@@ -438,9 +438,20 @@ class PBSJobService (saga.adaptors.cpi.job.Service):
     # ----------------------------------------------------------------
     #
     def initialize(self):
-        # check if all required pbs tools are available
-        for cmd in self._commands.keys():
-            ret, out, _ = self.shell.run_sync("which %s " % cmd)
+        # check if all required pbs tools are available.  All commands of this
+        # method are pipelined on the shell, to save roundtrips.  'which aprun'
+        # and pbsnodes are evaluated further below.
+        cmds     = self._commands.keys()
+        vcmds    = [cmd for cmd in cmds if cmd != 'qdel']
+        which    = self.shell.run_pipelined(["which %s " % cmd for cmd in cmds] +
+                                            ["which aprun"])
+        version  = self.shell.run_pipelined(["%s --version" % cmd for cmd in vcmds])
+        version  = dict(zip(vcmds, version))
+        pbsnodes = self.shell.run_future('pbsnodes -a | egrep "(np|pcpu)"',
+                                         pipeline=True)
+
+        for cmd, future in zip(cmds, which):
+            ret, out, _ = future.result()
             if ret != 0:
                 message = "Error finding PBS tools: %s" % out
                 log_error_and_raise(message, saga.NoSuccess, self._logger)
@@ -450,25 +461,25 @@ class PBSJobService (saga.adaptors.cpi.job.Service):
                     self._commands[cmd] = {"path":    path,
                                            "version": "?"}
                 else:
-                    ret, out, _ = self.shell.run_sync("%s --version" % cmd)
+                    ret, out, _ = version[cmd].result()
                     if ret != 0:
                         message = "Error finding PBS tools: %s" % out
                         log_error_and_raise(message, saga.NoSuccess,
                             self._logger)
                     else:
                         # version is reported as: "version: x.y.z"
-                        version = out#.strip().split()[1]
+                        version_str = out#.strip().split()[1]
 
                         # add path and version to the command dictionary
                         self._commands[cmd] = {"path":    path,
-                                               "version": version}
+                                               "version": version_str}
 
         self._logger.info("Found PBS tools: %s" % self._commands)
 
         # let's try to figure out if we're working on a Cray XT machine.
         # naively, we assume that if we can find the 'aprun' command in the
         # path that we're logged in to a Cray machine.
-        ret, out, _ = self.shell.run_sync('which aprun')
+        ret, out, _ = which[-1].result()
         if ret != 0:
             self.is_cray = False
         else:
@@ -480,8 +491,7 @@ class PBSJobService (saga.adaptors.cpi.job.Service):
         # different queues, number of processes per node, etc.
         # TODO: this is quite a hack. however, it *seems* to work quite
         #       well in practice.
-        ret, out, _ = self.shell.run_sync('%s -a | egrep "(np|pcpu)"' % \
-            self._commands['pbsnodes']['path'])
+        ret, out, _ = pbsnodes.result()
         if ret != 0:
 
             message = "Error running pbsnodes: %s" % out
@@ -540,17 +550,25 @@ class PBSJobService (saga.adaptors.cpi.job.Service):
         # try to create the working directory (if defined)
         # WRANING: this assumes a shared filesystem between login node and
         #           comnpute nodes.
+        # The mkdir and qsub are pipelined -- qsub checks for the directory, so
+        # that it does not run if mkdir failed.
+        cmdline = """echo "%s" | %s""" % (script, self._commands['qsub']['path'])
+
         if jd.working_directory is not None:
             self._logger.info("Creating working directory %s" % jd.working_directory)
-            ret, out, _ = self.shell.run_sync("mkdir -p %s" % (jd.working_directory))
+            mkdir, qsub = self.shell.run_pipelined(
+                ["mkdir -p %s" % (jd.working_directory),
+                 "test -d %s && %s" % (jd.working_directory, cmdline)])
+            ret, out, _ = mkdir.result()
             if ret != 0:
                 # something went wrong
                 message = "Couldn't create working directory - %s" % (out)
                 log_error_and_raise(message, saga.NoSuccess, self._logger)
+        else:
+            qsub = self.shell.run_future(cmdline)
 
         # run the PBS script
-        cmdline = """echo "%s" | %s""" % (script, self._commands['qsub']['path'])
-        ret, out, _ = self.shell.run_sync(cmdline)
+        ret, out, _ = qsub.result()
 
         if ret != 0:
             # something went wrong
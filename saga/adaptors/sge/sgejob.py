@@ -346,16 +346,22 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
     # ----------------------------------------------------------------
     #
     def initialize(self):
-        # check if all required sge tools are available
-        for cmd in self._commands.keys():
-            ret, out, _ = self.shell.run_sync("which %s " % cmd)
+        # check if all required sge tools are available.  All commands of this
+        # method are pipelined on the shell, to save roundtrips.
+        cmds  = self._commands.keys()
+        which = self.shell.run_pipelined(["which %s " % cmd for cmd in cmds])
+        helps = self.shell.run_pipelined(["%s -help"   % cmd for cmd in cmds])
+        spl   = self.shell.run_future   ("qconf -spl", pipeline=True)
+
+        for cmd, which_future, help_future in zip(cmds, which, helps):
+            ret, out, _ = which_future.result()
             if ret != 0:
                 message = "Error finding SGE tools: %s" % out
                 log_error_and_raise(message, saga.NoSuccess, self._logger)
             else:
                 path = out.strip()  # strip removes newline
 
-                ret, out, _ = self.shell.run_sync("%s -help" % cmd)
+                ret, out, _ = help_future.result()
                 if ret != 0:
                     message = "Error finding SGE tools: %s" % out
                     log_error_and_raise(message, saga.NoSuccess,
@@ -372,8 +378,7 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
         self._logger.info("Found SGE tools: %s" % self._commands)
 
         # determine the available processing elements
-        ret, out, _ = self.shell.run_sync('%s -spl' %
-                      (self._commands['qconf']['path']))
+        ret, out, _ = spl.result()
         if ret != 0:
             message = "Error running 'qconf': %s" % out
             log_error_and_raise(message, saga.NoSuccess, self._logger)
@@ -414,17 +419,25 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
         # try to create the working directory (if defined)
         # WRANING: this assumes a shared filesystem between login node and
         #           comnpute nodes.
+        # The mkdir and qsub are pipelined -- qsub checks for the directory, so
+        # that it does not run if mkdir failed.
+        cmdline = """echo "%s" | %s""" % (script, self._commands['qsub']['path'])
+
         if jd.working_directory is not None:
             self._logger.info("Creating working directory %s" % jd.working_directory)
-            ret, out, _ = self.shell.run_sync("mkdir -p %s" % (jd.working_directory))
+            mkdir, qsub = self.shell.run_pipelined(
+                ["mkdir -p %s" % (jd.working_directory),
+                 "test -d %s && %s" % (jd.working_directory, cmdline)])
+            ret, out, _ = mkdir.result()
             if ret != 0:
                 # something went wrong
                 message = "Couldn't create working directory - %s" % (out)
                 log_error_and_raise(message, saga.NoSuccess, self._logger)
+        else:
+            qsub = self.shell.run_future(cmdline)
 
         # submit the SGE script
-        cmdline = """echo "%s" | %s""" % (script, self._commands['qsub']['path'])
-        ret, out, _ = self.shell.run_sync(cmdline)
+        ret, out, _ = qsub.result()
 
         if ret != 0:
             # something went wrong
@@ -1,8 +1,8 @@
 
 """ shell based file adaptor implementation """
 
-import saga.utils.pty_shell as sups
-import saga.utils.misc      as sumisc
+import saga.utils.pty_shell_pool as supsp
+import saga.utils.misc           as sumisc
 
 import saga.adaptors.base
 import saga.adaptors.cpi.filesystem
@@ -110,6 +110,14 @@ _ADAPTOR_DOC           = {
             instances to the same target host at a time -- they should not
             interfere with each other.
 
+
+          * ``copy (..., flags=saga.filesystem.SYNC)`` between a local and
+            a remote host only transfers files whose checksum differs, and
+            returns a dict with the number of source ``files`` and ``bytes``,
+            the number of files ``transferred``, and the number of bytes
+            ``saved``.  The same numbers are logged at info level.  SYNC
+            copies within a single host raise BadParameter.
+
         """,
     "schemas"          : {"file"   :"use /bin/sh to access local filesystems", 
                           "local"  :"alias for file://", 
@@ -251,7 +259,13 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
         self.cwdurl      = saga.Url (url) # deep copy
         self.cwdurl.path = self.cwd
 
-        self.shell = sups.PTYShell     (self.url, self.session, self._logger)
+        # shells are borrowed from the pool, and returned on finalize.  As we
+        # hold on to them for our whole lifetime, they don't count against the
+        # pool limit.
+        self.pool  = supsp.PTYShellPool ()
+        self.local = None
+        self.shell = self.pool.checkout (self.url, self.session, self._logger,
+                                         limited=False)
 
       # self.shell.set_initialize_hook (self.initialize)
       # self.shell.set_finalize_hook   (self.finalize)
@@ -262,8 +276,8 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
         # to and from local file systems (mkdir for staging target, remove of move
         # source).  Not that we do not perform a cd on the local shell -- all
         # operations are assumed to be performed on absolute paths.
-        self.local = sups.PTYShell ('fork://localhost/', saga.Session(default=True), 
-                                    self._logger)
+        self.local = self.pool.checkout ('fork://localhost/', saga.Session(default=True), 
+                                         self._logger, limited=False)
 
         return self.get_api ()
 
@@ -298,9 +312,13 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
     def finalize (self, kill = False) :
 
         if  kill and self.shell :
-            self.shell.finalize (True)
+            self.pool.checkin (self.shell)
             self.shell = None
 
+        if  kill and self.local :
+            self.pool.checkin (self.local)
+            self.local = None
+
         self.valid = False
 
 
@@ -396,6 +414,7 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
         if sumisc.url_is_relative (src) : src = sumisc.url_make_absolute (cwdurl, src)
         if sumisc.url_is_relative (tgt) : tgt = sumisc.url_make_absolute (cwdurl, tgt)
 
+        stats    = None
         rec_flag = ""
         if flags & saga.filesystem.RECURSIVE : 
             rec_flag  += "-r "
@@ -413,6 +432,12 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
         if  sumisc.url_is_compatible (cwdurl, src) and \
             sumisc.url_is_compatible (cwdurl, tgt) :
 
+            # the checksum sync is only implemented between hosts -- a local
+            # cp does not move data over the wire anyway
+            if  flags & saga.filesystem.SYNC :
+                raise saga.BadParameter ("SYNC copy on a single host is not supported (%s -> %s)" \
+                                      % (src, tgt))
+
             # print "shell cp"
             ret, out, _ = self.shell.run_sync ("cp %s %s %s\n" % (rec_flag, src.path, tgt.path))
             if  ret != 0 :
@@ -434,13 +459,19 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
                    sumisc.url_is_compatible (cwdurl, tgt) :
 
                     # print "from local to remote"
-                    self.shell.stage_to_remote (src.path, tgt.path, rec_flag)
+                    if  flags & saga.filesystem.SYNC :
+                        stats = self.shell.sync_to_remote (src.path, tgt.path, rec_flag)
+                    else :
+                        self.shell.stage_to_remote (src.path, tgt.path, rec_flag)
 
                 elif sumisc.url_is_local (tgt)          and \
                      sumisc.url_is_compatible (cwdurl, src) :
 
                     # print "from remote to loca"
-                    self.shell.stage_from_remote (src.path, tgt.path, rec_flag)
+                    if  flags & saga.filesystem.SYNC :
+                        stats = self.shell.sync_from_remote (src.path, tgt.path, rec_flag)
+                    else :
+                        self.shell.stage_from_remote (src.path, tgt.path, rec_flag)
 
                 else :
                     # print "from remote to other remote -- fail"
@@ -464,8 +495,14 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
                                               % (tgt))
 
                     # print "from local to remote"
-                    tmp_shell = sups.PTYShell (tgt, self.session, self._logger)
-                    tmp_shell.stage_to_remote (src.path, tgt.path, rec_flag)
+                    tmp_shell = self.pool.checkout (tgt, self.session, self._logger)
+                    try :
+                        if  flags & saga.filesystem.SYNC :
+                            stats = tmp_shell.sync_to_remote (src.path, tgt.path, rec_flag)
+                        else :
+                            tmp_shell.stage_to_remote (src.path, tgt.path, rec_flag)
+                    finally :
+                        self.pool.checkin (tmp_shell)
 
                 elif sumisc.url_is_local (tgt) :
 
@@ -475,8 +512,14 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
                                               % (src))
 
                     # print "from remote to local"
-                    tmp_shell = sups.PTYShell (src, self.session, self._logger)
-                    tmp_shell.stage_from_remote (src.path, tgt.path, rec_flag)
+                    tmp_shell = self.pool.checkout (src, self.session, self._logger)
+                    try :
+                        if  flags & saga.filesystem.SYNC :
+                            stats = tmp_shell.sync_from_remote (src.path, tgt.path, rec_flag)
+                        else :
+                            tmp_shell.stage_from_remote (src.path, tgt.path, rec_flag)
+                    finally :
+                        self.pool.checkin (tmp_shell)
 
                 else :
 
@@ -485,6 +528,9 @@ class ShellDirectory (saga.adaptors.cpi.filesystem.Directory) :
                     raise saga.BadParameter ("copy from %s to %s is not supported" \
                                           % (src, tgt))
 
+        # stats of a SYNC copy (see PTYShell.sync_to_remote), None otherwise
+        return stats
+
    
 
 
@@ -815,8 +861,13 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
             self.cwdurl.path = self.cwd
 
 
-        # FIXME: get ssh Master connection from _adaptor dict
-        self.shell = sups.PTYShell (self.url, self.session, self._logger)
+        # shells are borrowed from the pool, and returned on finalize.  As we
+        # hold on to them for our whole lifetime, they don't count against the
+        # pool limit.
+        self.pool  = supsp.PTYShellPool ()
+        self.local = None
+        self.shell = self.pool.checkout (self.url, self.session, self._logger,
+                                         limited=False)
 
       # self.shell.set_initialize_hook (self.initialize)
       # self.shell.set_finalize_hook   (self.finalize)
@@ -828,8 +879,8 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
         # to and from local file systems (mkdir for staging target, remove of move
         # source).  Not that we do not perform a cd on the local shell -- all
         # operations are assumed to be performed on absolute paths.
-        self.local = sups.PTYShell ('fork://localhost/', saga.Session(default=True), 
-                                    self._logger)
+        self.local = self.pool.checkout ('fork://localhost/', saga.Session(default=True), 
+                                         self._logger, limited=False)
 
         return self.get_api ()
 
@@ -882,11 +933,11 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
     def finalize (self, kill = False) :
 
         if  kill and self.shell :
-            self.shell.finalize (True)
+            self.pool.checkin (self.shell)
             self.shell = None
 
         if  kill and self.local :
-            self.local.finalize (True)
+            self.pool.checkin (self.local)
             self.local = None
 
         self.valid = False
@@ -920,6 +971,7 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
         if sumisc.url_is_relative (src) : src = sumisc.url_make_absolute (cwdurl, src)
         if sumisc.url_is_relative (tgt) : tgt = sumisc.url_make_absolute (cwdurl, tgt)
 
+        stats    = None
         rec_flag = ""
         if flags & saga.filesystem.RECURSIVE : 
             rec_flag  += "-r "
@@ -936,6 +988,12 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
         if  sumisc.url_is_compatible (cwdurl, src) and \
             sumisc.url_is_compatible (cwdurl, tgt) :
 
+            # the checksum sync is only implemented between hosts -- a local
+            # cp does not move data over the wire anyway
+            if  flags & saga.filesystem.SYNC :
+                raise saga.BadParameter ("SYNC copy on a single host is not supported (%s -> %s)" \
+                                      % (src, tgt))
+
             # print "shell cp"
             ret, out, _ = self.shell.run_sync ("cp %s %s %s\n" % (rec_flag, src.path, tgt.path))
             if  ret != 0 :
@@ -957,13 +1015,19 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
                    sumisc.url_is_compatible (cwdurl, tgt) :
 
                     # print "from local to remote"
-                    self.shell.stage_to_remote (src.path, tgt.path, rec_flag)
+                    if  flags & saga.filesystem.SYNC :
+                        stats = self.shell.sync_to_remote (src.path, tgt.path, rec_flag)
+                    else :
+                        self.shell.stage_to_remote (src.path, tgt.path, rec_flag)
 
                 elif sumisc.url_is_local (tgt)          and \
                      sumisc.url_is_compatible (cwdurl, src) :
 
                     # print "from remote to loca"
-                    self.shell.stage_from_remote (src.path, tgt.path, rec_flag)
+                    if  flags & saga.filesystem.SYNC :
+                        stats = self.shell.sync_from_remote (src.path, tgt.path, rec_flag)
+                    else :
+                        self.shell.stage_from_remote (src.path, tgt.path, rec_flag)
 
                 else :
                     # print "from remote to other remote -- fail"
@@ -987,8 +1051,14 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
                                               % (tgt))
 
                     # print "from local to remote"
-                    tmp_shell = sups.PTYShell (tgt, self.session, self._logger)
-                    tmp_shell.stage_to_remote (src.path, tgt.path, rec_flag)
+                    tmp_shell = self.pool.checkout (tgt, self.session, self._logger)
+                    try :
+                        if  flags & saga.filesystem.SYNC :
+                            stats = tmp_shell.sync_to_remote (src.path, tgt.path, rec_flag)
+                        else :
+                            tmp_shell.stage_to_remote (src.path, tgt.path, rec_flag)
+                    finally :
+                        self.pool.checkin (tmp_shell)
 
                 elif sumisc.url_is_local (tgt) :
 
@@ -998,8 +1068,14 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
                                               % (src))
 
                     # print "from remote to local"
-                    tmp_shell = sups.PTYShell (src, self.session, self._logger)
-                    tmp_shell.stage_from_remote (src.path, tgt.path, rec_flag)
+                    tmp_shell = self.pool.checkout (src, self.session, self._logger)
+                    try :
+                        if  flags & saga.filesystem.SYNC :
+                            stats = tmp_shell.sync_from_remote (src.path, tgt.path, rec_flag)
+                        else :
+                            tmp_shell.stage_from_remote (src.path, tgt.path, rec_flag)
+                    finally :
+                        self.pool.checkin (tmp_shell)
 
                 else :
 
@@ -1008,6 +1084,9 @@ class ShellFile (saga.adaptors.cpi.filesystem.File) :
                     raise saga.BadParameter ("copy from %s to %s is not supported" \
                                           % (src, tgt))
 
+        # stats of a SYNC copy (see PTYShell.sync_to_remote), None otherwise
+        return stats
+
    
     # ----------------------------------------------------------------
     #
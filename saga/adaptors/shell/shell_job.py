@@ -17,14 +17,25 @@ from   saga.job.constants import *
 import re
 import os
 import time
+import weakref
 import threading
 import subprocess
 
+from   urlparse import parse_qs
+
 import shell_wrapper
 
 SYNC_CALL  = saga.adaptors.cpi.decorators.SYNC_CALL
 ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 
+# the wrapper script appends all job state transitions to this log (relative to
+# $HOME), as 'pid:STATE' lines
+_EVENT_LOG   = ".saga/adaptors/shell_job/events"
+_EVENT_START = "SAGA_EVENTS_START"
+_EVENT_LINE  = re.compile ("^(\d+):(\w+)\s*$")
+
+_FINAL_STATES = [saga.job.DONE, saga.job.FAILED, saga.job.CANCELED]
+
 
 # --------------------------------------------------------------------
 # the adaptor name
@@ -44,7 +55,10 @@ _ADAPTOR_OPTIONS       = [
                           In particular for ssh/gsissh where the number of
                           concurrent connections is limited to 10, this
                           effectively halfs the number of available job service
-                          instances per remote host.''',
+                          instances per remote host.  Job state changes are then
+                          pushed by the remote host: job.wait(), state callbacks
+                          and container waits do not poll the job states
+                          anymore.''',
     'env_variable'     : None
     },
     { 
@@ -59,6 +73,65 @@ _ADAPTOR_OPTIONS       = [
                           suitable jobs, including the ones managed by another,
                           live job service instance.''',
     'env_variable'     : None
+    },
+    { 
+    'category'         : 'saga.adaptor.shell_job',
+    'name'             : 'state_cache_ttl', 
+    'type'             : float, 
+    'default'          : 1.0,
+    'valid_options'    : None,
+    'documentation'    : '''Job states, start/stop times and exit codes are
+                          fetched for all jobs of a job service at once, and are
+                          cached for that many seconds.  Job state queries
+                          within that time are answered from the cache (0
+                          disables caching).''',
+    'env_variable'     : None
+    },
+    { 
+    'category'         : 'saga.adaptor.shell_job',
+    'name'             : 'lean_launch', 
+    'type'             : bool, 
+    'default'          : False,
+    'valid_options'    : [True, False],
+    'documentation'    : '''Start jobs via the lean launch path of the remote
+                          wrapper script: the job monitor is started directly
+                          (one process instead of about a dozen), and the job
+                          startup is not polled.  That speeds up job submission
+                          considerably.  The lean launch needs job control in
+                          the remote shell -- if that is not available, jobs
+                          are started as usual.''',
+    'env_variable'     : None
+    },
+    { 
+    'category'         : 'saga.adaptor.shell_job',
+    'name'             : 'async_submit', 
+    'type'             : bool, 
+    'default'          : False,
+    'valid_options'    : [True, False],
+    'documentation'    : '''Return from job.run() as soon as the job is known to
+                          the remote host, instead of waiting for the job to
+                          actually run.  The job is then PENDING, and the
+                          transition to RUNNING is seen by state queries and
+                          notifications.  This can also be selected per job
+                          service, via the URL query 'submit=async' (or
+                          'submit=sync').''',
+    'env_variable'     : None
+    },
+    { 
+    'category'         : 'saga.adaptor.shell_job',
+    'name'             : 'journal_store', 
+    'type'             : bool, 
+    'default'          : False,
+    'valid_options'    : [True, False],
+    'documentation'    : '''Keep the job states, start/stop times and exit codes
+                          on the remote host in a single job journal, which is
+                          periodically compacted into an index, instead of in
+                          three files per job.  Job state queries, LIST and
+                          PURGE then read a few files, instead of three files
+                          per job.  The job's stdio files remain in per-job
+                          directories.  Note that all job service instances for
+                          the same remote account should use the same setting.''',
+    'env_variable'     : None
     }
 ]
 
@@ -107,6 +180,12 @@ _ADAPTOR_DOC           = {
         Note that custom shells in many cases will find a different environment
         than the users default login shell!
 
+        For high rate job submission, job.run() can return as soon as the job
+        is known to the target host (in PENDING state), instead of waiting for
+        the job to run, via the URL query ``submit=async``::
+
+          js = saga.job.Service ("ssh://remote.host.net/?submit=async")
+
 
         Known Limitations:
         ******************
@@ -238,8 +317,12 @@ class Adaptor (saga.adaptors.base.Base):
         self.id_re = re.compile ('^\[(.*)\]-\[(.*?)\]$')
         self.opts  = self.get_config ()
 
-        self.notifications  = self.opts['enable_notifications'].get_value ()
-        self.purge_on_start = self.opts['purge_on_start'].get_value ()
+        self.notifications   = self.opts['enable_notifications'].get_value ()
+        self.purge_on_start  = self.opts['purge_on_start'].get_value ()
+        self.state_cache_ttl = self.opts['state_cache_ttl'].get_value ()
+        self.lean_launch     = self.opts['lean_launch'].get_value ()
+        self.async_submit    = self.opts['async_submit'].get_value ()
+        self.journal_store   = self.opts['journal_store'].get_value ()
 
 
     # ----------------------------------------------------------------
@@ -270,7 +353,9 @@ class Adaptor (saga.adaptors.base.Base):
 
         state_str = state_str.strip ()
 
-        if state_str.lower () == 'new'       : return saga.job.NEW
+        # jobs known to the wrapper are submitted -- before they run, they are
+        # pending
+        if state_str.lower () == 'new'       : return saga.job.PENDING
         if state_str.lower () == 'running'   : return saga.job.RUNNING
         if state_str.lower () == 'suspended' : return saga.job.SUSPENDED
         if state_str.lower () == 'done'      : return saga.job.DONE
@@ -280,6 +365,94 @@ class Adaptor (saga.adaptors.base.Base):
         return saga.job.UNKNOWN
 
 
+###############################################################################
+#
+class _job_state_notifier (threading.Thread) :
+    """
+    Follows the wrapper's job state event log over a dedicated shell, and
+    forwards all state transitions to the job service (see
+    :func:`ShellJobService._job_notify`).  Thus, job states need not be
+    polled while notifications are enabled.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self, js) :
+
+        # the notifier must not keep the job service alive
+        self._js    = weakref.ref (js)
+        self.logger = js._logger
+        self._stop  = threading.Event ()
+
+        super (_job_state_notifier, self).__init__ (name='ShellJobService.notifier')
+        self.setDaemon (True)
+
+        # we only hand out events which are logged after this point -- earlier
+        # states are fetched on demand.  The wrapper rotates the event log, so
+        # we follow it by name ('-F')
+        self.shell = saga.utils.pty_shell.PTYShell (js.rm, js.session,
+                                                    js._logger, opts=js.opts)
+        self.shell.run_async ("cd ; touch %s && size=`wc -c < %s` && echo %s && " \
+                              "exec tail -c +$(($size + 1)) -F %s 2>/dev/null" \
+                           % (_EVENT_LOG, _EVENT_LOG, _EVENT_START, _EVENT_LOG))
+
+        n, match = self.shell.find (["%s\n" % _EVENT_START, self.shell.prompt], 10.0)
+        if  n != 0 :
+            self.shell.finalize (True)
+            raise saga.NoSuccess ("cannot follow job events (%s)" % match)
+
+
+    # ----------------------------------------------------------------
+    #
+    def stop (self) :
+
+        self._stop.set ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def stopped (self) :
+
+        return self._stop.isSet ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def run (self) :
+
+        try :
+            while not self.stopped () :
+
+                n, line = self.shell.find (["\n"], 1.0)
+
+                js = self._js ()
+                if  not js :
+                    break
+
+                if  n is None :
+                    # timeout -- just check for stop
+                    continue
+
+                match = _EVENT_LINE.match (line.strip ())
+                if  match :
+                    js._job_notify (match.group (1), match.group (2))
+
+                js = None
+
+        except Exception as e :
+            if  not self.stopped () :
+                self.logger.warning ("job state notifications failed, fall back to "
+                                     "polling: %s" % e)
+
+        finally :
+            self._stop.set ()
+            self.shell.finalize (True)
+
+            js = self._js ()
+            if  js :
+                js._job_notify (None, None)
+
+
 ###############################################################################
 #
 class ShellJobService (saga.adaptors.cpi.job.Service) :
@@ -333,17 +506,51 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
         if  self.rm.path and self.rm.path != '/' and self.rm.path != '.' :
             self.opts['shell'] = self.rm.path
 
+        # this adaptor supports options that can be passed via the 'query'
+        # component of the job service URL.
+        self.submit = 'sync'
+        if  self._adaptor.async_submit :
+            self.submit = 'async'
+
+        if  self.rm.query :
+            for key, val in parse_qs (self.rm.query).iteritems () :
+                if  key == 'submit' :
+                    self.submit = val[0]
+
+        if  self.submit not in ['sync', 'async'] :
+            raise saga.BadParameter ("invalid submit mode '%s' (use sync or async)" \
+                                  % self.submit)
+
         self.shell = saga.utils.pty_shell.PTYShell (self.rm, self.session, 
                                                     self._logger, opts=self.opts)
 
+        # job state notifications: latest notified state per job pid, and the
+        # job instances to forward notifications to
+        self.notifier = None
+        self._events  = dict ()
+        self._jobs    = weakref.WeakValueDictionary ()
+        self._ev_cond = threading.Condition ()
+
+        # job state cache: (state, start, stop, exit code) per job pid, as
+        # fetched by the last SNAPSHOT
+        self._snapshot      = dict ()
+        self._snapshot_time = 0.0
+        self._snapshot_lock = threading.RLock ()
+
         self.initialize ()
 
+        if  self._adaptor.notifications :
+            self.notifier = _job_state_notifier (self)
+            self.notifier.start ()
+
         return self.get_api ()
 
 
     # ----------------------------------------------------------------
     #
     def close (self) :
+        if  self.notifier :
+            self.notifier.stop ()
         if  self.shell :
             self.shell.finalize (True)
 
@@ -394,8 +601,16 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
         # Well, actually, we do not use exec, as that does not give us good
         # feedback on failures (the shell just quits) -- so we replace it with
         # this poor-man's version...
-        self.shell.run_async ("/bin/sh -c '/bin/sh %s/wrapper.sh $$ && kill -9 $PPID' || false" \
-                           % (base))
+        launch = 'classic'
+        if  self._adaptor.lean_launch :
+            launch = 'lean'
+
+        store = 'files'
+        if  self._adaptor.journal_store :
+            store = 'journal'
+
+        self.shell.run_async ("/bin/sh -c '/bin/sh %s/wrapper.sh $$ %s %s %s && kill -9 $PPID' || false" \
+                           % (base, launch, self.submit, store))
 
         # shell_wrapper.sh will report its own PID -- we use that to sync prompt
         # detection, too.  Wait for 1sec max.
@@ -415,6 +630,9 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
     #
     def finalize (self, kill_shell = False) :
 
+        if  self.notifier :
+            self.notifier.stop ()
+
         if  kill_shell :
             if  self.shell :
                 self.shell.run_async ("QUIT")
@@ -463,9 +681,58 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
     def _job_run (self, jd) :
         """ runs a job on the wrapper via pty, and returns the job id """
 
+        cmd, run_cmd, use_lrun = self._job_run_cmd (jd)
+
+        job_id = self._job_run_eval (cmd, self.shell.run_sync (run_cmd))
+
+        # before we return, we need to clean the 'BULK COMPLETED message from lrun
+        if use_lrun :
+            ret, out = self.shell.find_prompt ()
+            if  ret != 0 :
+                raise saga.NoSuccess ("failed to run multiline job '%s': (%s)(%s)" % (run_cmd, ret, out))
+
+
+        return job_id
+        
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def _job_run_future (self, jd) :
+        """ 
+        non-blocking version of :func:`_job_run`: returns
+        a :class:`saga.utils.pty_shell.PTYFuture` for the job id 
+        """
+
+        cmd, run_cmd, use_lrun = self._job_run_cmd (jd)
+
+        job_id = self.shell.run_future (run_cmd).then (
+                     lambda result : self._job_run_eval (cmd, result))
+
+        if  not use_lrun :
+            return job_id
+
+        # the 'BULK COMPLETED' message from lrun comes with another prompt,
+        # which we consume right away.  That completes after the run command,
+        # so job_id is done by then.
+        def _bulk_eval (result) :
+            ret, out, _ = result
+            if  ret != 0 :
+                raise saga.NoSuccess ("failed to run multiline job '%s': (%s)(%s)" % (run_cmd, ret, out))
+            return job_id.result ()
+
+        return self.shell.run_future (None).then (_bulk_eval)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_run_cmd (self, jd) :
+        """ 
+        returns the job command for jd, the wrapper command to run it, and
+        a flag if that is an LRUN command 
+        """
+
         cmd = self._jd2cmd (jd)
-        ret = 1
-        out = ""
 
         run_cmd  = ""
         use_lrun = False
@@ -479,7 +746,19 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         run_cmd = run_cmd.replace ("\\", "\\\\\\\\") # hello MacOS
 
-        ret, out, _ = self.shell.run_sync (run_cmd)
+        return (cmd, run_cmd, use_lrun)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_run_eval (self, cmd, result) :
+        """ 
+        evaluates the (ret, out, err) result of a RUN/LRUN on the wrapper, and
+        returns the job id 
+        """
+
+        ret, out, _ = result
+
         if  ret != 0 :
             raise saga.NoSuccess ("failed to run Job '%s': (%s)(%s)" % (cmd, ret, out))
 
@@ -503,13 +782,6 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         self.njobs += 1
 
-        # before we return, we need to clean the 'BULK COMPLETED message from lrun
-        if use_lrun :
-            ret, out = self.shell.find_prompt ()
-            if  ret != 0 :
-                raise saga.NoSuccess ("failed to run multiline job '%s': (%s)(%s)" % (run_cmd, ret, out))
-
-
         return job_id
         
 
@@ -519,8 +791,35 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
     def _job_get_stats (self, id) :
         """ get the job stats from the wrapper shell """
 
-        rm, pid     = self._adaptor.parse_id (id)
-        ret, out, _ = self.shell.run_sync ("STATS %s\n" % pid)
+        rm, pid = self._adaptor.parse_id (id)
+
+        return self._job_get_stats_eval (id, self.shell.run_sync ("STATS %s\n" % pid))
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def _job_get_stats_future (self, id) :
+        """ 
+        non-blocking version of :func:`_job_get_stats`: returns
+        a :class:`saga.utils.pty_shell.PTYFuture` for the job stats 
+        """
+
+        rm, pid = self._adaptor.parse_id (id)
+        future  = self.shell.run_future ("STATS %s\n" % pid)
+
+        return future.then (lambda result : self._job_get_stats_eval (id, result))
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_get_stats_eval (self, id, result) :
+        """ 
+        evaluates the (ret, out, err) result of STATS on the wrapper, and
+        returns the job stats 
+        """
+
+        ret, out, _ = result
 
         if  ret != 0 :
             raise saga.NoSuccess ("failed to get job stats for '%s': (%s)(%s)" \
@@ -544,6 +843,187 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         
 
+    # ----------------------------------------------------------------
+    #
+    def _job_snapshot (self, pids=None) :
+        """
+        Fetch state, start/stop time and exit code for the given job pids
+        (for all jobs if None) from the wrapper, in a single round trip, and
+        store them in the state cache.  Returns a dict with a (state, start,
+        stop, exit code) tuple per job pid -- unknown values are None.
+        """
+
+        # the command line must not exceed the tty line limit -- otherwise we
+        # rather fetch all jobs and filter
+        args = ""
+        if  pids :
+            args = " ".join (pids)
+            if  len (args) > 1000 :
+                args = ""
+
+        now = time.time ()
+        ret, out, _ = self.shell.run_sync ("SNAPSHOT %s\n" % args)
+
+        if  ret != 0 :
+            raise saga.NoSuccess ("failed to get job states: (%s)(%s)" % (ret, out))
+
+        lines = filter (None, out.split ("\n"))
+
+        if  not lines or lines[0] != "OK" :
+            raise saga.NoSuccess ("failed to get job states (%s)" % lines)
+
+        snapshot = dict ()
+
+        for line in lines[1:] :
+
+            elems = line.split ()
+            if  len (elems) != 5 :
+                self._logger.warning ("ignore invalid job state (%s)" % line)
+                continue
+
+            pid, state, start, stop, exit_code = [[e, None][e == '-'] for e in elems]
+
+            if  pids and not pid in pids :
+                continue
+
+            if  state     : state     = self._adaptor.string_to_state (state)
+            if  start     : start     = float (start)
+            if  stop      : stop      = float (stop)
+            if  exit_code : exit_code = int   (exit_code)
+
+            snapshot[pid] = (state, start, stop, exit_code)
+
+        with self._snapshot_lock :
+
+            # a full snapshot also drops jobs which disappeared
+            if  not args :
+                self._snapshot.clear ()
+
+            self._snapshot.update (snapshot)
+            self._snapshot_time = now
+
+        return snapshot
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_get_cached (self, id) :
+        """
+        Return the cached (state, start, stop, exit code) tuple for a job.  If
+        the cache is older than ``state_cache_ttl`` seconds, or does not know
+        the job, it is refreshed first -- for all jobs of this service at
+        once.  Returns None for jobs the wrapper does not know.
+        """
+
+        rm, pid = self._adaptor.parse_id (id)
+        ttl     = self._adaptor.state_cache_ttl
+
+        with self._snapshot_lock :
+
+            if  pid in self._snapshot and \
+                time.time () - self._snapshot_time < ttl :
+                return self._snapshot[pid]
+
+            pids = list (set (self._jobs.keys () + [pid]))
+
+            return self._job_snapshot (pids).get (pid)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_register (self, job) :
+        """ forward state notifications for this job to the job instance """
+
+        rm, pid = self._adaptor.parse_id (job._id)
+        self._jobs[pid] = job
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_notify (self, pid, state_str) :
+        """
+        called by the notifier for every job state transition (and with
+        ``None`` arguments when the notifier dies), and by the job operations
+        which change the job state.
+        """
+
+        with self._ev_cond :
+
+            if  pid is not None :
+                state = self._adaptor.string_to_state (state_str)
+                self._events[pid] = state
+
+            self._ev_cond.notify_all ()
+
+        if  pid is not None :
+            with self._snapshot_lock :
+                if  pid in self._snapshot :
+                    self._snapshot[pid] = (state,) + self._snapshot[pid][1:]
+
+        if  pid is not None :
+            job = self._jobs.get (pid)
+            if  job :
+                job._notify_state (state)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_get_notified_state (self, id, state=None) :
+        """
+        Return the last notified state of a job, or None if no notification
+        was received (or notifications are disabled).  If a state is given
+        (fetched from the wrapper), it is recorded unless a notification is
+        already known -- notifications are never older than fetched states.
+        """
+
+        if  not self.notifier or self.notifier.stopped () :
+            return None
+
+        rm, pid = self._adaptor.parse_id (id)
+
+        with self._ev_cond :
+
+            if  state is not None :
+                self._events.setdefault (pid, state)
+
+            return self._events.get (pid)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _job_wait_notified (self, ids, mode, timeout) :
+        """
+        Wait for state notifications until all jobs (or any of them, for
+        mode ANY) reached a final state.  Returns False on timeout, and None
+        if notifications are not available, so that the caller needs to fall
+        back to polling.  All jobs must have a known state (see
+        :func:`_job_get_notified_state`).
+        """
+
+        pids  = [self._adaptor.parse_id (id)[1] for id in ids]
+        start = time.time ()
+        left  = None
+
+        with self._ev_cond :
+
+            while True :
+
+                if  not self.notifier or self.notifier.stopped () :
+                    return None
+
+                final = [self._events.get (pid) in _FINAL_STATES for pid in pids]
+
+                if  (mode == saga.ANY and True in final) or not False in final :
+                    return True
+
+                if  timeout >= 0 :
+                    left = start + timeout - time.time ()
+                    if  left <= 0 :
+                        return False
+
+                self._ev_cond.wait (left)
+
+
     # ----------------------------------------------------------------
     #
     # TODO: this should also fetch the (final) state, to safe a hop
@@ -581,8 +1061,6 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
     # ----------------------------------------------------------------
     #
-    # TODO: this should also cache state
-    #
     def _job_suspend (self, id) :
 
         rm, pid = self._adaptor.parse_id (id)
@@ -592,11 +1070,11 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
             raise saga.NoSuccess ("failed to suspend job '%s': (%s)(%s)" \
                                % (id, ret, out))
 
+        self._job_notify (pid, "SUSPENDED")
+
 
     # ----------------------------------------------------------------
     #
-    # TODO: this should also cache state
-    #
     def _job_resume (self, id) :
 
         rm, pid = self._adaptor.parse_id (id)
@@ -606,6 +1084,8 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
             raise saga.NoSuccess ("failed to resume job '%s': (%s)(%s)" \
                                % (id, ret, out))
 
+        self._job_notify (pid, "RUNNING")
+
 
     # ----------------------------------------------------------------
     #
@@ -633,6 +1113,8 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
         if lines[0] != "OK" :
             raise saga.NoSuccess ("failed to cancel job '%s' (%s)" % (id, lines))
 
+        self._job_notify (pid, "CANCELED")
+
 
 
     # ----------------------------------------------------------------
@@ -794,6 +1276,7 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
             # But, actually, the container sorter should have done that already?
             # Check!
             job._adaptor._id = job_id
+            self._job_register (job._adaptor)
 
         # we also need to find the output of the bulk op itself
         ret, out = self.shell.find_prompt ()
@@ -820,6 +1303,15 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         self._logger.debug ("container wait: %s"  %  str(jobs))
 
+        # with notifications, we only need to know the initial job states
+        if  self.notifier and not self.notifier.stopped () :
+
+            for job in jobs :
+                job._adaptor.get_state ()
+
+            if  self._job_wait_notified ([job.id for job in jobs], mode, timeout) is not None :
+                return
+
         bulk = "BULK\n"
 
         for job in jobs :
@@ -930,60 +1422,23 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         self._logger.debug ("container get_state: %s"  %  str(jobs))
 
-        bulk   = "BULK\n"
-        states = []
+        # one snapshot for all jobs
+        pids     = [self._adaptor.parse_id (job.id)[1] for job in jobs]
+        snapshot = self._job_snapshot (pids)
+        states   = []
 
-        for job in jobs :
-            rm, pid = self._adaptor.parse_id (job.id)
-            bulk   += "STATE %s\n" % pid
+        for job, pid in zip (jobs, pids) :
 
-        bulk += "BULK_RUN\n"
-        self.shell.run_async (bulk)
-
-        for job in jobs :
-
-            ret, out = self.shell.find_prompt ()
-
-            if  ret != 0 :
+            if  not pid in snapshot or not snapshot[pid][0] :
                 job._adaptor._state     = saga.job.FAILED
-                job._adaptor._exception = saga.NoSuccess ("failed to get job state: (%s)(%s)" % (ret, out))
+                job._adaptor._exception = saga.NoSuccess ("failed to get job state (%s)" % job.id)
                 continue
 
-            lines = filter (None, out.split ("\n"))
-
-            if  len (lines) < 2 :
-                job._adaptor._state     = saga.job.FAILED
-                job._adaptor._exception = saga.NoSuccess ("failed to get job state : (%s)(%s)" % (ret, out))
-                continue
-
-            if lines[-2] != "OK" :
-                job._adaptor._state     = saga.job.FAILED
-                job._adaptor._exception = saga.NoSuccess ("failed to get job state : (%s)(%s)" % (ret, out))
-                continue
-
-            state = self._adaptor.string_to_state (lines[-1])
+            state = snapshot[pid][0]
 
             job._adaptor._state = state
             states.append (state)
 
-
-        # we also need to find the output of the bulk op itself
-        ret, out = self.shell.find_prompt ()
-
-        if  ret != 0 :
-            self._logger.error ("failed to get state for (parts of the) bulk jobs: (%s)(%s)" % (ret, out))
-            return
-
-        lines = filter (None, out.split ("\n"))
-
-        if  len (lines) < 2 :
-            self._logger.error ("Cannot evaluate status of bulk job get_state: (%s)(%s)" % (ret, out))
-            return
-
-        if lines[-2] != "OK" :
-            self._logger.error ("failed to get state for (parts of the) bulk jobs: (%s)(%s)" % (ret, out))
-            return
-
         return states
 
 
@@ -1037,6 +1492,8 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
             self._started         = None
             self._finished        = None
 
+            self.js._job_register (self)
+
         else :
             # don't know what to do...
             raise saga.BadParameter ("Cannot create job, insufficient information")
@@ -1069,25 +1526,72 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
             self._state == saga.job.CANCELED     :
                 return self._state
 
-        stats = self.js._job_get_stats (self._id)
+        # no need to fetch notified states
+        state = self.js._job_get_notified_state (self._id)
+        if  state :
+            self._notify_state (state)
+            return self._state
 
-        if 'start' in stats : self._started  = stats['start']
-        if 'stop'  in stats : self._finished = stats['stop']
+        return self._refresh_state ()
 
-        if self._started  : self._started  = float(self._started)
-        if self._finished : self._finished = float(self._finished)
-        
-        if  not 'state' in stats :
-            raise saga.NoSuccess ("failed to get job state for '%s': (%s)" \
-                               % (self._id, stats))
 
-        self._state = self._adaptor.string_to_state (stats['state'])
+    # ----------------------------------------------------------------
+    #
+    def _refresh_state (self) :
+        """ fetch state and stats from the wrapper (via the state cache) """
+
+        info = self.js._job_get_cached (self._id)
+
+        if  info and info[0] :
+            state, started, finished, exit_code = info
+
+            if started  : self._started  = started
+            if finished : self._finished = finished
+
+            if  state in _FINAL_STATES and exit_code is not None :
+                self._exit_code = exit_code
+
+            self._state = state
+
+        else :
+            # the job is not in the snapshot -- STATS will tell us why
+            stats = self.js._job_get_stats (self._id)
+
+            if 'start' in stats : self._started  = stats['start']
+            if 'stop'  in stats : self._finished = stats['stop']
+
+            if self._started  : self._started  = float(self._started)
+            if self._finished : self._finished = float(self._finished)
+            
+            if  not 'state' in stats :
+                raise saga.NoSuccess ("failed to get job state for '%s': (%s)" \
+                                   % (self._id, stats))
+
+            self._state = self._adaptor.string_to_state (stats['state'])
 
         self._api ()._attributes_i_set ('state', self._state, self._api ()._UP)
+
+        # keep notifications in sync
+        self.js._job_get_notified_state (self._id, self._state)
         
         return self._state
 
 
+    # ----------------------------------------------------------------
+    #
+    def _notify_state (self, state) :
+        """ a state notification arrived for this job """
+
+        if  state == self._state :
+            return
+
+        self._state = state
+
+        api = self._api ()
+        if  api :
+            api._attributes_i_set ('state', self._state, api._UP)
+
+
     # ----------------------------------------------------------------
     #
     @SYNC_CALL
@@ -1102,7 +1606,8 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
     @SYNC_CALL
     def get_started (self) : 
 
-        self.get_state () # refresh stats
+        if  self._started is None :
+            self._refresh_state () # refresh stats
         return self._started
 
 
@@ -1111,7 +1616,8 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
     @SYNC_CALL
     def get_finished (self) : 
 
-        self.get_state () # refresh stats
+        if  self._finished is None :
+            self._refresh_state () # refresh stats
         return self._finished
 
 
@@ -1129,7 +1635,6 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
     # ----------------------------------------------------------------
     #
     # TODO: this should also fetch the (final) state, to safe a hop
-    # TODO: implement via notifications
     #
     @SYNC_CALL
     def wait (self, timeout):
@@ -1138,14 +1643,23 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
         other interactions.  In particular, it would practically kill it if the
         Wait waits forever...
 
-        So we implement the wait via a state pull.  The *real* solution is, of
-        course, to implement state notifications, and wait for such
-        a notification to arrive within timeout seconds...
+        So we wait for state notifications to arrive within timeout seconds (if
+        notifications are enabled), and implement the wait via a state pull
+        otherwise.
         """
 
         time_start = time.time ()
         time_now   = time_start
 
+        state = self.get_state ()
+
+        if  state in _FINAL_STATES :
+            return True
+
+        ret = self.js._job_wait_notified ([self._id], saga.ALL, timeout)
+        if  ret is not None :
+            return ret
+
         while True :
 
             state = self.get_state ()
@@ -1178,6 +1692,12 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
     def get_exit_code (self) :
         """ Implements saga.adaptors.cpi.job.Job.get_exit_code() """
 
+        if self._exit_code != None :
+            return self._exit_code
+
+        # final states come with exit codes
+        self._refresh_state ()
+
         if self._exit_code != None :
             return self._exit_code
 
@@ -1201,6 +1721,7 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
     @SYNC_CALL
     def run (self): 
         self._id = self.js._job_run (self.jd)
+        self.js._job_register (self)
 
 
     # ----------------------------------------------------------------
@@ -2,7 +2,7 @@
 """ shell based resource adaptor implementation """
 
 import saga.utils.which
-import saga.utils.pty_shell
+import saga.utils.pty_shell_pool
 
 import saga.adaptors.cpi.base
 import saga.adaptors.cpi.resource
@@ -156,17 +156,20 @@ class ShellResourceManager (saga.adaptors.cpi.resource.Manager) :
         self.access[STORAGE] = []
         self.access[ANY]     = []
 
+        pool = saga.utils.pty_shell_pool.PTYShellPool ()
+
         # check for compute entry points
         for schema in ['fork', 'ssh', 'gsissh'] :
             tmp_url = saga.Url (self.url)  # deep copy
             tmp_url.schema = schema
 
-            shell = saga.utils.pty_shell.PTYShell (tmp_url, self.session, self._logger)
+            shell = pool.checkout (tmp_url, self.session, self._logger)
 
             if  shell.alive () :
                 self.access[COMPUTE].append (tmp_url)
                 self.access[ANY]    .append (tmp_url)
-                shell.finalize (True)
+
+            pool.checkin (shell)
 
 
         # check for storage entry points
@@ -174,12 +177,13 @@ class ShellResourceManager (saga.adaptors.cpi.resource.Manager) :
             tmp_url = saga.Url (self.url)  # deep copy
             tmp_url.schema = schema
 
-            shell = saga.utils.pty_shell.PTYShell (tmp_url, self.session, self._logger)
+            shell = pool.checkout (tmp_url, self.session, self._logger)
 
             if  shell.alive () :
                 self.access[STORAGE].append (tmp_url)
                 self.access[ANY]    .append (tmp_url)
-                shell.finalize (True)
+
+            pool.checkin (shell)
 
 
     # ----------------------------------------------------------------
@@ -27,6 +27,12 @@ RETVAL=""
 # this is where this 'daemon' keeps state for all started jobs
 BASE=$HOME/.saga/adaptors/shell_job/
 
+# all job state transitions are appended to this event log, as 'pid:STATE'
+# lines -- clients can follow it (tail -F) instead of polling job states.  The
+# log is rotated once it grows beyond EVENTS_MAX bytes (see events_rotate).
+EVENTS="$BASE/events"
+EVENTS_MAX=1048576
+
 # this process will terminate when idle for longer than TIMEOUT seconds
 TIMEOUT=30
 
@@ -35,6 +41,22 @@ TIMESTAMP=0
 
 PURGE_ON_START="%(PURGE_ON_START)s"
 
+# job launch mode, as second argument: 'classic' or 'lean' (see cmd_run).  Lean
+# launches sync with the job monitors over this fifo, which is kept open on fd 3.
+LAUNCH="$2"
+LAUNCH_FIFO="$BASE/launch.$$"
+
+# job submission mode, as third argument: 'sync' (RUN returns when the job is
+# RUNNING) or 'async' (RUN returns as soon as the job directory exists, in NEW
+# state)
+SUBMIT="$3"
+
+# job state store, as fourth argument: 'files' (state, stats and exit files in
+# each job directory) or 'journal' (all job state records are appended to this
+# journal, which is periodically compacted into an index -- see journal_table)
+STORE="$4"
+JOURNAL="$BASE/journal"
+
 # --------------------------------------------------------------------
 #
 # idle_checker is running in the background, and will terminate the wrapper
@@ -74,6 +96,13 @@ idle_checker () {
     fi
 
     \touch "$BASE/idle.$ppid"
+
+    if test "$STORE" = "journal" && test -s "$JOURNAL"
+    then
+      journal_compact
+    fi
+
+    events_rotate
   done
 }
 
@@ -88,6 +117,127 @@ timestamp () {
 }
 
 
+# --------------------------------------------------------------------
+# record a state transition (job id, state) in the job's state file (or in the
+# journal), and in the event log.  An optional third argument is the job's
+# start time, which is recorded in the job's stats file (or in the journal).
+set_state () {
+  if test "$STORE" = "journal"
+  then
+    \printf "$1 $2 ${3:--} - -\n" >> "$JOURNAL"
+  else
+    test -z "$3" || \printf "START : $3\n" > "$BASE/$1/stats"
+    \printf "$2 \n"   >> "$BASE/$1/state"
+  fi
+  \printf "$1:$2\n" >> "$EVENTS"
+}
+
+
+# --------------------------------------------------------------------
+# move the event log aside once it exceeds EVENTS_MAX bytes (the previous
+# generation is dropped).  Writers append by name, so all new events go into
+# a fresh log, and clients follow the log by name (tail -F).  Events are only
+# a notification channel -- job states are always available from the state
+# store, so rotation loses no state.
+events_rotate () {
+  if test -f "$EVENTS" && test `\wc -c < "$EVENTS"` -gt $EVENTS_MAX
+  then
+    \mv -f "$EVENTS" "$EVENTS.1"
+  fi
+}
+
+
+# --------------------------------------------------------------------
+# get the current state of a job into JOB_STATE (empty if unknown).  For the
+# journal store, JOB_INFO holds the job's full record (see journal_table).
+job_state () {
+  if test "$STORE" = "journal"
+  then
+    JOB_INFO=`journal_table $1`
+    set -- $JOB_INFO
+    JOB_STATE=$2
+  else
+    JOB_STATE=`\grep -e ' $' "$BASE/$1/state" | \tail -n 1 | \tr -d ' '`
+  fi
+}
+
+
+# --------------------------------------------------------------------
+#
+# print the current records of the given jobs (all jobs by default) from the
+# job journal, as one line per job: pid, state, start time, stop time and exit
+# code, with '-' for unknown values (like snapshot_table).  Journal records have
+# the same format, and only set the fields which are not '-' -- a NEW record
+# starts a new job (pids get reused), a PURGED record removes the job.
+#
+# The journal is read after the index (the compacted journal) and any journal
+# segments (sealed by journal_compact), so that later records win.
+#
+journal_table () {
+  \cat "$JOURNAL.index" "$JOURNAL".[0-9]* "$JOURNAL" 2>/dev/null | \awk -v pids="$*" '
+    BEGIN { n = split (pids, p, " ") ; for (i = 1; i <= n; i++) want[p[i]] = 1 }
+    n && ! ($1 in want) { next }
+    $2 == "NEW" || $2 == "PURGED" { for (i = 3; i <= 5; i++) delete rec[$1, i] }
+    {
+      jobs[$1] = 1
+      for (i = 2; i <= 5; i++) if ($i != "-") rec[$1, i] = $i
+    }
+    END {
+      for (pid in jobs) {
+        if (rec[pid, 2] == "PURGED") continue
+        line = pid
+        for (i = 2; i <= 5; i++) line = line " " (((pid, i) in rec) ? rec[pid, i] : "-")
+        print line
+      }
+    }'
+}
+
+
+# --------------------------------------------------------------------
+#
+# compact the job journal into the index.  The journal is first sealed as
+# a segment (new records then go to a new journal), and is then merged into the
+# index, together with older segments -- those are removed afterwards.  The
+# last segment is kept 'til the next compaction, so that no records get lost
+# for readers and writers which still see the old journal.  Purged jobs are
+# dropped from the index.  A lock dir makes sure that only one process compacts
+# at any time.
+#
+journal_compact () {
+
+  if ! \mkdir "$JOURNAL.lock" 2>/dev/null
+  then
+    # remove the lock if its owner died
+    LOCK_PID=`\cat "$JOURNAL.lock/pid" 2>/dev/null`
+    if ! test -z "$LOCK_PID" && ! /bin/kill -0 "$LOCK_PID" 2>/dev/null
+    then
+      \rm -rf "$JOURNAL.lock"
+    fi
+    return
+  fi
+  \printf "$$\n" > "$JOURNAL.lock/pid"
+
+  OLD_SEGMENTS=""
+  for f in "$JOURNAL".[0-9]*
+  do
+    test -f "$f" && OLD_SEGMENTS="$OLD_SEGMENTS $f"
+  done
+
+  timestamp
+  test -s "$JOURNAL" && \mv "$JOURNAL" "$JOURNAL.$TIMESTAMP.$$"
+
+  if journal_table > "$JOURNAL.index.$$"
+  then
+    \mv -f "$JOURNAL.index.$$" "$JOURNAL.index"
+    test -z "$OLD_SEGMENTS" || \rm -f $OLD_SEGMENTS
+  else
+    \rm -f "$JOURNAL.index.$$"
+  fi
+
+  \rm -rf "$JOURNAL.lock"
+}
+
+
 # --------------------------------------------------------------------
 # ensure that a given job id points to a viable working directory
 verify_dir () {
@@ -100,16 +250,35 @@ verify_dir () {
 # --------------------------------------------------------------------
 # ensure that given job id has valid pid file
 verify_pid () {
-  verify_dir $1
+  verify_dir $1 || return 1
+
+  # asynchronously submitted jobs may still be starting up: the monitor writes
+  # the pid file right after spawning the job.  Wait for it in 0.1 second steps
+  # (1 second steps if sleep does not support fractions), for 5 seconds max.
+  n=0
+  while ! test -r "$DIR/rpid" && test $n -lt 50
+  do
+    \sleep 0.1 2>/dev/null || { \sleep 1; n=$((n+9)); }
+    n=$((n+1))
+  done
+
   if ! test -r "$DIR/rpid";  then ERROR="pid $1 has no process id"; return 1; fi
 }
 
 
 # --------------------------------------------------------------------
 # ensure that given job id has valid state file
+# (the state is then available as JOB_STATE)
 verify_state () {
-  verify_dir $1
-  if ! test -r "$DIR/state"; then ERROR="pid $1 has no state"; return 1; fi
+  verify_dir $1 || return 1
+  if test "$STORE" = "journal"
+  then
+    job_state $1
+    if test -z "$JOB_STATE"; then ERROR="pid $1 has no state"; return 1; fi
+  else
+    if ! test -r "$DIR/state"; then ERROR="pid $1 has no state"; return 1; fi
+    job_state $1
+  fi
 }
 
 
@@ -146,12 +315,14 @@ create_monitor () {
 
   # create the monitor wrapper script once -- this is used by all job startup
   # scripts to actually run job.sh.  The script gets SAGA_PID as argument,
-  # denoting the job to monitor.   The monitor will write 3 pids to a named pipe
-  # (listened to by the wrapper):
+  # denoting the job to monitor, and the job state store.  The monitor will
+  # write 3 pids to a named pipe (listened to by the wrapper):
   #
   #   rpid: pid of shell running the job 
   #   mpid: pid of this monitor.sh instance (== pid of process group for cancel)
   SAGA_PID=\$1
+  STORE=\$2
+  shift
   shift
   DIR="\$*"
 
@@ -161,7 +332,13 @@ create_monitor () {
   \\touch "\$DIR/in"
 
   (
-    \\printf  "RUNNING \\n"     >> "\$DIR/state"  ;
+    if test "\$STORE" = "journal"
+    then
+      \\printf "\$SAGA_PID RUNNING - - -\\n" >> "$JOURNAL"
+    else
+      \\printf "RUNNING \\n"     >> "\$DIR/state"
+    fi
+    \\printf  "\$SAGA_PID:RUNNING\\n" >> "$EVENTS" ;
     \\exec /bin/sh "\$DIR/cmd"   < "\$DIR/in" > "\$DIR/out" 2> "\$DIR/err"
   ) 1> /dev/null 2>/dev/null 3</dev/null &
 
@@ -200,13 +377,23 @@ create_monitor () {
     fi
 
     STOP=\`\\awk 'BEGIN{srand(); print srand()}'\`
-    \\printf "STOP  : \$STOP\\n"  >> "\$DIR/stats"
 
-    # evaluate exit val
-    \\printf "\$retv\\n" > "\$DIR/exit"
+    test   "\$retv" -eq 0  && STATE=DONE
+    test   "\$retv" -eq 0  || STATE=FAILED
+
+    if test "\$STORE" = "journal"
+    then
+      # state, stop time and exit value in one record
+      \\printf "\$SAGA_PID \$STATE - \$STOP \$retv\\n" >> "$JOURNAL"
+    else
+      \\printf "STOP  : \$STOP\\n"  >> "\$DIR/stats"
+
+      # evaluate exit val
+      \\printf "\$retv\\n" > "\$DIR/exit"
 
-    test   "\$retv" -eq 0  && \\printf "DONE \\n"   >> "\$DIR/state"
-    test   "\$retv" -eq 0  || \\printf "FAILED \\n" >> "\$DIR/state"
+      \\printf "\$STATE \\n"           >> "\$DIR/state"
+    fi
+    \\printf "\$SAGA_PID:\$STATE\\n" >> "$EVENTS"
 
     # done waiting
     break
@@ -214,6 +401,103 @@ create_monitor () {
 
   exit
 
+EOT
+
+  # the lean monitor is started directly by the wrapper, with job control
+  # enabled, so that its pid is both the job id and the process group of the
+  # job.  It gets the wrapper's launch fifo, the submission mode, the job state
+  # store and the job command as arguments, sets up the job directory, starts the
+  # job, and reports back via the fifo (for async submission already when the
+  # job is NEW).
+  # Compared to the classic launch, it saves about 10 process spawns per job.
+  \cat > "$BASE/monitor_lean.sh" <<EOT
+
+  SAGA_PID=\$\$
+  FIFO=\$1
+  SUBMIT=\$2
+  STORE=\$3
+  shift
+  shift
+  shift
+  DIR="$BASE/\$SAGA_PID"
+
+  test -d "\$DIR" && \\rm -rf "\$DIR"     # re-use old pid if needed
+  if ! \\mkdir -p "\$DIR"
+  then
+    \\printf "\$SAGA_PID cannot use job id\\n" > "\$FIFO"
+    exit 1
+  fi
+
+  if test "\$STORE" = "journal"
+  then
+    \\awk -v pid=\$SAGA_PID 'BEGIN{srand(); print pid " NEW " srand() " - -"}' >> "$JOURNAL"
+  else
+    exec > "\$DIR/monitor.log" 2>&1
+    \\awk 'BEGIN{srand(); print "START : " srand()}' > "\$DIR/stats"
+    \\printf "NEW \\n"           >> "\$DIR/state"
+  fi
+  \\printf "\$*\\n"         > "\$DIR/cmd"
+  : >> "\$DIR/in"
+  \\printf "\$SAGA_PID:NEW\\n" >> "$EVENTS"
+
+  # async submission: the job is known -- release the wrapper
+  test "\$SUBMIT" = "async" && \\printf "\$SAGA_PID OK\\n" > "\$FIFO"
+
+  /bin/sh "\$DIR/cmd" < "\$DIR/in" > "\$DIR/out" 2> "\$DIR/err" &
+
+  RPID=\$!
+
+  \\printf "\$RPID\\n"     > "\$DIR/rpid"  # real job id
+  \\printf "\$SAGA_PID\\n" > "\$DIR/mpid"  # monitor pid
+
+  if test "\$STORE" = "journal"
+  then
+    \\printf "\$SAGA_PID RUNNING - - -\\n" >> "$JOURNAL"
+  else
+    \\printf "RUNNING \\n"           >> "\$DIR/state"
+  fi
+  \\printf "\$SAGA_PID:RUNNING\\n" >> "$EVENTS"
+
+  # sync submission: the job is up -- release the wrapper
+  test "\$SUBMIT" = "async" || \\printf "\$SAGA_PID OK\\n" > "\$FIFO"
+
+  while true
+  do
+    \\wait \$RPID
+    retv=\$?
+
+    # see monitor.sh
+    if test -e "\$DIR/suspended"
+    then
+      \\rm -f "\$DIR/suspended"
+      continue
+    fi
+
+    if test -e "\$DIR/resumed"
+    then
+      \\rm -f "\$DIR/resumed"
+      continue
+    fi
+
+    test   "\$retv" -eq 0  && STATE=DONE
+    test   "\$retv" -eq 0  || STATE=FAILED
+
+    if test "\$STORE" = "journal"
+    then
+      \\awk -v pid=\$SAGA_PID -v state=\$STATE -v retv=\$retv \\
+          'BEGIN{srand(); print pid " " state " - " srand() " " retv}' >> "$JOURNAL"
+    else
+      \\awk 'BEGIN{srand(); print "STOP  : " srand()}' >> "\$DIR/stats"
+      \\printf "\$retv\\n" > "\$DIR/exit"
+      \\printf "\$STATE \\n"           >> "\$DIR/state"
+    fi
+    \\printf "\$SAGA_PID:\$STATE\\n" >> "$EVENTS"
+
+    break
+  done
+
+  exit
+
 EOT
 
 }
@@ -255,8 +539,17 @@ EOT
 #
 # Bottom line: full disk will screw with state consistency -- which is no
 # surprise really...
+#
+# In 'lean' launch mode, cmd_run_lean is used instead (see there).
 
 cmd_run () {
+
+  if test "$LAUNCH" = "lean"
+  then
+    cmd_run_lean "$@"
+    return
+  fi
+
   #
   # do a double fork to avoid zombies (need to do a wait in this process)
 
@@ -276,14 +569,28 @@ cmd_run () {
   # success
   RETVAL=$SAGA_PID 
 
+  # for async submission, we are done.  Note that we still had to wait for the
+  # monitor startup above: its interactive shell must not compete with us for
+  # the terminal.  Async submission thus saves more with lean launches.
+  test "$SUBMIT" = "async" && return
+
   # we have to wait though 'til the job enters RUNNING (this is a sync job
-  # startup)
+  # startup).  Wait in 0.1 second steps (1 second steps if sleep does not
+  # support fractions), for 30 seconds max -- the job exists at this point, so
+  # on timeout we still return its id, and its state is tracked as usual.
   DIR="$BASE/$SAGA_PID"
 
-  while true
+  n=0
+  while test $n -lt 300
   do
-    \grep "RUNNING" "$DIR/state" && break
-    \sleep 0  # sleep 0 will wait for just some millisecs
+    if test "$STORE" = "journal"
+    then
+      \grep -q "^$SAGA_PID RUNNING " "$JOURNAL" "$JOURNAL".[0-9]* 2>/dev/null && break
+    else
+      \grep "RUNNING" "$DIR/state" && break
+    fi
+    \sleep 0.1 2>/dev/null || { \sleep 1; n=$((n+9)); }
+    n=$((n+1))
   done
 }
 
@@ -307,8 +614,7 @@ cmd_run2 () {
 
   test -d "$DIR"            && \rm    -rf "$DIR"     # re-use old pid if needed
   test -d "$DIR"            || \mkdir -p  "$DIR"  || (RETVAL="cannot use job id"; return 0)
-  \printf "START : $START\n"  > "$DIR/stats"
-  \printf "NEW \n"           >> "$DIR/state"
+  set_state "$SAGA_PID" NEW "$START"
 
   cmd_run_process "$SAGA_PID" "$@" &
   DAEMON_PID=$!      # this is the (SAGA-level) job id!
@@ -334,7 +640,9 @@ cmd_run_process () {
   # lifetime will not be bound to the manager script lifetime.  Also, it runs in
   # an interactive shell, i.e. in a new process group, so that we can signal the
   # monitor and the actual job processes all at once (think suspend, cancel).
-  ( /bin/sh -i -c "sh $BASE/monitor.sh  $SAGA_PID \"$DIR\" 2>&1 > \"$DIR/monitor.log\" & exit" )
+  MONITOR_LOG="$DIR/monitor.log"
+  test "$STORE" = "journal" && MONITOR_LOG="/dev/null"
+  ( /bin/sh -i -c "sh $BASE/monitor.sh  $SAGA_PID $STORE \"$DIR\" 2>&1 > \"$MONITOR_LOG\" & exit" )
 
   \read -r TEST < "$DIR/fifo"
   \rm -rf $DIR/fifo
@@ -343,6 +651,41 @@ cmd_run_process () {
 }
 
 
+# --------------------------------------------------------------------
+#
+# lean job launch: the job monitor is forked (and exec'ed) directly from this
+# shell, with job control enabled so that it becomes leader of a new process
+# group -- its pid is the job id, and the group covers the job for
+# suspend/cancel.  The monitor sets up the job directory and starts the job,
+# and then releases us via the launch fifo -- so we do not need to spin on the
+# job's state file.  The job directory layout is the same as for cmd_run.
+#
+# The fifo is kept open (read-write) on fd 3, so that we never see EOF when
+# a monitor closes its end only after we read its line.  The monitors prefix
+# their line with their pid, so that we can't pick up a stray one.
+#
+cmd_run_lean () {
+
+  set -m
+  /bin/sh "$BASE/monitor_lean.sh" "$LAUNCH_FIFO" "$SUBMIT" "$STORE" "$@" < /dev/null > /dev/null 2>&1 3<&- &
+  SAGA_PID=$!
+  set +m
+
+  RESULT=""
+  while \read -r PID RESULT <&3
+  do
+    test "$PID" = "$SAGA_PID" && break
+  done
+
+  if test "$RESULT" = "OK"
+  then
+    RETVAL=$SAGA_PID
+  else
+    ERROR="NOK - $RESULT"
+  fi
+}
+
+
 cmd_lrun () {
   # LRUN allows to run shell commands which span more than one line.
   CMD=""
@@ -368,8 +711,7 @@ cmd_lrun () {
 cmd_state () {
   verify_state $1 || return
 
-  DIR="$BASE/$1"
-  RETVAL=`\grep -e ' $' "$DIR/state" | \tail -n 1 | \tr -d ' '`
+  RETVAL=$JOB_STATE
   if test "$RETVAL" = ""
   then
     RETVAL=UNKNOWN
@@ -385,10 +727,73 @@ cmd_stats () {
   # stats are only defined for jobs in some state
   verify_state $1 || return
 
-  DIR="$BASE/$1"
-  STATE=`\grep -e ' $' "$DIR/state" | \tail -n 1 | \tr -d ' '`
-  RETVAL="STATE : $STATE\n"
-  RETVAL="$RETVAL\n`\cat $DIR/stats`\n"
+  RETVAL="STATE : $JOB_STATE\n"
+
+  if test "$STORE" = "journal"
+  then
+    set -- $JOB_INFO
+    test "$3" = "-" || RETVAL="$RETVAL\nSTART : $3"
+    test "$4" = "-" || RETVAL="$RETVAL\nSTOP  : $4"
+    RETVAL="$RETVAL\n"
+  else
+    RETVAL="$RETVAL\n`\cat $DIR/stats`\n"
+  fi
+}
+
+
+# --------------------------------------------------------------------
+#
+# retrieve state, start time, stop time and exit code of the given jobs (all
+# jobs by default), as one line per job.  Unknown values are reported as '-'.
+# All job files (or the journal) are parsed by a single awk process.
+#
+cmd_snapshot () {
+  if test "$STORE" = "journal"
+  then
+    RETVAL=`journal_table $*`
+  else
+    RETVAL=`snapshot_table $*`
+  fi
+}
+
+snapshot_table () {
+
+  \cd "$BASE" || return
+
+  if test -z "$*"
+  then
+    PATTERNS="*/state */stats */exit"
+  else
+    PATTERNS=""
+    for pid in $*
+    do
+      PATTERNS="$PATTERNS $pid/state $pid/stats $pid/exit"
+    done
+  fi
+
+  FILES=""
+  for f in $PATTERNS
+  do
+    test -f "$f" && FILES="$FILES $f"
+  done
+
+  test -z "$FILES" && return
+
+  \awk '
+    { split (FILENAME, p, "/") ; pid = p[1] ; jobs[pid] = 1 }
+    p[2] == "state" && / $/          { state[pid] = $1 }
+    p[2] == "stats" && $1 == "START" { start[pid] = $3 }
+    p[2] == "stats" && $1 == "STOP"  { stop[pid]  = $3 }
+    p[2] == "exit"                   { code[pid]  = $1 }
+    END {
+      for (pid in jobs) {
+        print pid,
+              (pid in state) ? state[pid] : "-",
+              (pid in start) ? start[pid] : "-",
+              (pid in stop)  ? stop[pid]  : "-",
+              (pid in code)  ? code[pid]  : "-"
+      }
+    }' $FILES
 }
 
 
@@ -426,8 +831,7 @@ cmd_wait () {
 cmd_result () {
   verify_state $1 || return
 
-  DIR="$BASE/$1"
-  state=`\grep -e ' $' "$DIR/state" | \tail -n 1 | \tr -d ' '`
+  state=$JOB_STATE
 
   if test "$state" != "DONE" -a "$state" != "FAILED" -a "$state" != "CANCELED"
   then 
@@ -435,6 +839,17 @@ cmd_result () {
     return
   fi
 
+  if test "$STORE" = "journal"
+  then
+    set -- $JOB_INFO
+    if test "$5" = "-"
+    then
+      ERROR="job $1 in incorrect state -- no exit code available"
+    fi
+    RETVAL=$5
+    return
+  fi
+
   if ! test -r "$DIR/exit"
   then
     ERROR="job $1 in incorrect state -- no exit code available"
@@ -453,7 +868,7 @@ cmd_suspend () {
   verify_pid   $1 || return
 
   DIR="$BASE/$1"
-  state=`\grep -e ' $' "$DIR/state" | \tail -n 1 | \tr -d ' '`
+  state=$JOB_STATE
   rpid=`\cat "$DIR/rpid"`
 
   if ! test "$state" = "RUNNING"
@@ -468,8 +883,8 @@ cmd_suspend () {
 
   if test "$ECODE" = "0"
   then
-    \printf "SUSPENDED \n" >>  "$DIR/state"
     \printf "$state \n"    >   "$DIR/state.susp"
+    set_state "$1" SUSPENDED
     RETVAL="$1 suspended"
   else
     \rm -f   "$DIR/suspended"
@@ -488,7 +903,7 @@ cmd_resume () {
   verify_pid   $1 || return
 
   DIR="$BASE/$1"
-  state=`\grep -e ' $' "$DIR/state" | \tail -n 1 | \tr -d ' '`
+  state=$JOB_STATE
   rpid=`\cat "$DIR/rpid"`
 
   if ! test "$state" = "SUSPENDED"
@@ -504,7 +919,7 @@ cmd_resume () {
   if test "$ECODE" = "0"
   then
     test -s "$DIR/state.susp" || \printf "RUNNING \n" >  "$DIR/state.susp"
-    \cat    "$DIR/state.susp"                         >> "$DIR/state"
+    set_state "$1" `\cat "$DIR/state.susp" | \tr -d ' '`
     \rm  -f "$DIR/state.susp"
     RETVAL="$1 resumed"
   else
@@ -534,7 +949,8 @@ cmd_cancel () {
   /bin/kill -KILL $mpid 2>/dev/null
 
   # now make sure that job did not reach final state before monitor died
-  state=`\grep -e ' $' "$DIR/state" | \tail -n 1 | \tr -d ' '`
+  job_state $1
+  state=$JOB_STATE
   if test "$state" = "FAILED" -o "$state" = "DONE" -o "$state" = "CANCELED"
   then
     ERROR="job $1 in incorrect state ('$state' = 'DONE|FAILED|CANCELED')"
@@ -548,7 +964,7 @@ cmd_cancel () {
   /bin/kill -KILL               $rpid 2>/dev/null
 
   # FIXME: how can we check for success?  ps?
-  \printf "CANCELED \n" >> "$DIR/state"
+  set_state "$1" CANCELED
   RETVAL="$1 canceled"
 }
 
@@ -596,7 +1012,12 @@ cmd_stderr () {
 # list all job IDs
 #
 cmd_list () {
-  RETVAL=`(\cd "$BASE" ; \ls -C1 -d */ 2>/dev/null) | \cut -f 1 -d '/'`
+  if test "$STORE" = "journal"
+  then
+    RETVAL=`journal_table | \cut -f 1 -d ' '`
+  else
+    RETVAL=`(\cd "$BASE" ; \ls -C1 -d */ 2>/dev/null) | \cut -f 1 -d '/'`
+  fi
 }
 
 
@@ -610,7 +1031,19 @@ cmd_purge () {
   then
     DIR="$BASE/$1"
     \rm -rf "$DIR"
+    test "$STORE" = "journal" && \printf "$1 PURGED - - -\n" >> "$JOURNAL"
     RETVAL="purged $1"
+  elif test "$STORE" = "journal"
+  then
+    # mark all final jobs as purged, remove their directories, and drop them
+    # from the index
+    journal_table | \awk -v journal="$JOURNAL" '
+      $2 == "DONE" || $2 == "FAILED" || $2 == "CANCELED" {
+        print $1 " PURGED - - -" >> journal
+        print $1
+      }' | (\cd "$BASE" && \xargs \rm -rf)
+    journal_compact
+    RETVAL="purged finished jobs"
   else
     for d in `\grep -l -e 'DONE' -e 'FAILED' -e 'CANCELED' "$BASE"/*/state 2>/dev/null`
     do
@@ -620,6 +1053,8 @@ cmd_purge () {
     done
     RETVAL="purged finished jobs"
   fi
+
+  events_rotate
 }
 
 
@@ -643,6 +1078,7 @@ cmd_quit () {
 
   # clean bulk file and other temp files
   \rm -f bulk.$$
+  \rm -f "$LAUNCH_FIFO"
 
   # restore shell echo
   \stty echo    >/dev/null 2>&1
@@ -722,6 +1158,7 @@ listen() {
         RESULT    ) cmd_result  "$ARGS"  ;;
         STATE     ) cmd_state   "$ARGS"  ;;
         STATS     ) cmd_stats   "$ARGS"  ;;
+        SNAPSHOT  ) cmd_snapshot $ARGS  ;;
         WAIT      ) cmd_wait    "$ARGS"  ;;
         STDIN     ) cmd_stdin   "$ARGS"  ;;
         STDOUT    ) cmd_stdout  "$ARGS"  ;;
@@ -791,6 +1228,32 @@ then
   cmd_purge
 fi
 
+# lean launches need job control (for the job's process group) and the launch
+# fifo -- otherwise we fall back to classic launches
+if test "$LAUNCH" = "lean"
+then
+  set -m 2>/dev/null
+  case "$-" in
+    *m* ) set +m
+          # remove fifos of wrappers which died w/o cleanup
+          for f in "$BASE"/launch.*
+          do
+            test -p "$f" || continue
+            /bin/kill -0 "${f##*.}" 2>/dev/null || \rm -f "$f"
+          done
+          \rm -f "$LAUNCH_FIFO"
+          if \mkfifo "$LAUNCH_FIFO"
+          then
+            exec 3<> "$LAUNCH_FIFO"
+          else
+            LAUNCH="classic"
+          fi
+          ;;
+    *   ) LAUNCH="classic"
+          ;;
+  esac
+fi
+
 create_monitor
 listen $1
 #
@@ -358,9 +358,12 @@ class SLURMJobService (saga.adaptors.cpi.job.Service) :
 
         # verify our SLURM environment contains the commands we need for this
         # adaptor to work properly
+        # (all checks are pipelined on the shell, to save roundtrips)
         self._logger.debug("Verifying existence of remote SLURM tools.")
-        for cmd in self._commands.keys():
-            ret, out, _ = self.shell.run_sync("which %s " % cmd)
+        cmds  = self._commands.keys()
+        which = self.shell.run_pipelined(["which %s " % cmd for cmd in cmds])
+        for cmd, future in zip(cmds, which):
+            ret, out, _ = future.result()
             if ret != 0:
                 message = "Error finding SLURM tool %s on remote server %s!\n" \
                           "Locations searched:\n%s\n" \
@@ -560,16 +563,24 @@ class SLURMJobService (saga.adaptors.cpi.job.Service) :
         # try to create the working directory (if defined)
         # WRANING: this assumes a shared filesystem between login node and
         #           comnpute nodes.
+        # The mkdir and sbatch are pipelined -- sbatch checks for the
+        # directory, so that it does not run if mkdir failed.
+        cmdline = """echo "%s" | sbatch""" % slurm_script
+
         if jd.working_directory is not None:
             self._logger.info("Creating working directory %s" % jd.working_directory)
-            ret, out, _ = self.shell.run_sync("mkdir -p %s" % (jd.working_directory))
+            mkdir, sbatch = self.shell.run_pipelined(
+                ["mkdir -p %s" % (jd.working_directory),
+                 "test -d %s && %s" % (jd.working_directory, cmdline)])
+            ret, out, _ = mkdir.result()
             if ret != 0:
                 # something went wrong
                 message = "Couldn't create working directory - %s" % (out)
                 log_error_and_raise(message, saga.NoSuccess, self._logger)
+        else:
+            sbatch = self.shell.run_future(cmdline)
 
-
-        ret, out, _ = self.shell.run_sync("""echo "%s" | sbatch""" % slurm_script)
+        ret, out, _ = sbatch.result()
 
         # find out what our job ID will be
         # TODO: Could make this more efficient
@@ -171,6 +171,38 @@ class _AttributesBase (object) :
         pass
 
 
+# ------------------------------------------------------------------------------
+#
+class _AttributeEntry (dict) :
+    """
+    This class is not part of the public attribute API.
+
+    An attribute entry holds the per-instance state of a single registered
+    attribute.  All static properties (type, flavor, mode, default, ...) are
+    kept in a schema dict which is compiled once per class and attribute, and
+    which is shared by all instances of that class (see
+    :func:`Attributes._attributes_register`).  The entry itself only stores
+    what differs from the schema -- usually just the value, the 'exists' flag
+    and the time of the last update.  Any property written to the entry is
+    stored in the entry, so the shared schema is never altered.
+    """
+
+    __slots__ = ['schema']
+
+    def __init__ (self, schema, state=None) :
+
+        self.schema = schema
+
+        if  state :
+            dict.update (self, state)
+
+    def __missing__ (self, key) :
+        return self.schema[key]
+
+    def __contains__ (self, key) :
+        return dict.__contains__ (self, key) or key in self.schema
+
+
 # ------------------------------------------------------------------------------
 #
 class Attributes (_AttributesBase) :
@@ -314,6 +346,11 @@ class Attributes (_AttributesBase) :
     _camel_case_regex_1 = re.compile('(.)([A-Z][a-z]+)')
     _camel_case_regex_2 = re.compile('([a-z0-9])([A-Z])')
 
+    # attribute schemas, compiled once per (class, attribute) and shared by
+    # all instances of that class, and the CamelCase -> under_score mapping
+    _attributes_schemas = dict ()
+    _underscore_cache   = dict ()
+
 
     # --------------------------------------------------------------------------
     #
@@ -734,8 +771,12 @@ class Attributes (_AttributesBase) :
 
 
         if d['camelcasing'] :
-            temp = Attributes._camel_case_regex_1.sub(r'\1_\2', key)
-            return Attributes._camel_case_regex_2.sub(r'\1_\2', temp).lower()
+            us_key = Attributes._underscore_cache.get (key)
+            if  us_key is None :
+                temp   = Attributes._camel_case_regex_1.sub(r'\1_\2', key)
+                us_key = Attributes._camel_case_regex_2.sub(r'\1_\2', temp).lower()
+                Attributes._underscore_cache[key] = us_key
+            return us_key
         else :
             return key
 
@@ -779,6 +820,17 @@ class Attributes (_AttributesBase) :
         # perform flavor and type conversion
         val = self._attributes_t_conversion_flavor (key, val)
 
+        # enum typed values must be one of the registered enums (if any).  None
+        # is always allowed.
+        if  d['attributes'][key]['type'] == ENUM and val != None :
+
+            vals = d['attributes'][key]['enums']
+
+            if  vals and not val in vals :
+                msg = "incorrect value (%s) for Enum typed attribute (%s)." \
+                      "Allowed values: %s"  %  (str(val), key, str(vals))
+                raise se.BadParameter (msg)
+
         # apply all value checks on the conversion result
         for check in d['attributes'][key]['checks'] :
             ret = check (key, val)
@@ -1095,15 +1147,18 @@ class Attributes (_AttributesBase) :
         # if val != d['attributes'][key]['value'] :
 
 
-        d['attributes'][key]['value'] = val
-        d['attributes'][key]['last']  = now ()
+        entry          = d['attributes'][key]
+        entry['value'] = val
+        entry['last']  = now ()
 
-        if flow==self._DOWN :
+        # setters and callbacks are only invoked if any are registered
+        if flow==self._DOWN and (d['setter'] or entry['setter']) :
             # NOTE: we use the orig_val here, to make the environment hooks
             # happy which we introduced for BJ backward compatibility (FIXME)
             self._attributes_t_call_setter (key, orig_val)
 
-        self._attributes_t_call_cb (key, val)
+        if entry['callbacks'] :
+            self._attributes_t_call_cb (key, val)
 
 
     # --------------------------------------------------------------------------
@@ -1126,14 +1181,17 @@ class Attributes (_AttributesBase) :
         # make sure interface is ready to use
         d = self._attributes_t_init (key)
 
-        if flow == self._DOWN :
+        entry = d['attributes'][key]
+
+        # getters are only invoked if any are registered
+        if flow == self._DOWN and (d['getter'] or entry['getter']) :
             self._attributes_t_call_getter (key)
 
-        if 'value' in d['attributes'][key] :
-            return d['attributes'][key]['value']
+        if 'value' in entry :
+            return entry['value']
 
-        if 'default' in d['attributes'][key] :
-            return d['attributes'][key]['default']
+        if 'default' in entry :
+            return entry['default']
                 
         return None
 
@@ -1451,9 +1509,17 @@ class Attributes (_AttributesBase) :
         # make sure interface is ready to use
         d = self._attributes_t_init (key)
 
-        d['attributes'][key]['callbacks'].append (cb)
+        # the callback list may be shared with the attribute schema, so we
+        # create a private list before adding the first callback
+        callbacks = d['attributes'][key]['callbacks']
+
+        if  not isinstance (callbacks, list) :
+            callbacks = list (callbacks)
+            d['attributes'][key]['callbacks'] = callbacks
 
-        id = len (d['attributes'][key]['callbacks']) - 1
+        callbacks.append (cb)
+
+        id = len (callbacks) - 1
 
         if flow==self._DOWN :
             self._attributes_t_call_caller (key, id, cb)
@@ -1544,54 +1610,58 @@ class Attributes (_AttributesBase) :
         if us_key in  d['attributes'] :
             self._attributes_unregister (us_key, flow=flow)
 
-        # register the attribute and properties
-        d['attributes'][us_key]                 = {}
-        d['attributes'][us_key]['value']        = default # initial value
-        d['attributes'][us_key]['default']      = default # default value
-        d['attributes'][us_key]['type']         = typ     # int, float, enum, ...
-        d['attributes'][us_key]['exists']       = False   # no value set, yet
-        d['attributes'][us_key]['flavor']       = flavor  # scalar / vector
-        d['attributes'][us_key]['mode']         = mode    # readonly / writeable / final
-        d['attributes'][us_key]['extended']     = ext     # is an extended attribute 
-        d['attributes'][us_key]['private']      = priv    # is a  private attribute
-        d['attributes'][us_key]['camelcase']    = key     # keep original key name
-        d['attributes'][us_key]['underscore']   = us_key  # keep under_scored name
-        d['attributes'][us_key]['enums']        = []      # list of valid enum values
-        d['attributes'][us_key]['checks']       = []      # list of custom value checks
-        d['attributes'][us_key]['callbacks']    = []      # list of callbacks
-        d['attributes'][us_key]['recursion']    = False   # recursion check for callbacks
-        d['attributes'][us_key]['setter']       = None    # custom attribute setter
-        d['attributes'][us_key]['getter']       = None    # custom attribute getter
-        d['attributes'][us_key]['last']         = never   # time of last refresh (never)
-        d['attributes'][us_key]['ttl']          = 0.0     # refresh delay (none)
-
-        # for enum types, we add a value checker
-        if typ == ENUM :
-
-            def _enum_check (key, val) :
-                if None == val  :
-                    # None is always allowed
-                    return True
-                
-                us_key = self._attributes_t_underscore (key)
-                d      = self._attributes_t_init       (us_key)
-
-                vals   = d['attributes'][us_key]['enums']
-
-                # check if there is anything to check
-                if not vals :
-                    return True
-                
-                # value must be one of allowed enums
-                if val in vals :
-                        return True
-
-                # Houston, we got a problem...
-                msg = "incorrect value (%s) for Enum typed attribute (%s)." \
-                      "Allowed values: %s"  %  (str(val), key, str(vals))
-                raise se.BadParameter (msg)
-
-            self._attributes_add_check (key, _enum_check, flow=flow)
+        # the static attribute properties are kept in a schema which is shared
+        # by all instances of this class.  We reuse the cached schema if the
+        # attribute is registered with the same properties as before,
+        # otherwise we compile a new one.  Mutable defaults (lists, dicts) are
+        # not shared, but kept per instance.
+        shared_default = not isinstance (default, (list, dict))
+        schema_key     = (self.__class__, us_key)
+        schema         = Attributes._attributes_schemas.get (schema_key)
+
+        if  not schema                                      or \
+            schema['camelcase'] != key                      or \
+            schema['type']      != typ                      or \
+            schema['flavor']    != flavor                   or \
+            schema['mode']      != mode                     or \
+            schema['extended']  != ext                      or \
+            schema['private']   != priv                     or \
+            (shared_default and schema['default'] is not default) :
+
+            schema = dict ()
+            schema['value']      = None    # initial value
+            schema['default']    = None    # default value
+            schema['type']       = typ     # int, float, enum, ...
+            schema['exists']     = False   # no value set, yet
+            schema['flavor']     = flavor  # scalar / vector
+            schema['mode']       = mode    # readonly / writeable / final
+            schema['extended']   = ext     # is an extended attribute 
+            schema['private']    = priv    # is a  private attribute
+            schema['camelcase']  = key     # keep original key name
+            schema['underscore'] = us_key  # keep under_scored name
+            schema['enums']      = ()      # list of valid enum values
+            schema['checks']     = ()      # list of custom value checks
+            schema['callbacks']  = ()      # list of callbacks
+            schema['recursion']  = False   # recursion check for callbacks
+            schema['setter']     = None    # custom attribute setter
+            schema['getter']     = None    # custom attribute getter
+            schema['last']       = never   # time of last refresh (never)
+            schema['ttl']        = 0.0     # refresh delay (none)
+
+            if  shared_default :
+                schema['value']   = default
+                schema['default'] = default
+
+            Attributes._attributes_schemas[schema_key] = schema
+
+        # register the attribute -- the per-instance entry only holds what
+        # differs from the schema.  Note that enum values are checked in
+        # _attributes_t_conversion.
+        if  shared_default :
+            d['attributes'][us_key] = _AttributeEntry (schema)
+        else :
+            d['attributes'][us_key] = _AttributeEntry (schema, {'value'   : default, 
+                                                                'default' : default})
 
 
 
@@ -1863,37 +1933,31 @@ class Attributes (_AttributesBase) :
         other_d['attributes'] = {}
 
         for key in d['attributes'] :
-            other_d['attributes'][key] = {}
-            other_d['attributes'][key]['default']      =       d['attributes'][key]['default']   
-            other_d['attributes'][key]['exists']       =       d['attributes'][key]['exists']      
-            other_d['attributes'][key]['type']         =       d['attributes'][key]['type']      
-            other_d['attributes'][key]['flavor']       =       d['attributes'][key]['flavor']    
-            other_d['attributes'][key]['mode']         =       d['attributes'][key]['mode']      
-            other_d['attributes'][key]['extended']     =       d['attributes'][key]['extended']  
-            other_d['attributes'][key]['private']      =       d['attributes'][key]['private']  
-            other_d['attributes'][key]['camelcase']    =       d['attributes'][key]['camelcase'] 
-            other_d['attributes'][key]['underscore']   =       d['attributes'][key]['underscore']
-            other_d['attributes'][key]['enums']        = list (d['attributes'][key]['enums'])
-            other_d['attributes'][key]['checks']       = list (d['attributes'][key]['checks'])
-            other_d['attributes'][key]['callbacks']    = list (d['attributes'][key]['callbacks'])
-            other_d['attributes'][key]['recursion']    =       d['attributes'][key]['recursion']
-            other_d['attributes'][key]['setter']       =       d['attributes'][key]['setter']
-            other_d['attributes'][key]['getter']       =       d['attributes'][key]['getter']
-            other_d['attributes'][key]['last']         =       d['attributes'][key]['last']
-            other_d['attributes'][key]['ttl']          =       d['attributes'][key]['ttl']
-
-            if d['attributes'][key]['private' ] and key in orig_d['attributes'] :
+
+            entry = d['attributes'][key]
+
+            if  not isinstance (entry, _AttributeEntry) :
+                # alias entries are plain dicts
+                other_d['attributes'][key] = dict (entry)
+                continue
+
+            if entry['private' ] and key in orig_d['attributes'] :
                 # don't copy private keys
                 other_d['attributes'][key] = orig_d['attributes'][key]
                 continue
 
-            if        d['attributes'][key]['value'] == None :
-                other_d['attributes'][key]['value'] = None
-            else :
-                if        d['attributes'][key]['flavor'] == VECTOR :
-                    other_d['attributes'][key]['value']  = list (d['attributes'][key]['value'])
-                else :
-                    other_d['attributes'][key]['value']  =       d['attributes'][key]['value']
+            # the copy shares the attribute schema -- we only need to copy the
+            # per-instance state, and make sure that lists are not shared
+            other_entry = _AttributeEntry (entry.schema, entry)
+
+            for l in ['enums', 'checks', 'callbacks'] :
+                if  dict.__contains__ (entry, l) :
+                    other_entry[l] = list (entry[l])
+
+            if  entry['value'] != None and entry['flavor'] == VECTOR :
+                other_entry['value'] = list (entry['value'])
+
+            other_d['attributes'][key] = other_entry
 
         # set the new dictionary as state for copied class
         _AttributesBase.__setattr__ (other, '_d', other_d)
@@ -2035,7 +2099,7 @@ class Attributes (_AttributesBase) :
         #
         # if  None == newval or oldval == newval :
 
-        self._attributes_t_call_cb (key, val)
+        self._attributes_t_call_cb (us_key, val)
 
 
     # --------------------------------------------------------------------------
@@ -2083,8 +2147,11 @@ class Attributes (_AttributesBase) :
         us_key = self._attributes_t_underscore (key)
         d = self._attributes_t_init (us_key)
 
-        # register the attribute and properties
-        d['attributes'][us_key]['checks'].append (check)
+        # register the check -- the checks list may be shared with the
+        # attribute schema, so we never change it in place
+        checks = list (d['attributes'][us_key]['checks'])
+        checks.append (check)
+        d['attributes'][us_key]['checks'] = checks
 
 
     # --------------------------------------------------------------------------
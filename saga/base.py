@@ -23,14 +23,24 @@ class SimpleBase (object) :
     which are not backed by multiple adaptors (no session, tasks, etc).
     """
 
+    # apitype and logger only depend on the class, so we determine them once
+    # per class, and share them between all instances of that class.
+    _apitype_cache = {}
+
     # --------------------------------------------------------------------------
     #
     @sus.takes   ('SimpleBase')
     @sus.returns (sus.nothing)
     def __init__  (self) :
 
-        self._apitype   = self._get_apitype ()
-        self._logger    = saga.utils.logger.getLogger (self._apitype)
+        cls = self.__class__
+
+        if  not cls in SimpleBase._apitype_cache :
+            apitype = self._get_apitype ()
+            logger  = saga.utils.logger.getLogger (apitype)
+            SimpleBase._apitype_cache[cls] = (apitype, logger)
+
+        (self._apitype, self._logger) = SimpleBase._apitype_cache[cls]
 
       # self._logger.debug ("[saga.Base] %s.__init__()" % self._apitype)
 
@@ -83,7 +93,8 @@ class Base (SimpleBase) :
         _engine       = saga.engine.engine.Engine ()
 
         self._adaptor = adaptor
-        self._adaptor = _engine.bind_adaptor   (self, self._apitype, schema, adaptor)
+        self._adaptor = _engine.bind_adaptor   (self, self._apitype, schema, adaptor,
+                                                *args, **kwargs)
 
         # Sync creation (normal __init__) will simply call the adaptor's
         # init_instance at this point.  _init_task should *not* be evaluated,
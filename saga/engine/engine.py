@@ -6,16 +6,22 @@ __license__   = "MIT"
 
 """ Provides the SAGA runtime. """
 
+import os
 import re
 import sys
+import json
 import pprint
+import time
 import string
 import inspect
+import itertools
+import threading
 
 import saga.exceptions      as se
 import saga.utils.singleton as single
 import saga.utils.logger    as slog
 import saga.utils.config    as sconf
+import saga.version         as sver
 
 import saga.engine.registry  # adaptors to load
 
@@ -31,9 +37,43 @@ _config_options = [
     'valid_options' : [True, False],
     'documentation' : 'load adaptors which are marked as beta (i.e. not released).',
     'env_variable'  : None
+    },
+    { 
+    'category'      : 'saga.engine',
+    'name'          : 'lazy_adaptor_loading', 
+    'type'          : bool, 
+    'default'       : False,
+    'valid_options' : [True, False],
+    'documentation' : 'load adaptor modules on first use, i.e. when an API object '
+                      'is bound to an adaptor for a specific URL schema (instead of '
+                      'loading all adaptors on engine startup).',
+    'env_variable'  : 'SAGA_LAZY_ADAPTOR_LOADING'
+    },
+    { 
+    'category'      : 'saga.engine',
+    'name'          : 'bind_cache_ttl', 
+    'type'          : float, 
+    'default'       : 60.0,
+    'documentation' : 'time (in seconds) for which the engine remembers which '
+                      'adaptors succeeded or failed to bind for a given API type, '
+                      'URL schema, host and session.  0 disables the binding cache.',
+    'env_variable'  : 'SAGA_BIND_CACHE_TTL'
+    },
+    { 
+    'category'      : 'saga.engine',
+    'name'          : 'adaptor_manifest', 
+    'type'          : str, 
+    'default'       : '~/.saga/engine/adaptors.manifest',
+    'documentation' : 'file which caches the results of adaptor validation '
+                      'between runs (an empty value disables the manifest).',
+    'env_variable'  : 'SAGA_ADAPTOR_MANIFEST'
     }
 ]
 
+# version of the adaptor manifest format
+_MANIFEST_VERSION = 1
+
+
 ################################################################################
 ##
 class Engine(sconf.Configurable): 
@@ -114,6 +154,13 @@ class Engine(sconf.Configurable):
                   else :
                       # successfully bound to adaptor
                       return
+
+        If the 'lazy_adaptor_loading' option is enabled (or the
+        SAGA_LAZY_ADAPTOR_LOADING environment variable is set), adaptor
+        modules listed in 'saga.engine.registry.adaptor_index' are not loaded
+        on engine creation.  Instead, the engine only keeps that index, and
+        loads (and registers) an adaptor module the first time an adaptor is
+        needed for one of the API types and URL schemas the module serves.
     """
 
     __metaclass__ = single.Singleton
@@ -127,6 +174,21 @@ class Engine(sconf.Configurable):
         # Engine manages cpis from adaptors
         self._adaptor_registry = {}
 
+        # deferred adaptor modules (lazy mode only)
+        self._lazy_pending     = {}
+        self._lazy_lock        = threading.RLock ()
+        self._registry_rank    = {}
+
+        # cached adaptor validation results, see _read_manifest()
+        self._manifest         = None
+        self._manifest_dirty   = False
+
+        # known good and bad adaptor bindings, see bind_adaptor()
+        self._bind_cache       = {}
+        self._bind_swept       = time.time ()
+        self._bind_lock        = threading.RLock ()
+        self._bind_session_ids = itertools.count ()
+
 
         # set the configuration options for this object
         sconf.Configurable.__init__(self, 'saga.engine', _config_options)
@@ -155,12 +217,10 @@ class Engine(sconf.Configurable):
             :param inject_registry: Inject a fake registry. *For unit tests only*.
         """
 
-        # get the engine config options
-        global_config = sconf.getConfig()
-
-
-        # get the list of adaptors to load
+        # get the list of adaptors to load, and the index of the schemas and
+        # API types they are going to serve
         registry = saga.engine.registry.adaptor_registry
+        index    = saga.engine.registry.adaptor_index
 
 
         # check if some unit test wants to use a special registry.  If
@@ -168,274 +228,523 @@ class Engine(sconf.Configurable):
         if inject_registry != None :
             self._adaptor_registry = {}
             registry               = inject_registry
+            index                  = {}
+            self._manifest         = None
+        else :
+            self._read_manifest ()
 
 
-        # attempt to load all registered modules
-        for module_name in registry:
+        # in lazy mode, we only keep the index entries around, and load the
+        # adaptor modules on demand (see _load_lazy()).  Modules which are not
+        # listed in the index are always loaded right away.
+        lazy = self._cfg['lazy_adaptor_loading'].get_value ()
 
-            self._logger.info ("Loading  adaptor %s"  %  module_name)
+        # the binding cache refers to the old registry
+        self.invalidate_bindings ()
 
+        with self._lazy_lock :
 
-            # first, import the module
-            adaptor_module = None
-            try :
-                adaptor_module = __import__ (module_name, fromlist=['Adaptor'])
+            self._lazy_pending  = {}
+            self._registry_rank = {}
 
-            except Exception as e:
-                self._logger.error ("Skipping adaptor %s 1: module loading failed: %s" % (module_name, e))
-                self._logger.trace ()
-                continue # skip to next adaptor
+            # attempt to load all registered modules
+            for rank, module_name in enumerate (registry) :
 
+                self._registry_rank[module_name] = rank
 
-            # we expect the module to have an 'Adaptor' class
-            # implemented, which, on calling 'register()', returns
-            # a info dict for all implemented adaptor classes.
-            adaptor_instance = None
-            adaptor_info     = None
+                # index entries from the manifest are preferred, as they
+                # reflect the actual adaptor code
+                entry = self._get_manifest_entry (module_name)
 
-            try: 
-                adaptor_instance = adaptor_module.Adaptor ()
-                adaptor_info     = adaptor_instance.register ()
+                if  lazy and entry :
+                    self._logger.info ("Deferring adaptor %s"  %  module_name)
+                    self._lazy_pending[module_name] = entry
+                    continue
 
-            except se.SagaException as e:
-                self._logger.error ("Skipping adaptor %s: loading failed: '%s'" % (module_name, e))
-              # self._logger.trace ()
-                continue # skip to next adaptor
+                if  lazy and module_name in index :
+                    self._logger.info ("Deferring adaptor %s"  %  module_name)
+                    self._lazy_pending[module_name] = index[module_name]
+                    continue
 
-            except Exception as e:
-                self._logger.error ("Skipping adaptor %s: loading failed: '%s'" % (module_name, e))
-              # self._logger.trace ()
-                continue # skip to next adaptor
+                self._load_adaptor (module_name)
 
+            self._write_manifest ()
 
-            # the adaptor must also provide a sanity_check() method, which sould
-            # be used to confirm that the adaptor can function properly in the
-            # current runtime environment (e.g., that all pre-requisites and
-            # system dependencies are met).
-            try: 
-                adaptor_instance.sanity_check ()
 
-            except Exception as e:
-                self._logger.error ("Skipping adaptor %s: failed self test: %s" % (module_name, e))
-              # self._logger.trace ()
-                continue # skip to next adaptor
 
+    #-----------------------------------------------------------------
+    # 
+    def _load_lazy (self, ctype=None, schema=None) :
+        """ Load all deferred adaptor modules which, according to the registry
+            index, serve the given API type and URL schema.  If no schema is
+            given, all deferred modules for that type are loaded -- if no type
+            is given either, all deferred modules are loaded.  This is a no-op
+            unless the 'lazy_adaptor_loading' option is enabled.
+        """
 
-            # check if we have a valid adaptor_info
-            if adaptor_info is None :
-                self._logger.warning ("Skipping adaptor %s: adaptor meta data are invalid" \
-                                   % module_name)
-                self._logger.trace ()
-                continue  # skip to next adaptor
+        if  not self._lazy_pending :
+            return
 
+        with self._lazy_lock :
 
-            if  not 'name'    in adaptor_info or \
-                not 'cpis'    in adaptor_info or \
-                not 'version' in adaptor_info or \
-                not 'schemas' in adaptor_info    :
-                self._logger.warning ("Skipping adaptor %s: adaptor meta data are incomplete" \
-                                   % module_name)
-                self._logger.trace ()
-                continue  # skip to next adaptor
+            module_names = []
+            for module_name in self._lazy_pending :
+
+                entry = self._lazy_pending[module_name]
+
+                if  ctype  and not ctype          in entry['types']   : continue
+                if  schema and not schema.lower() in entry['schemas'] : continue
+
+                module_names.append (module_name)
+
+            if  not module_names :
+                return
+
+            # load in registry order, so that the adaptor preference is the
+            # same as for eager loading
+            module_names.sort (key=lambda m: self._registry_rank[m])
+
+            for module_name in module_names :
+                del (self._lazy_pending[module_name])
+                self._load_adaptor (module_name)
+
+            self._write_manifest ()
+
+            for ctype in self._adaptor_registry :
+                for schema in self._adaptor_registry[ctype] :
+                    self._adaptor_registry[ctype][schema].sort (
+                            key=lambda info: self._registry_rank.get (info['adaptor_module'], -1))
+
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _load_adaptor (self, module_name) :
+        """ Load a single adaptor module, check its adaptor info and cpi
+            classes, and add those to the adaptor registry.
+        """
+
+        # get the engine config options
+        global_config = sconf.getConfig()
+
+
+        self._logger.info ("Loading  adaptor %s"  %  module_name)
+
+
+        # first, import the module
+        adaptor_module = None
+        try :
+            adaptor_module = __import__ (module_name, fromlist=['Adaptor'])
 
+        except Exception as e:
+            self._logger.error ("Skipping adaptor %s 1: module loading failed: %s" % (module_name, e))
+            self._logger.trace ()
+            return # skip this adaptor
 
-            adaptor_name    = adaptor_info['name']
-            adaptor_version = adaptor_info['version']
-            adaptor_schemas = adaptor_info['schemas']
-            adaptor_enabled = True   # default unless disabled by 'enabled' option or version filer
 
-            # disable adaptors in 'alpha' or 'beta' versions -- unless
-            # the 'load_beta_adaptors' config option is set to True
-            if not self._cfg['load_beta_adaptors'].get_value () :
+        # we expect the module to have an 'Adaptor' class
+        # implemented, which, on calling 'register()', returns
+        # a info dict for all implemented adaptor classes.
+        adaptor_instance = None
+        adaptor_info     = None
 
-                if 'alpha' in adaptor_version.lower() or \
-                   'beta'  in adaptor_version.lower()    :
+        try: 
+            adaptor_instance = adaptor_module.Adaptor ()
+            adaptor_info     = adaptor_instance.register ()
 
-                    self._logger.warn ("Skipping adaptor %s: beta versions are disabled (%s)" \
-                                    % (module_name, adaptor_version))
-                    continue  # skip to next adaptor
+        except se.SagaException as e:
+            self._logger.error ("Skipping adaptor %s: loading failed: '%s'" % (module_name, e))
+          # self._logger.trace ()
+            return # skip this adaptor
 
+        except Exception as e:
+            self._logger.error ("Skipping adaptor %s: loading failed: '%s'" % (module_name, e))
+          # self._logger.trace ()
+            return # skip this adaptor
 
-            # get the 'enabled' option in the adaptor's config
-            # section (saga.cpi.base ensures that the option exists,
-            # if it is initialized correctly in the adaptor class.
-            adaptor_config  = None
-            adaptor_enabled = False
+
+        # the adaptor must also provide a sanity_check() method, which sould
+        # be used to confirm that the adaptor can function properly in the
+        # current runtime environment (e.g., that all pre-requisites and
+        # system dependencies are met).
+        try: 
+            adaptor_instance.sanity_check ()
+
+        except Exception as e:
+            self._logger.error ("Skipping adaptor %s: failed self test: %s" % (module_name, e))
+          # self._logger.trace ()
+            return # skip this adaptor
+
+
+        # check if we have a valid adaptor_info
+        if adaptor_info is None :
+            self._logger.warning ("Skipping adaptor %s: adaptor meta data are invalid" \
+                               % module_name)
+            self._logger.trace ()
+            return # skip this adaptor
+
+
+        if  not 'name'    in adaptor_info or \
+            not 'cpis'    in adaptor_info or \
+            not 'version' in adaptor_info or \
+            not 'schemas' in adaptor_info    :
+            self._logger.warning ("Skipping adaptor %s: adaptor meta data are incomplete" \
+                               % module_name)
+            self._logger.trace ()
+            return # skip this adaptor
+
+
+        adaptor_name    = adaptor_info['name']
+        adaptor_version = adaptor_info['version']
+        adaptor_schemas = adaptor_info['schemas']
+        adaptor_enabled = True   # default unless disabled by 'enabled' option or version filer
+
+        # disable adaptors in 'alpha' or 'beta' versions -- unless
+        # the 'load_beta_adaptors' config option is set to True
+        if not self._cfg['load_beta_adaptors'].get_value () :
+
+            if 'alpha' in adaptor_version.lower() or \
+               'beta'  in adaptor_version.lower()    :
+
+                self._logger.warn ("Skipping adaptor %s: beta versions are disabled (%s)" \
+                                % (module_name, adaptor_version))
+                return # skip this adaptor
+
+
+        # get the 'enabled' option in the adaptor's config
+        # section (saga.cpi.base ensures that the option exists,
+        # if it is initialized correctly in the adaptor class.
+        adaptor_config  = None
+        adaptor_enabled = False
+
+        try :
+            adaptor_config  = global_config.get_category (adaptor_name)
+            adaptor_enabled = adaptor_config['enabled'].get_value ()
+
+        except se.SagaException as e:
+            self._logger.error ("Skipping adaptor %s: initialization failed: %s" % (module_name, e))
+            self._logger.trace ()
+            return # skip this adaptor
+        except Exception as e:
+            self._logger.error ("Skipping adaptor %s: initialization failed: %s" % (module_name, e))
+            return # skip this adaptor
+
+
+        # only load adaptor if it is not disabled via config files
+        if adaptor_enabled == False :
+            self._logger.info ("Skipping adaptor %s: 'enabled' set to False" \
+                            % (module_name))
+            return # skip this adaptor
+
+
+        # check if the adaptor has anything to register
+        if 0 == len (adaptor_info['cpis']) :
+            self._logger.warn ("Skipping adaptor %s: does not register any cpis" \
+                            % (module_name))
+            return # skip this adaptor
+
+
+        # cpis which have been checked on an earlier run (according to the
+        # adaptor manifest) are not checked again.
+        checked_cpis  = []
+        manifest_cpis = []
+
+        entry = self._get_manifest_entry (module_name)
+        if  entry :
+            checked_cpis = entry['cpis']
+
+
+        # we got an enabled adaptor with valid info - yay!  We can
+        # now register all adaptor classes (cpi implementations).
+        for cpi_info in adaptor_info['cpis'] :
+
+            # check cpi information details for completeness
+            if  not 'type'    in cpi_info or \
+                not 'class'   in cpi_info    :
+                self._logger.info ("Skipping adaptor %s cpi: cpi info detail is incomplete" \
+                                % (module_name))
+                continue # skip to next cpi info
+
+
+            # adaptor classes are registered for specific API types.
+            cpi_type  = cpi_info['type']
+            cpi_cname = cpi_info['class']
+            cpi_class = None
 
             try :
-                adaptor_config  = global_config.get_category (adaptor_name)
-                adaptor_enabled = adaptor_config['enabled'].get_value ()
+                cpi_class = getattr (adaptor_module, cpi_cname)
 
-            except se.SagaException as e:
-                self._logger.error ("Skipping adaptor %s: initialization failed: %s" % (module_name, e))
-                self._logger.trace ()
-                continue # skip to next adaptor
             except Exception as e:
-                self._logger.error ("Skipping adaptor %s: initialization failed: %s" % (module_name, e))
+                # this exception likely means that the adaptor does
+                # not call the saga.adaptors.Base initializer (correctly)
+                self._logger.warning ("Skipping adaptor %s: adaptor class invalid %s: %s" \
+                                   % (module_name, cpi_info['class'], str(e)))
                 continue # skip to next adaptor
 
+            # make sure the cpi class is a valid cpi for the given type --
+            # unless the adaptor manifest says we checked that before.
+            if  not [cpi_type, cpi_cname] in checked_cpis and \
+                not self._check_cpi (module_name, cpi_type, cpi_class) :
+                continue # skip to next cpi info
 
-            # only load adaptor if it is not disabled via config files
-            if adaptor_enabled == False :
-                self._logger.info ("Skipping adaptor %s: 'enabled' set to False" \
-                                % (module_name))
-                continue # skip to next adaptor
+            manifest_cpis.append ([cpi_type, cpi_cname])
 
 
-            # check if the adaptor has anything to register
-            if 0 == len (adaptor_info['cpis']) :
-                self._logger.warn ("Skipping adaptor %s: does not register any cpis" \
-                                % (module_name))
-                continue # skip to next adaptor
+            # finally, register the cpi for all its schemas!
+            registered_schemas = list()
+            for adaptor_schema in adaptor_schemas:
+
+                adaptor_schema = adaptor_schema.lower ()
+
+                # make sure we can register that cpi type
+                if not cpi_type in self._adaptor_registry :
+                    self._adaptor_registry[cpi_type] = {}
+
+                # make sure we can register that schema
+                if not adaptor_schema in self._adaptor_registry[cpi_type] :
+                    self._adaptor_registry[cpi_type][adaptor_schema] = []
+
+                # we register the cpi class, so that we can create
+                # instances as needed, and the adaptor instance,
+                # as that is passed to the cpi class c'tor later
+                # on (the adaptor instance is used to share state
+                # between cpi instances, amongst others)
+                info = {'cpi_cname'        : cpi_cname, 
+                        'cpi_class'        : cpi_class, 
+                        'adaptor_name'     : adaptor_name,
+                        'adaptor_module'   : module_name,
+                        'adaptor_instance' : adaptor_instance}
+
+                # make sure this tuple was not registered, yet
+                if info in self._adaptor_registry[cpi_type][adaptor_schema] :
+
+                    self._logger.error ("Skipping adaptor %s: already registered '%s - %s'" \
+                                     % (module_name, cpi_class, adaptor_instance))
+                    continue  # skip to next cpi info
+
+                self._adaptor_registry[cpi_type][adaptor_schema].append(info)
+                registered_schemas.append(str("%s://" % adaptor_schema))
+
+            self._logger.info("Register adaptor %s for %s API with URL scheme(s) %s" %
+                                  (module_name,
+                                   cpi_type,
+                                   registered_schemas))
+
+
+        # remember the checked cpis for the next run
+        self._set_manifest_entry (module_name, adaptor_module, adaptor_info, manifest_cpis)
+
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _read_manifest (self) :
+        """ The adaptor manifest caches, for each adaptor module, the cpis
+            which passed _check_cpi(), and the API types and URL schemas the
+            module serves (which are also used as index for lazy adaptor
+            loading).  Entries are keyed on the module file's mtime, so that
+            changed adaptors are checked again.  A manifest written by
+            a different saga version is ignored.
+        """
+
+        self._manifest       = None
+        self._manifest_dirty = False
+
+        path = self._cfg['adaptor_manifest'].get_value ()
+        if  not path :
+            return
+
+        self._manifest = {'version'  : _MANIFEST_VERSION,
+                          'saga'     : sver.version,
+                          'adaptors' : {}}
+
+        try :
+            f = open (os.path.expanduser (path), 'r')
+            manifest = json.load (f)
+            f.close ()
+
+        except Exception as e :
+            self._logger.debug ("no adaptor manifest at %s: %s" % (path, e))
+            return
+
+        if  not isinstance (manifest, dict)                      or \
+            manifest.get ('version')  != self._manifest['version'] or \
+            manifest.get ('saga')     != self._manifest['saga']    or \
+            not isinstance (manifest.get ('adaptors'), dict)        :
+            self._logger.info ("ignoring outdated adaptor manifest at %s" % path)
+            return
+
+        self._manifest['adaptors'] = manifest['adaptors']
 
 
-            # we got an enabled adaptor with valid info - yay!  We can
-            # now register all adaptor classes (cpi implementations).
-            for cpi_info in adaptor_info['cpis'] :
-
-                # check cpi information details for completeness
-                if  not 'type'    in cpi_info or \
-                    not 'class'   in cpi_info    :
-                    self._logger.info ("Skipping adaptor %s cpi: cpi info detail is incomplete" \
-                                    % (module_name))
-                    continue # skip to next cpi info
-
-
-                # adaptor classes are registered for specific API types.
-                cpi_type  = cpi_info['type']
-                cpi_cname = cpi_info['class']
-                cpi_class = None
-
-                try :
-                    cpi_class = getattr (adaptor_module, cpi_cname)
-
-                except Exception as e:
-                    # this exception likely means that the adaptor does
-                    # not call the saga.adaptors.Base initializer (correctly)
-                    self._logger.warning ("Skipping adaptor %s: adaptor class invalid %s: %s" \
-                                       % (module_name, cpi_info['class'], str(e)))
-                    continue # skip to next adaptor
-
-                # make sure the cpi class is a valid cpi for the given type.
-                # We walk through the list of known modules, and try to find
-                # a modules which could have that class.  We do the following
-                # tests:
-                #
-                #   cpi_class: ShellJobService
-                #   cpi_type:  saga.job.Service
-                #   modules:   saga.adaptors.cpi.job
-                #   modules:   saga.adaptors.cpi.job.service
-                #   classes:   saga.adaptors.cpi.job.Service
-                #   classes:   saga.adaptors.cpi.job.service.Service
-                #
-                #   cpi_class: X509Context
-                #   cpi_type:  saga.Context
-                #   modules:   saga.adaptors.cpi.context
-                #   classes:   saga.adaptors.cpi.context.Context
-                #
-                # So, we add a 'adaptors.cpi' after the 'saga' namespace
-                # element, then append the rest of the given namespace.  If that
-                # gives a module which has the requested class, fine -- if not,
-                # we add a lower cased version of the class name as last
-                # namespace element, and check again.
-
-                # ->   saga .  job .  Service 
-                # <- ['saga', 'job', 'Service']
-                cpi_type_nselems = cpi_type.split ('.')
-
-                if  len(cpi_type_nselems) < 2 or \
-                    len(cpi_type_nselems) > 3    :
-                    self._logger.error ("Skipping adaptor %s: cpi type not valid: '%s'" \
-                                     % (module_name, cpi_type))
-                    continue # skip to next cpi info
-
-                if cpi_type_nselems[0] != 'saga' :
-                    self._logger.error ("Skipping adaptor %s: cpi namespace not valid: '%s'" \
-                                     % (module_name, cpi_type))
-                    continue # skip to next cpi info
-
-                # -> ['saga',                    'job', 'Service'] 
-                # <- ['saga', 'adaptors', 'cpi', 'job', 'Service']
-                cpi_type_nselems.insert (1, 'adaptors')
-                cpi_type_nselems.insert (2, 'cpi')
-
-                # -> ['saga', 'adaptors', 'cpi', 'job',  'Service']
-                # <- ['saga', 'adaptors', 'cpi', 'job'], 'Service'
-                cpi_type_cname = cpi_type_nselems.pop ()
-
-                # -> ['saga', 'adaptors', 'cpi', 'job'], 'Service'
-                # <-  'saga.adaptors.cpi.job
-                # <-  'saga.adaptors.cpi.job.service
-                cpi_type_modname_1 = '.'.join (cpi_type_nselems)
-                cpi_type_modname_2 = '.'.join (cpi_type_nselems + [cpi_type_cname.lower()])
-
-                # does either module exist?
-                cpi_type_modname = None
-                if  cpi_type_modname_1 in sys.modules :
-                    cpi_type_modname = cpi_type_modname_1 
-
-                if  cpi_type_modname_2 in sys.modules :
-                    cpi_type_modname = cpi_type_modname_2 
-
-                if  not cpi_type_modname :
-                    self._logger.error ("Skipping adaptor %s: cpi type not known: '%s'" \
-                                     % (module_name, cpi_type))
-                    continue # skip to next cpi info
-
-                # so, make sure the given cpi is actually
-                # implemented by the adaptor class
-                cpi_ok = False
-                for name, cpi_obj in inspect.getmembers (sys.modules[cpi_type_modname]) :
-                    if  name == cpi_type_cname      and \
-                        inspect.isclass (cpi_obj)       :
-                        if  issubclass (cpi_class, cpi_obj) :
-                            cpi_ok = True
-
-                if not cpi_ok :
-                    self._logger.error ("Skipping adaptor %s: doesn't implement cpi '%s (%s)'" \
-                                     % (module_name, cpi_class, cpi_type))
-                    continue # skip to next cpi info
-
-
-                # finally, register the cpi for all its schemas!
-                registered_schemas = list()
-                for adaptor_schema in adaptor_schemas:
-
-                    adaptor_schema = adaptor_schema.lower ()
-
-                    # make sure we can register that cpi type
-                    if not cpi_type in self._adaptor_registry :
-                        self._adaptor_registry[cpi_type] = {}
-
-                    # make sure we can register that schema
-                    if not adaptor_schema in self._adaptor_registry[cpi_type] :
-                        self._adaptor_registry[cpi_type][adaptor_schema] = []
-
-                    # we register the cpi class, so that we can create
-                    # instances as needed, and the adaptor instance,
-                    # as that is passed to the cpi class c'tor later
-                    # on (the adaptor instance is used to share state
-                    # between cpi instances, amongst others)
-                    info = {'cpi_cname'        : cpi_cname, 
-                            'cpi_class'        : cpi_class, 
-                            'adaptor_name'     : adaptor_name,
-                            'adaptor_instance' : adaptor_instance}
-
-                    # make sure this tuple was not registered, yet
-                    if info in self._adaptor_registry[cpi_type][adaptor_schema] :
-
-                        self._logger.error ("Skipping adaptor %s: already registered '%s - %s'" \
-                                         % (module_name, cpi_class, adaptor_instance))
-                        continue  # skip to next cpi info
-
-                    self._adaptor_registry[cpi_type][adaptor_schema].append(info)
-                    registered_schemas.append(str("%s://" % adaptor_schema))
-
-                self._logger.info("Register adaptor %s for %s API with URL scheme(s) %s" %
-                                      (module_name,
-                                       cpi_type,
-                                       registered_schemas))
+    #-----------------------------------------------------------------
+    # 
+    def _write_manifest (self) :
+
+        if  not self._manifest or not self._manifest_dirty :
+            return
+
+        path = os.path.expanduser (self._cfg['adaptor_manifest'].get_value ())
+        tmp  = "%s.%d" % (path, os.getpid ())
+
+        try :
+            if  not os.path.isdir (os.path.dirname (path)) :
+                os.makedirs (os.path.dirname (path))
+
+            # write to a temporary file first, so that concurrently starting
+            # processes never see a partial manifest
+            f = open (tmp, 'w')
+            json.dump (self._manifest, f, indent=2, sort_keys=True)
+            f.close ()
+            os.rename (tmp, path)
+
+            self._manifest_dirty = False
+
+        except Exception as e :
+            self._logger.warning ("could not write adaptor manifest %s: %s" % (path, e))
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _get_manifest_entry (self, module_name) :
+        """ Return the manifest entry for the given adaptor module, if the
+            module file did not change since the entry was written.
+        """
+
+        if  not self._manifest or \
+            not module_name in self._manifest['adaptors'] :
+            return None
+
+        entry = self._manifest['adaptors'][module_name]
+
+        try :
+            if  os.path.getmtime (entry['file']) != entry['mtime'] :
+                return None
+
+        except Exception :
+            return None
+
+        return entry
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _set_manifest_entry (self, module_name, adaptor_module, adaptor_info, cpis) :
+
+        if  not self._manifest :
+            return
+
+        try :
+            # we key on the source file, not on the compiled one
+            fname = adaptor_module.__file__
+            if  fname[-4:] in ['.pyc', '.pyo'] and os.path.exists (fname[:-1]) :
+                fname = fname[:-1]
+
+            entry = {'file'    : fname,
+                     'mtime'   : os.path.getmtime (fname),
+                     'name'    : adaptor_info['name'],
+                     'types'   : sorted (set ([cpi[0] for cpi in cpis])),
+                     'schemas' : [schema.lower () for schema in adaptor_info['schemas']],
+                     'cpis'    : cpis}
+
+        except Exception as e :
+            self._logger.debug ("no manifest entry for %s: %s" % (module_name, e))
+            return
+
+        if  self._manifest['adaptors'].get (module_name) != entry :
+            self._manifest['adaptors'][module_name] = entry
+            self._manifest_dirty = True
+
 
+    #-----------------------------------------------------------------
+    # 
+    def _check_cpi (self, module_name, cpi_type, cpi_class) :
+        """ Check if the given adaptor class is a valid implementation of the
+            given cpi type.  This is the expensive part of adaptor loading,
+            which is skipped for cpis recorded in the adaptor manifest.
+        """
+
+        # make sure the cpi class is a valid cpi for the given type.
+        # We walk through the list of known modules, and try to find
+        # a modules which could have that class.  We do the following
+        # tests:
+        #
+        #   cpi_class: ShellJobService
+        #   cpi_type:  saga.job.Service
+        #   modules:   saga.adaptors.cpi.job
+        #   modules:   saga.adaptors.cpi.job.service
+        #   classes:   saga.adaptors.cpi.job.Service
+        #   classes:   saga.adaptors.cpi.job.service.Service
+        #
+        #   cpi_class: X509Context
+        #   cpi_type:  saga.Context
+        #   modules:   saga.adaptors.cpi.context
+        #   classes:   saga.adaptors.cpi.context.Context
+        #
+        # So, we add a 'adaptors.cpi' after the 'saga' namespace
+        # element, then append the rest of the given namespace.  If that
+        # gives a module which has the requested class, fine -- if not,
+        # we add a lower cased version of the class name as last
+        # namespace element, and check again.
+
+        # ->   saga .  job .  Service 
+        # <- ['saga', 'job', 'Service']
+        cpi_type_nselems = cpi_type.split ('.')
+
+        if  len(cpi_type_nselems) < 2 or \
+            len(cpi_type_nselems) > 3    :
+            self._logger.error ("Skipping adaptor %s: cpi type not valid: '%s'" \
+                             % (module_name, cpi_type))
+            return False
+
+        if cpi_type_nselems[0] != 'saga' :
+            self._logger.error ("Skipping adaptor %s: cpi namespace not valid: '%s'" \
+                             % (module_name, cpi_type))
+            return False
+
+        # -> ['saga',                    'job', 'Service'] 
+        # <- ['saga', 'adaptors', 'cpi', 'job', 'Service']
+        cpi_type_nselems.insert (1, 'adaptors')
+        cpi_type_nselems.insert (2, 'cpi')
+
+        # -> ['saga', 'adaptors', 'cpi', 'job',  'Service']
+        # <- ['saga', 'adaptors', 'cpi', 'job'], 'Service'
+        cpi_type_cname = cpi_type_nselems.pop ()
+
+        # -> ['saga', 'adaptors', 'cpi', 'job'], 'Service'
+        # <-  'saga.adaptors.cpi.job
+        # <-  'saga.adaptors.cpi.job.service
+        cpi_type_modname_1 = '.'.join (cpi_type_nselems)
+        cpi_type_modname_2 = '.'.join (cpi_type_nselems + [cpi_type_cname.lower()])
+
+        # does either module exist?
+        cpi_type_modname = None
+        if  cpi_type_modname_1 in sys.modules :
+            cpi_type_modname = cpi_type_modname_1 
+
+        if  cpi_type_modname_2 in sys.modules :
+            cpi_type_modname = cpi_type_modname_2 
+
+        if  not cpi_type_modname :
+            self._logger.error ("Skipping adaptor %s: cpi type not known: '%s'" \
+                             % (module_name, cpi_type))
+            return False
+
+        # so, make sure the given cpi is actually
+        # implemented by the adaptor class
+        cpi_ok = False
+        for name, cpi_obj in inspect.getmembers (sys.modules[cpi_type_modname]) :
+            if  name == cpi_type_cname      and \
+                inspect.isclass (cpi_obj)       :
+                if  issubclass (cpi_class, cpi_obj) :
+                    cpi_ok = True
+
+        if not cpi_ok :
+            self._logger.error ("Skipping adaptor %s: doesn't implement cpi '%s (%s)'" \
+                             % (module_name, cpi_class, cpi_type))
+            return False
+
+        return True
 
 
     #-----------------------------------------------------------------
@@ -449,6 +758,8 @@ class Engine(sconf.Configurable):
             name)
         '''
 
+        self._load_lazy (ctype, schema)
+
         if not ctype in self._adaptor_registry :
             return []
 
@@ -479,6 +790,13 @@ class Engine(sconf.Configurable):
                     if ( info['adaptor_name'] == adaptor_name ) :
                         return info['adaptor_instance']
 
+        # the adaptor may not have been loaded yet -- but we only know its
+        # module name, not the adaptor name, so we need to load all deferred
+        # modules before looking again.
+        if  self._lazy_pending :
+            self._load_lazy ()
+            return self.get_adaptor (adaptor_name)
+
         error_msg = "No adaptor named '%s' found" % adaptor_name
         self._logger.error(error_msg)
         raise se.NoSuccess(error_msg)
@@ -495,8 +813,16 @@ class Engine(sconf.Configurable):
         If 'preferred_adaptor' is not 'None', only that given adaptors is
         considered, and adaptor classes are only created from that specific
         adaptor.
+
+        Successful and failed bindings are remembered in the binding cache
+        (see 'bind_cache_ttl').  Note that only the instantiation of the
+        adaptor class is covered: init_instance() is called later on by the
+        API object (see saga.base.Base), and its failures are neither retried
+        over other adaptors, nor cached.
         '''
 
+        self._load_lazy (ctype, schema)
+
         if not ctype in self._adaptor_registry:
             error_msg = "No adaptor found for '%s' and URL scheme %s://" \
                                   % (ctype, schema)
@@ -510,10 +836,37 @@ class Engine(sconf.Configurable):
             raise se.NotImplemented(error_msg)
 
 
+        # check the binding cache: a known good adaptor is tried first, known
+        # bad adaptors are skipped (but their exceptions are still reported).
+        # The exceptions are only collected here, and are stacked when no
+        # adaptor could be bound.
+        exceptions = list ()
+        key        = self._get_bind_key (ctype, schema, args)
+        infos     = self._adaptor_registry[ctype][schema]
+        (good, bad) = self._get_bind_cache (key)
+
+        if  good or bad :
+
+            ordered = []
+            for info in infos :
+
+                if  info['adaptor_name'] == good :
+                    ordered.insert (0, info)
+
+                elif info['adaptor_name'] in bad :
+                    self._logger.debug ("bind_adaptor for %s : skip known bad adaptor %s" \
+                                     % (info['cpi_cname'], info['adaptor_name']))
+                    exceptions.append (bad[info['adaptor_name']])
+
+                else :
+                    ordered.append (info)
+
+            infos = ordered
+
+
         # cycle through all applicable adaptors, and try to instantiate
         # a matching one.
-        exception = saga.NoSuccess ("binding adaptor failed", api_instance)
-        for info in self._adaptor_registry[ctype][schema] :
+        for info in infos :
 
             cpi_cname        = info['cpi_cname']
             cpi_class        = info['cpi_class']
@@ -535,6 +888,8 @@ class Engine(sconf.Configurable):
                 # instantiate cpi
                 cpi_instance = cpi_class (api_instance, adaptor_instance)
 
+                self._set_bind_cache (key, adaptor_name, None)
+
               # self._logger.debug("Successfully bound %s.%s to %s" \
               #                  % (adaptor_name, cpi_cname, api_instance))
                 return cpi_instance
@@ -542,26 +897,185 @@ class Engine(sconf.Configurable):
 
             except se.SagaException as e :
                 # adaptor class initialization failed - try next one
-                exception._add_exception (e)
+                exceptions.append (e)
+                self._set_bind_cache (key, adaptor_name, e)
                 self._logger.info  ("bind_adaptor adaptor class ctor failed : %s.%s: %s" \
                                  % (adaptor_name, cpi_class, str(e)))
                 self._logger.trace ()
                 continue
             except Exception as e :
-                exception._add_exception (saga.NoSuccess (str(e), api_instance))
+                exceptions.append (saga.NoSuccess (str(e), api_instance))
+                self._set_bind_cache (key, adaptor_name, saga.NoSuccess (str(e)))
                 self._logger.info ("bind_adaptor adaptor class ctor failed : %s.%s: %s" \
                                 % (adaptor_name, cpi_class, str(e)))
                 continue
 
 
+        exception = saga.NoSuccess ("binding adaptor failed", api_instance)
+        for e in exceptions :
+            exception._add_exception (e)
+
         self._logger.error ("No suitable adaptor found for '%s' and URL scheme '%s'" %  (ctype, schema))
         self._logger.info  ("%s" %  (str(exception)))
         raise exception._get_exception_stack ()
 
 
+    #-----------------------------------------------------------------
+    # 
+    def _get_bind_key (self, ctype, schema, args) :
+        """ The binding cache is keyed by API type, URL schema, and by the
+            host and session found in the API object's c'tor arguments.  As
+            all default sessions share the same context list, sessions are
+            identified by their context list: on first use, the list gets
+            a unique id (object ids would get reused after garbage collection).
+        """
+
+        host    = None
+        session = None
+
+        for arg in args :
+            if  host    is None and isinstance (arg, saga.Url)     : host    = arg.host
+            if  session is None and isinstance (arg, saga.Session) : session = self._get_session_id (arg)
+
+        return (ctype, schema, host, session)
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _get_session_id (self, session) :
+        """ Return the binding cache id of the session's context list. """
+
+        with self._bind_lock :
+
+            contexts = session.contexts
+
+            if  not hasattr (contexts, '_bind_session_id') :
+                contexts._bind_session_id = self._bind_session_ids.next ()
+
+            return contexts._bind_session_id
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _get_bind_cache (self, key) :
+        """ Return the name of the known good adaptor, and a dict of known
+            bad adaptor names with their exceptions, for the given cache key.
+            Entries older than 'bind_cache_ttl' are dropped.
+        """
+
+        ttl = self._cfg['bind_cache_ttl'].get_value ()
+
+        if  ttl <= 0 :
+            return (None, {})
+
+        with self._bind_lock :
+
+            if  not key in self._bind_cache :
+                return (None, {})
+
+            entry = self._bind_cache[key]
+            limit = time.time () - ttl
+            good  = None
+            bad   = {}
+
+            if  entry['good'] and entry['good'][1] > limit :
+                good = entry['good'][0]
+            else :
+                entry['good'] = None
+
+            for adaptor_name in entry['bad'].keys () :
+                if  entry['bad'][adaptor_name][1] > limit :
+                    bad[adaptor_name] = entry['bad'][adaptor_name][0]
+                else :
+                    del (entry['bad'][adaptor_name])
+
+            return (good, bad)
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _set_bind_cache (self, key, adaptor_name, exception) :
+        """ Record a successful (exception is None) or failed binding.  When
+            new keys are added, expired entries are swept (at most once per
+            'bind_cache_ttl'), so that keys of gone sessions and hosts do not
+            pile up.
+        """
+
+        ttl = self._cfg['bind_cache_ttl'].get_value ()
+
+        if  ttl <= 0 :
+            return
+
+        with self._bind_lock :
+
+            now = time.time ()
+
+            if  not key in self._bind_cache :
+
+                if  now - self._bind_swept > ttl :
+                    self._sweep_bind_cache (now - ttl)
+                    self._bind_swept = now
+
+                self._bind_cache[key] = {'good' : None, 'bad' : {}}
+
+            entry = self._bind_cache[key]
+
+            if  exception is None :
+                entry['good'] = (adaptor_name, now)
+                if  adaptor_name in entry['bad'] :
+                    del (entry['bad'][adaptor_name])
+
+            else :
+                entry['bad'][adaptor_name] = (exception, now)
+                if  entry['good'] and entry['good'][0] == adaptor_name :
+                    entry['good'] = None
+
+
+    #-----------------------------------------------------------------
+    # 
+    def _sweep_bind_cache (self, limit) :
+        """ Drop all cache entries which were not updated since 'limit'. """
+
+        with self._bind_lock :
+
+            for key in self._bind_cache.keys () :
+
+                entry  = self._bind_cache[key]
+                stamps = [stamp for (_, stamp) in entry['bad'].values ()]
+
+                if  entry['good'] :
+                    stamps.append (entry['good'][1])
+
+                if  not stamps or max (stamps) <= limit :
+                    del (self._bind_cache[key])
+
+
+    #-----------------------------------------------------------------
+    # 
+    def invalidate_bindings (self, ctype=None, schema=None, host=None) :
+        """ Drop entries from the binding cache.  Without arguments, the
+            complete cache is cleared -- otherwise only those entries which
+            match the given API type, URL schema and/or host.
+        """
+
+        with self._bind_lock :
+
+            for key in self._bind_cache.keys () :
+
+                if  ctype  and key[0] != ctype          : continue
+                if  schema and key[1] != schema.lower() : continue
+                if  host   and key[2] != host           : continue
+
+                del (self._bind_cache[key])
+
+
     #-----------------------------------------------------------------
     # 
     def loaded_adaptors (self):
+
+        # make sure the full registry is visible
+        self._load_lazy ()
+
         return self._adaptor_registry
 
 
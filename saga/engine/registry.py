@@ -32,3 +32,55 @@ adaptor_registry = [
                     "saga.adaptors.http.http_file",
                     "saga.adaptors.aws.ec2_resource"
                    ]
+
+"""
+Index of the API types and URL schemas served by the registered adaptor modules.
+
+If the 'saga.engine.lazy_adaptor_loading' option is enabled, the engine will
+not load the adaptor modules listed above on startup, but uses this index to
+find out which modules to load once an API object needs to bind to an adaptor
+for a specific API type and URL schema.  Modules which are not listed here are
+always loaded on startup.  The index needs to be kept in sync with the
+adaptor's '_ADAPTOR_INFO' (schemas are case insensitive, and are listed in
+lower case here).
+"""
+
+adaptor_index = {
+    "saga.adaptors.context.myproxy"  : {'types'   : ['saga.Context'],
+                                        'schemas' : ['myproxy']},
+    "saga.adaptors.context.x509"     : {'types'   : ['saga.Context'],
+                                        'schemas' : ['x509']},
+    "saga.adaptors.context.ssh"      : {'types'   : ['saga.Context'],
+                                        'schemas' : ['ssh']},
+    "saga.adaptors.context.userpass" : {'types'   : ['saga.Context'],
+                                        'schemas' : ['userpass']},
+    "saga.adaptors.shell.shell_job"  : {'types'   : ['saga.job.Service',
+                                                     'saga.job.Job'],
+                                        'schemas' : ['fork', 'local', 'ssh', 'gsissh']},
+    "saga.adaptors.shell.shell_file" : {'types'   : ['saga.namespace.Directory',
+                                                     'saga.namespace.Entry',
+                                                     'saga.filesystem.Directory',
+                                                     'saga.filesystem.File'],
+                                        'schemas' : ['file', 'local', 'sftp', 'gsiftp',
+                                                     'ssh', 'gsissh']},
+    "saga.adaptors.sge.sgejob"       : {'types'   : ['saga.job.Service',
+                                                     'saga.job.Job'],
+                                        'schemas' : ['sge', 'sge+ssh', 'sge+gsissh']},
+    "saga.adaptors.pbs.pbsjob"       : {'types'   : ['saga.job.Service',
+                                                     'saga.job.Job'],
+                                        'schemas' : ['pbs', 'pbs+ssh', 'pbs+gsissh']},
+    "saga.adaptors.condor.condorjob" : {'types'   : ['saga.job.Service',
+                                                     'saga.job.Job'],
+                                        'schemas' : ['condor', 'condor+ssh', 'condor+gsissh']},
+    "saga.adaptors.slurm.slurm_job"  : {'types'   : ['saga.job.Service',
+                                                     'saga.job.Job'],
+                                        'schemas' : ['slurm', 'slurm+ssh', 'slurm+gsissh']},
+    "saga.adaptors.http.http_file"   : {'types'   : ['saga.namespace.Entry',
+                                                     'saga.filesystem.File'],
+                                        'schemas' : ['http', 'https']},
+    "saga.adaptors.aws.ec2_resource" : {'types'   : ['saga.Context',
+                                                     'saga.resource.Manager',
+                                                     'saga.resource.Compute'],
+                                        'schemas' : ['ec2', 'ec2_keypair']}
+}
+
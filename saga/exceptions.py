@@ -68,14 +68,20 @@ class SagaException (sue.ExceptionBase) :
         :param object:  The object that has caused the exception, default is
                         None.
         """
-        sue.ExceptionBase.__init__ (self, message)
+        # exceptions are frequently raised and catched in normal control flow
+        # (think of adaptor binding), so we only keep a cheap stack summary
+        # here -- the traceback and messages are rendered on first access.  We
+        # don't call the ExceptionBase c'tor, as that would capture the stack
+        # a second time.
+        Exception.__init__ (self, message)
 
         self._type          = self.__class__.__name__
         self._message       = message
-        self._messages      = [self.get_message ()]
+        self._messages      = None
         self._exceptions    = [self]
         self._top_exception = self
-        self._traceback     = sue.get_traceback (1)
+        self._traceback     = None
+        self._stack         = sue.get_stack (1)
 
         if api_object : 
             self._object    = weakref.ref (api_object)
@@ -93,6 +99,7 @@ class SagaException (sue.ExceptionBase) :
         clone._messages  = self._messages
         clone._exception = self._exceptions
         clone._traceback = self._traceback
+        clone._stack     = self._stack
         clone._type      = self._type
 
         return clone
@@ -169,7 +176,7 @@ class SagaException (sue.ExceptionBase) :
         """
 
         self._exceptions.append (e)
-        self._messages.append   (e.message)
+        self.get_all_messages ().append (e.message)
 
         if e._rank > self._top_exception._rank :
             self._top_exception = e
@@ -219,6 +226,10 @@ class SagaException (sue.ExceptionBase) :
   # @sus.takes   ('SagaException')
   # @sus.returns (sus.list_of (basestring))
     def get_all_messages (self) :
+
+        if  self._messages is None :
+            self._messages = [self.get_message ()]
+
         return self._messages
 
 
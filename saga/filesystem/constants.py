@@ -20,6 +20,7 @@ READ           =                         512
 WRITE          =                        1024
 READ_WRITE     =                        1536
 BINARY         =                        2048
+SYNC           =                        4096
 
 # filesystem seek_mode enum:
 START          = "Start"
@@ -18,6 +18,7 @@ CREATE_PARENTS =   64
 # WRITE        = 1024 # reserved
 # READ_WRITE   = 1536 # reserved
 # BINARY       = 2048 # reserved
+# SYNC         = 4096 # reserved
 
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
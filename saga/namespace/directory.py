@@ -314,7 +314,7 @@ class Directory (entry.Entry) :
                   sus.optional ((surl.Url, basestring)), 
                   sus.optional (int),
                   sus.optional (sus.one_of (SYNC, ASYNC, TASK)))
-    @sus.returns ((sus.nothing, st.Task))
+    @sus.returns ((sus.nothing, dict, st.Task))
     def copy (self, url_1, url_2=None, flags=0, ttype=None) :
         '''
         :param src: path of the entry to copy
@@ -324,7 +324,7 @@ class Directory (entry.Entry) :
         url_2:         saga.Url / None
         flags:         flags enum / None
         ttype:         saga.task.type enum / None
-        ret:           None / saga.Task
+        ret:           None / dict / saga.Task
         
         Copy an entry from source to target
 
@@ -334,6 +334,9 @@ class Directory (entry.Entry) :
             # copy an entry
             dir = saga.namespace.Directory("sftp://localhost/tmp/")
             dir.copy ("./data.bin", "sftp://localhost/tmp/data/")
+
+        Adaptors may return a dict with transfer statistics, for example for
+        a :data:`saga.filesystem.SYNC` copy (see the shell file adaptor).
         '''
 
         # FIXME: re-implement the url switching (commented out below)
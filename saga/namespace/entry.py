@@ -235,13 +235,13 @@ class Entry (sb.Base, sasync.Async) :
     @sus.takes   ('Entry',
                   (surl.Url, basestring),
                   sus.optional (sus.one_of (SYNC, ASYNC, TASK)))
-    @sus.returns ((sus.nothing, st.Task))
+    @sus.returns ((sus.nothing, dict, st.Task))
     def copy     (self, tgt, flags=0, ttype=None) :
         '''
         tgt:           saga.Url
         flags:         enum flags
         ttype:         saga.task.type enum
-        ret:           None / saga.Task
+        ret:           None / dict / saga.Task
         
         Copy the entry to another location
     
@@ -255,6 +255,9 @@ class Entry (sb.Base, sasync.Async) :
             # copy an entry
             entry = saga.namespace.Directory("sftp://localhost/tmp/data/data.bin")
             entry.copy ("sftp://localhost/tmp/data/data.bak")
+
+        Adaptors may return a dict with transfer statistics, for example for
+        a :data:`saga.filesystem.SYNC` copy (see the shell file adaptor).
         '''
         
         # parameter checks
@@ -326,7 +329,7 @@ class Entry (sb.Base, sasync.Async) :
                         self._is_recursive -= 1
     
                         # if nothing raised an exception so far, we are done.
-                        return 
+                        return ret
     
     
                     except se.SagaException as e :
@@ -339,6 +342,8 @@ class Entry (sb.Base, sasync.Async) :
             # if all was in vain, we rethrow the original exception
             self._is_recursive -= 1
             raise e
+
+        return ret
      
     
     # --------------------------------------------------------------------------
@@ -86,6 +86,9 @@ class _DefaultSession (object) :
 
         _engine = saga.engine.engine.Engine ()
 
+        # make sure that deferred context adaptors are loaded (lazy mode)
+        _engine._load_lazy ('saga.Context')
+
         if not 'saga.Context' in _engine._adaptor_registry :
             self._logger.warn ("no context adaptors found")
             return
@@ -86,11 +86,16 @@ class Configuration(object):
 
     def _update(self, namespace, valid_options):
         # add the new options to the global dictionary
-        self._all_valid_options += valid_options
-        # and re-_initialize the configuration object.
-        self._initialize()
-
-    def _initialize(self, inject_cfg_file=None, add_cfg_file=None):
+        known = [(o['category'], o['name']) for o in self._all_valid_options]
+        new_options = [o for o in valid_options
+                         if (o['category'], o['name']) not in known]
+        self._all_valid_options += new_options
+        # and initialize those -- options which are already registered keep
+        # their current values, which may have been changed at runtime (e.g.
+        # before an adaptor is loaded lazily)
+        self._initialize(options=new_options)
+
+    def _initialize(self, inject_cfg_file=None, add_cfg_file=None, options=None):
         """ Initialize the global configuration.
 
             :param inject_cfg_file: is used *only* for testing purposes 
@@ -99,6 +104,9 @@ class Configuration(object):
 
             :param add_cfg_file: is used *only* for testing purposes 
              and adds a specific config file to the list of evaluated files.  
+
+            :param options: only (re-)initialize the given options, instead
+             of all registered options.
         """
         cfg_files = list()
         if inject_cfg_file is not None:
@@ -121,8 +129,11 @@ class Configuration(object):
         # were read from either a system-wide or user configuration file.
         cfg_file_dict = cfr.get_config_dict()
 
+        if options is None:
+            options = self._all_valid_options
+
         # load valid options and add them to the configuration
-        for option in self._all_valid_options:
+        for option in options:
             cat = option['category']
             if cat not in self._master_config:
                 # first occurrence - add new category key
@@ -147,6 +158,12 @@ class Configuration(object):
                     else:
                       raise ValueTypeError(option['category'], option['name'],
                           tmp_value, option['type'])
+                elif option['type'] in [int, float]:
+                    try:
+                      value = option['type'](tmp_value)
+                    except ValueError:
+                      raise ValueTypeError(option['category'], option['name'],
+                          tmp_value, option['type'])
                 else:
                     value = tmp_value
 
@@ -168,6 +185,12 @@ class Configuration(object):
                     else:
                       raise ValueTypeError(option['category'], option['name'],
                           tmp_value, option['type'])
+                elif option['type'] in [int, float]:
+                    try:
+                      value = option['type'](tmp_value)
+                    except ValueError:
+                      raise ValueTypeError(option['category'], option['name'],
+                          tmp_value, option['type'])
                 else:
                     value = tmp_value
             else:
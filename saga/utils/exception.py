@@ -9,6 +9,7 @@ __license__   = "MIT"
 
 import pdb
 import sys
+import linecache
 import traceback
 
 def get_traceback (limit=1) :
@@ -32,6 +33,44 @@ def get_traceback (limit=1) :
     return ret
 
 
+def get_stack (limit=1) :
+    """ Returns a cheap summary of the current stack, which can later be
+        rendered into a stacktrace string by :func:`format_stack`.  The summary
+        only holds code objects and line numbers -- it does not keep frames
+        (and thus their locals) alive, and does not read any source files.
+        'limit' has the same semantics as for :func:`get_traceback`.
+    """
+
+    try :
+        frame = sys._getframe (limit + 2)  # ignore local stack
+    except ValueError :
+        return []
+
+    stack = []
+    while frame :
+        stack.append ((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+
+    return stack
+
+
+def format_stack (stack) :
+    """ Renders a stack summary obtained by :func:`get_stack` into the same
+        string format as returned by :func:`get_traceback`.
+    """
+
+    entries = []
+    for code, lineno in reversed (stack) :
+
+        filename = code.co_filename
+        linecache.checkcache (filename)
+        line = linecache.getline (filename, lineno)
+
+        entries.append ((filename, lineno, code.co_name, line.strip () or None))
+
+    return "".join (traceback.format_list (entries))
+
+
 def breakpoint () :
     """ set a breakpoint
     """
@@ -46,11 +85,15 @@ class ExceptionBase(Exception):
     def __init__(self, message):
         Exception.__init__(self, message)
         self._message   = message
-        self._traceback = get_traceback()
+        self._traceback = None
+        self._stack     = get_stack ()
 
     def get_traceback (self) :
-        """ Return the full traceback for this exception.
+        """ Return the full traceback for this exception.  The traceback is
+            only rendered on first access.
         """
+        if  self._traceback is None :
+            self._traceback = format_stack (self._stack)
         return self._traceback
     traceback = property (get_traceback) 
 
@@ -189,10 +189,12 @@ def getLogger (name='saga-python'):
         _logger.propagate = 0 # Don't bubble up to the root logger
 
         # we add a 'trace' and 'breakpoint' methods to the system logger, which 
-        # prints a traceback on the debug handler / enters the debugger
+        # prints a traceback on the debug handler / enters the debugger.  The
+        # traceback is only rendered if it is actually logged.
         def mk_trace (logger) :
             def trace () :
-                logger.debug (get_traceback (0))
+                if  logger.isEnabledFor (logging.DEBUG) :
+                    logger.debug (get_traceback (0))
             return trace
 
         def mk_breakpoint (logger) :
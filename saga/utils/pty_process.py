@@ -15,16 +15,478 @@ import shlex
 import select
 import signal
 import termios
+import sre_parse
 import threading
+import collections
+import sre_constants
 
-import saga.utils.logger as sul
-import saga.exceptions   as se
+import saga.utils.config      as suc
+import saga.utils.logger      as sul
+import saga.utils.pty_reactor as supr
+import saga.exceptions        as se
 
 # --------------------------------------------------------------------
 #
-_CHUNKSIZE = 1024  # default size of each read
-_POLLDELAY = 0.01  # seconds in between read attempts
-_DEBUG_MAX = 600
+_CHUNKSIZE     = 1024     # default size of each read
+_CHUNKSIZE_MAX = 1 << 20  # max size of each read, on high data rates
+_CACHE_MAX     = 1 << 24  # the reactor stops draining a channel whose cache
+                          # holds more unconsumed data
+_POLLDELAY     = 0.01     # seconds in between read attempts
+_WAITDELAY     = 1.0      # max seconds to wait for the reactor, before the
+                          # child's state gets checked again
+_DEBUG_MAX     = 600
+
+# --------------------------------------------------------------------
+#
+_pty_options = [
+    { 
+    'category'      : 'saga.utils.pty',
+    'name'          : 'transcript_size', 
+    'type'          : int, 
+    'default'       : 100,
+    'valid_options' : None,
+    'documentation' : 'number of I/O chunks kept in the transcript of each pty '
+                      'process, which is reported on failure (0 disables).',
+    'env_variable'  : 'SAGA_PTY_TRANSCRIPT_SIZE'
+    },
+    { 
+    'category'      : 'saga.utils.pty',
+    'name'          : 'log_sampling', 
+    'type'          : int, 
+    'default'       : 1,
+    'valid_options' : None,
+    'documentation' : 'only log every n-th I/O chunk of pty processes on debug '
+                      'level (1 logs all chunks).',
+    'env_variable'  : 'SAGA_PTY_LOG_SAMPLING'
+    },
+    { 
+    'category'      : 'saga.utils.pty',
+    'name'          : 'io_reactor', 
+    'type'          : bool, 
+    'default'       : True,
+    'valid_options' : [True, False],
+    'documentation' : 'drain the I/O channels of all pty processes in a single '
+                      'epoll thread, instead of polling each channel on read '
+                      '(Linux only).  A channel is only drained while less '
+                      'than 16MB of its output are unconsumed.',
+    'env_variable'  : 'SAGA_PTY_IO_REACTOR'
+    }
+]
+
+_pty_config = suc.Configurable ('saga.utils.pty', _pty_options).get_config ()
+
+
+# --------------------------------------------------------------------
+#
+class _IOData (object) :
+    """
+    Wraps an I/O chunk for logging.  The chunk is only escaped and truncated
+    when the log record is actually rendered.
+    """
+
+    __slots__ = ['data']
+
+    def __init__ (self, data) :
+        self.data = data
+
+    def __str__ (self) :
+
+        log = self.data.replace ('\r', '')
+        log =       log.replace ('\n', '\\n')
+
+        if  len(log) > _DEBUG_MAX :
+            return "%s ... %s" % (log[:30], log[-30:])
+
+        return log
+
+
+# --------------------------------------------------------------------
+#
+class PTYLog (object) :
+    """
+    This class implements the logging of the I/O hot path of
+    :class:`PTYProcess` and :class:`saga.utils.pty_shell.PTYShell`.  Chunks
+    are only logged if debug logging is enabled at all, and are then logged
+    lazily, i.e. they are only formatted if the log record is actually
+    emitted.  With a log sampling rate of n, only every n-th chunk is logged.
+
+    Independent of the log level, the last chunks are kept in a bounded
+    transcript ring buffer.  The transcript only keeps references to the data,
+    and is only rendered on failure (see :func:`PTYProcess.autopsy`), so that
+    post-mortem data are available without any per-chunk string operations.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self, logger, size=None, sampling=None) :
+
+        if  size     is None : size     = _pty_config['transcript_size'].get_value ()
+        if  sampling is None : sampling = _pty_config['log_sampling'   ].get_value ()
+
+        self.logger     = logger
+        self.sampling   = max (1, sampling)
+        self.count      = 0
+        self.transcript = collections.deque (maxlen=max (0, size))
+
+
+    # ----------------------------------------------------------------
+    #
+    def io (self, mode, fd, data) :
+        """ record (and maybe log) an I/O chunk.  mode is 'read' or 'write'. """
+
+        if  self.transcript.maxlen :
+            self.transcript.append ((time.time (), mode, data))
+
+        if  not self.logger.isEnabledFor (sul.DEBUG) :
+            return
+
+        self.count += 1
+        if  self.count % self.sampling :
+            return
+
+        self.logger.debug ("%-5s: [%5d] [%5d] (%s)", mode, fd, len(data), _IOData (data))
+
+
+    # ----------------------------------------------------------------
+    #
+    def dump (self) :
+        """ render the transcript into a string, oldest chunk first """
+
+        ret = ""
+        for (stamp, mode, data) in list (self.transcript) :
+            ret += "    %s %-5s [%5d] %s\n" \
+                 % (time.strftime ("%H:%M:%S", time.localtime (stamp)), 
+                    mode, len(data), _IOData (data))
+
+        return ret
+
+
+# --------------------------------------------------------------------
+#
+class PTYBuffer (object) :
+    """
+    This class implements the I/O cache of :class:`PTYProcess`.  Data are
+    appended to a growable bytearray, and are consumed from its front by
+    advancing an offset -- the consumed space is only reclaimed once it
+    dominates the buffer.  Thus, appending and consuming data is (amortized)
+    linear in the data size, independent of the number and size of the
+    individual reads.
+
+    Carriage returns are stripped from all appended data.  Slices of the
+    buffer (like `buffer[-256:]`) refer to the unconsumed data, and are
+    returned as strings.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self) :
+
+        self._buf = bytearray ()
+        self._off = 0
+
+
+    # ----------------------------------------------------------------
+    #
+    def __len__ (self) :
+
+        return len (self._buf) - self._off
+
+
+    # ----------------------------------------------------------------
+    #
+    def __str__ (self) :
+
+        return self[:]
+
+
+    # ----------------------------------------------------------------
+    #
+    def __getitem__ (self, key) :
+
+        if  not isinstance (key, slice) :
+            return self[key:key+1 or None]
+
+        start, stop, step = key.indices (len (self))
+
+        if  step != 1 :
+            return self[:][key]
+
+        if  stop <= start :
+            return ""
+
+        # no memoryview here: slices are also taken for diagnostics, without
+        # locking against the reactor, and an exported buffer would block
+        # concurrent appends.
+        return bytes (self._buf[self._off+start:self._off+stop])
+
+
+    # ----------------------------------------------------------------
+    #
+    def append (self, data) :
+        """ append data, stripping all carriage returns """
+
+        if  '\r' in data :
+            data = data.replace ('\r', '')
+
+        self._buf += data
+
+
+    # ----------------------------------------------------------------
+    #
+    def consume (self, size=None) :
+        """ remove and return (up to) size bytes from the front of the buffer """
+
+        off   = self._off
+        avail = len (self._buf) - off
+
+        if  size is None or size > avail :
+            size = avail
+
+        ret       = memoryview (self._buf)[off:off+size].tobytes ()
+        self._off = off + size
+
+        if  self._off == len (self._buf) :
+            # all consumed -- reuse the buffer
+            del self._buf[:]
+            self._off = 0
+
+        elif self._off > _CHUNKSIZE and self._off > avail :
+            # consumed data dominate -- reclaim that space
+            self.compact ()
+
+        return ret
+
+
+    # ----------------------------------------------------------------
+    #
+    def compact (self) :
+        """ reclaim the space of consumed data """
+
+        if  self._off :
+            del self._buf[:self._off]
+            self._off = 0
+
+
+    # ----------------------------------------------------------------
+    #
+    def rfind (self, sub, start=0, end=None) :
+        """ as `str.rfind`, on the (unconsumed) data """
+
+        if  end is None :
+            end = len (self)
+
+        ret = self._buf.rfind (sub, self._off + start, self._off + end)
+
+        if  ret < 0 :
+            return ret
+
+        return ret - self._off
+
+
+    # ----------------------------------------------------------------
+    #
+    def search (self, regex, pos=0) :
+        """ 
+        search the (unconsumed) data for the given compiled regex, starting at
+        (relative) offset pos, and return the (relative) end of the first
+        match, or None.  The data are not copied for the search.  As for
+        `regex.search (string, pos)`, anchors and lookbehind assertions still
+        see the data before pos.
+        """
+
+        # make sure the data start at the begin of the bytearray, so that
+        # anchors like '^' and '\A' behave as on a string
+        self.compact ()
+
+        match = regex.search (self._buf, pos)
+
+        if  match :
+            return match.end ()
+
+        return None
+
+
+# --------------------------------------------------------------------
+#
+_NEWLINE = ord ('\n')
+
+def _pattern_span (items, dotall) :
+    """
+    Return a tuple (width, newline) for the given parsed regex (see
+    `sre_parse`), where width is the maximum number of characters the pattern
+    can match or look ahead at (None if unbounded), and newline is True if the
+    pattern may match (or look ahead at) a newline.  If in doubt, the answer is
+    (None, True).
+    """
+
+    width   = 0
+    newline = False
+
+    for op, av in items :
+
+        if  op in [sre_constants.AT] :
+            w, n = 0, False
+
+        elif op == sre_constants.LITERAL :
+            w, n = 1, (av == _NEWLINE)
+
+        elif op == sre_constants.NOT_LITERAL :
+            w, n = 1, (av != _NEWLINE)
+
+        elif op == sre_constants.ANY :
+            w, n = 1, dotall
+
+        elif op == sre_constants.IN :
+            w, n = 1, _charset_newline (av)
+
+        elif op == sre_constants.SUBPATTERN :
+            w, n = _pattern_span (av[-1], dotall)
+
+        elif op == sre_constants.BRANCH :
+            w, n = 0, False
+            for branch in av[1] :
+                bw, bn = _pattern_span (branch, dotall)
+                if  w is not None :
+                    if  bw is None : w = None
+                    else           : w = max (w, bw)
+                n = n or bn
+
+        elif op in [sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT] :
+            lo, hi, sub = av
+            w, n = _pattern_span (sub, dotall)
+            if  w is not None :
+                if  hi == sre_constants.MAXREPEAT : w = None
+                else                              : w = w * hi
+
+        elif op in [sre_constants.ASSERT, sre_constants.ASSERT_NOT] :
+            # lookbehind assertions still see the data before the search
+            # offset -- only lookahead assertions extend the span
+            direction, sub = av
+            if  direction < 0 :
+                w, n = 0, False
+            else :
+                w, n = _pattern_span (sub, dotall)
+
+        else :
+            # back references, conditionals, ...
+            return (None, True)
+
+        if  width is not None :
+            if  w is None : width  = None
+            else          : width += w
+
+        newline = newline or n
+
+    return (width, newline)
+
+
+def _charset_newline (items) :
+    """ Return False if the parsed character set surely excludes newlines """
+
+    negate   = False
+    contains = False  # set surely contains a newline
+
+    for op, av in items :
+
+        if  op == sre_constants.NEGATE :
+            negate = True
+
+        elif op == sre_constants.LITERAL :
+            if  av == _NEWLINE :
+                contains = True
+
+        elif op == sre_constants.RANGE :
+            if  av[0] <= _NEWLINE <= av[1] :
+                contains = True
+
+        elif op == sre_constants.CATEGORY :
+            if  av in [sre_constants.CATEGORY_SPACE,
+                       sre_constants.CATEGORY_LINEBREAK] :
+                contains = True
+
+            elif av not in [sre_constants.CATEGORY_DIGIT,
+                            sre_constants.CATEGORY_WORD,
+                            sre_constants.CATEGORY_NOT_SPACE,
+                            sre_constants.CATEGORY_NOT_LINEBREAK] :
+                if  not negate :
+                    return True
+
+        else :
+            return True
+
+    if  negate :
+        return not contains
+
+    return contains
+
+
+# --------------------------------------------------------------------
+#
+class PTYMatcher (object) :
+    """
+    This class searches a :class:`PTYBuffer` for a regex incrementally: every
+    search resumes where a match could start at the earliest, given the data
+    the previous (failed) searches have seen.  That offset is derived from the
+    pattern: 
+
+      - if the pattern matches at most `n` characters (including lookahead),
+        the search resumes `n` characters before the end of the old data;
+      - if the pattern can't match a newline, the search resumes at the start
+        of the last line of the old data;
+      - otherwise all data are searched again.
+
+    Thus, waiting for a prompt like 'PROMPT-(\d+)->$' after a command with
+    large output is linear in the output size.  Patterns which can match across
+    lines with unbounded width (like '\s*$') are still searched in full.
+
+    The matcher assumes that the buffer only grows in between searches.
+    """
+
+    _cache = dict ()  # pattern: (regex, width, newline)
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self, pattern) :
+
+        if  pattern not in PTYMatcher._cache :
+
+            flags = re.MULTILINE | re.DOTALL
+            regex = re.compile (pattern, flags)
+
+            try :
+                width, newline = _pattern_span (sre_parse.parse (pattern, flags), 
+                                                dotall=True)
+            except Exception :
+                width, newline = None, True
+
+            PTYMatcher._cache[pattern] = (regex, width, newline)
+
+        self.regex, self.width, self.newline = PTYMatcher._cache[pattern]
+        self.pos = 0  # search offset
+
+
+    # ----------------------------------------------------------------
+    #
+    def search (self, buf) :
+        """ 
+        search the buffer for the pattern, and return the (relative) end of the
+        first match, or None 
+        """
+
+        end = buf.search (self.regex, self.pos)
+
+        if  end is None :
+
+            size = len (buf)
+
+            if  self.width is not None :
+                # one extra char for the context of '$', '\b' etc.
+                self.pos = max (0, size - self.width - 1)
+
+            elif not self.newline :
+                self.pos = buf.rfind ('\n', 0, max (0, size - 1)) + 1
+
+        return end
 
 
 # --------------------------------------------------------------------
@@ -98,7 +560,9 @@ class PTYProcess (object) :
 
         self.logger = logger
         if  not  self.logger : self.logger = sul.getLogger ('PTYProcess') 
-        self.logger.debug ("PTYProcess init %s" % self)
+        self.logger.debug ("PTYProcess init %s", self)
+
+        self.iolog  = PTYLog (self.logger)
 
 
         if isinstance (command, basestring) :
@@ -111,14 +575,27 @@ class PTYProcess (object) :
             raise se.BadParameter ("PTYProcess expects non-empty command")
 
         self.rlock   = threading.RLock ()
+        self.cond    = threading.Condition (threading.RLock ()) # guards cache
 
         self.command = command # list of strings too run()
 
 
-        self.cache   = ""      # data cache
+        self.cache   = PTYBuffer () # data cache
         self.child   = None    # the process as created by subprocess.Popen
         self.ptyio   = None    # the process' io channel, from pty.fork()
 
+        self.chunksize        = _CHUNKSIZE      # current read size (adaptive)
+        self.chunksize_max    = _CHUNKSIZE_MAX  # max read size
+
+        self.reactor          = None   # shared I/O thread, if enabled
+        self.hangup           = False  # reactor saw the channel close
+        self.paused           = False  # reactor stopped draining (cache full)
+        self.cache_max        = _CACHE_MAX
+        self.expected         = None   # pending non-blocking find
+
+        if  _pty_config['io_reactor'].get_value () and supr.available () :
+            self.reactor = supr.PTYReactor ()
+
         self.exit_code        = None  # child died with code (may be revived)
         self.exit_signal      = None  # child kill by signal (may be revived)
 
@@ -140,7 +617,7 @@ class PTYProcess (object) :
         them (see cat /proc/sys/kernel/pty/max)
         """
 
-        self.logger.debug ("PTYProcess del  %s" % self)
+        self.logger.debug ("PTYProcess del  %s", self)
         with self.rlock :
     
             try :
@@ -192,6 +669,11 @@ class PTYProcess (object) :
 
                 self.parent_in  = self.child_fd
                 self.parent_out = self.child_fd
+                self.hangup     = False
+                self.paused     = False
+
+                if  self.reactor :
+                    self.reactor.register (self.parent_out, self)
 
 
     # --------------------------------------------------------------------
@@ -243,12 +725,20 @@ class PTYProcess (object) :
                     self.exit_signal = os.WTERMSIG (wstat)
 
 
-            try : 
-                if  self.parent_out :
-                    os.close (self.parent_out)
-                    self.parent_out = None
-            except OSError :
-                pass
+            with self.cond :
+
+                if  self.reactor and self.parent_out :
+                    self.reactor.unregister (self.parent_out, self)
+
+                try : 
+                    if  self.parent_out :
+                        os.close (self.parent_out)
+                        self.parent_out = None
+                except OSError :
+                    pass
+
+                # fail any pending non-blocking find
+                self._check_expected ()
 
           # try : 
           #     if  self.parent_in :
@@ -421,9 +911,136 @@ class PTYProcess (object) :
             ret += "  exit signal: %s\n" % self.exit_signal
             ret += "  last output: %s\n" % self.cache[-256:] # FIXME: smarter selection
 
+            if  self.iolog.transcript :
+                ret += "  transcript :\n%s" % self.iolog.dump ()
+
             return ret
 
 
+    # --------------------------------------------------------------------
+    #
+    def _fill (self, wait=_POLLDELAY) :
+        """ 
+        Wait for data from the child, and append whatever is available to the
+        cache.  The caller must hold `self.cond`.
+
+        If the I/O reactor is used, the reactor fills the cache, and this
+        method only blocks on `self.cond` until the reactor got data, for up to
+        `wait` seconds.  Otherwise, and while the reactor is paused for this
+        channel (see :func:`_pull`), the channel is polled for up to
+        `_POLLDELAY` seconds, and read directly.
+        """
+
+        if  self.reactor and not self.paused :
+
+            if  self.hangup :
+                raise se.NoSuccess ("unexpected EOF (%s)" % self.cache[-256:])
+
+            self.cond.wait (wait)
+            return
+
+        rlist, _, _ = select.select ([self.parent_out], [], [], _POLLDELAY)
+
+        for f in rlist :
+
+            buf = os.read (f, self.chunksize)
+
+            if  len(buf) == 0 and sys.platform == 'darwin' :
+                self.logger.debug ("read : MacOS EOF")
+                self.finalize ()
+                raise se.NoSuccess ("unexpected EOF (%s)" % self.cache[-256:])
+
+            self._append (f, buf)
+
+
+    # --------------------------------------------------------------------
+    #
+    def _pull (self, fd) :
+        """ 
+        Called by the I/O reactor when fd is readable: read a chunk into the
+        cache, and wake up the threads waiting for data.  Returns False if the
+        channel got closed.
+
+        Once the cache holds more than `self.cache_max` bytes, the reactor is
+        asked to stop draining the channel (unless a non-blocking find waits
+        for more data), so that a child which outputs faster than its data are
+        consumed cannot exhaust memory -- the pty then blocks the child.  The
+        channel is re-armed once the cache is consumed (see :func:`_consume`).
+        """
+
+        with self.cond :
+
+            # the channel may have been closed (and its fd reused) since the
+            # reactor got the event
+            if  fd != self.parent_out :
+                return False
+
+            # the event may predate the pause -- leave the data in the pty
+            if  self.paused :
+                return True
+
+            try :
+                buf = os.read (fd, self.chunksize)
+
+            except OSError as e :
+                # EIO: the child closed the pty
+                self.logger.debug ("read : %s" % e)
+                buf = ""
+
+            if  not buf :
+                self.hangup = True
+                self.cond.notify_all ()
+                self._check_expected ()
+                return False
+
+            self._append (fd, buf)
+            self.cond.notify_all ()
+            self._check_expected ()
+
+            if  len (self.cache) > self.cache_max and not self.expected :
+                self.paused = True
+                self.reactor.pause (fd, self)
+
+            return True
+
+
+    # --------------------------------------------------------------------
+    #
+    def _consume (self, size=None) :
+        """ 
+        Consume data from the cache (see :func:`PTYBuffer.consume`), and let
+        the reactor drain a paused channel again once half of the cache is
+        free.  The caller must hold `self.cond`.
+        """
+
+        ret = self.cache.consume (size)
+
+        if  self.paused and len (self.cache) <= self.cache_max / 2 :
+            self.paused = False
+            if  self.parent_out :
+                self.reactor.resume (self.parent_out, self)
+
+        return ret
+
+
+    # --------------------------------------------------------------------
+    #
+    def _append (self, fd, buf) :
+        """ 
+        Append a chunk read from the child to the cache.  The read size adapts
+        to the data rate: it grows while reads fill the whole chunk (up to
+        `self.chunksize_max`), and shrinks again on short reads.
+        """
+
+        self.cache.append (buf)
+        self.iolog.io ('read', fd, buf)
+
+        if  len(buf) >= self.chunksize :
+            self.chunksize = min (self.chunksize * 2, self.chunksize_max)
+        elif len(buf) < self.chunksize / 4 :
+            self.chunksize = max (self.chunksize / 2, _CHUNKSIZE)
+
+
     # --------------------------------------------------------------------
     #
     def read (self, size=0, timeout=0, _force=False) :
@@ -447,22 +1064,15 @@ class PTYProcess (object) :
         Note: the returned lines do *not* get '\\\\r' stripped.
         """
 
-        with self.rlock :
+        with self.rlock, self.cond :
 
-            found_eof = False
-
-            if not self.alive (recover=False) :
-                if self.cache :
-                    raise se.NoSuccess ("process I/O failed: %s" % self.cache[-256:])
-                else :
-                    raise se.NoSuccess ("process I/O failed")
+            self._check_alive ()
 
             try:
                 # start the timeout timer right now.  Note that even if timeout is
                 # short, and child.poll is slow, we will nevertheless attempt at least
                 # one read...
                 start = time.time ()
-                ret   = ""
 
                 # read until we have enough data, or hit timeout ceiling...
                 while True :
@@ -471,64 +1081,28 @@ class PTYProcess (object) :
                     if len (self.cache) :
 
                         if not size :
-                            ret = self.cache
-                            self.cache = ""
-                            return ret
+                            return self._consume ()
 
                         # we don't even need all of the cache
                         elif size <= len (self.cache) :
-                            ret = self.cache[:size]
-                            self.cache = self.cache[size:]
-                            return ret
+                            return self._consume (size)
 
                     # otherwise we need to read some more data, right?
-                    # idle wait 'til the next data chunk arrives, or 'til _POLLDELAY
-                    rlist, _, _ = select.select ([self.parent_out], [], [], _POLLDELAY)
-
-                    # got some data? 
-                    for f in rlist:
-                        # read whatever we still need
-
-                        readsize = _CHUNKSIZE
-                        if size: 
-                            readsize = size-len(ret)
-
-                        buf  = os.read (f, _CHUNKSIZE)
-
-                        if  len(buf) == 0 and sys.platform == 'darwin' :
-                            self.logger.debug ("read : MacOS EOF")
-                            self.finalize ()
-                            found_eof = True
-                            raise se.NoSuccess ("unexpected EOF (%s)" \
-                                             % self.cache[-256:])
-
-
-                        self.cache += buf.replace ('\r', '')
-                        log         = buf.replace ('\r', '')
-                        log         = log.replace ('\n', '\\n')
-                      # print "buf: --%s--" % buf
-                      # print "log: --%s--" % log
-                        if  len(log) > _DEBUG_MAX :
-                            self.logger.debug ("read : [%5d] [%5d] (%s ... %s)" \
-                                            % (f, len(log), log[:30], log[-30:]))
-                        else :
-                            self.logger.debug ("read : [%5d] [%5d] (%s)" \
-                                            % (f, len(log), log))
-
+                    # idle wait 'til the next data chunk arrives, or 'til timeout
+                    if    timeout < 0 : wait = _POLLDELAY
+                    elif  timeout > 0 : wait = start + timeout - time.time ()
+                    else              : wait = _WAITDELAY
+                    self._fill (max (0, min (wait, _WAITDELAY)))
 
                     # lets see if we still got any data in the cache we can return
                     if len (self.cache) :
 
                         if not size :
-                            ret = self.cache
-                            self.cache = ""
-                            return ret
+                            return self._consume ()
 
                         # we don't even need all of the cache
                         elif size <= len (self.cache) :
-                            ret = self.cache[:size]
-                            self.cache = self.cache[size:]
-                            return ret
+                            return self._consume (size)
 
                     # at this point, we do not have sufficient data -- only
                     # return on timeout
@@ -536,30 +1110,24 @@ class PTYProcess (object) :
                     if  timeout == 0 : 
                         # only return if we have data
                         if len (self.cache) :
-                            ret        = self.cache
-                            self.cache = ""
-                            return ret
+                            return self._consume ()
 
                     elif timeout < 0 :
                         # return of we have data or not
-                        ret        = self.cache
-                        self.cache = ""
-                        return ret
+                        return self._consume ()
 
                     else : # timeout > 0
                         # return if timeout is reached
                         now = time.time ()
                         if (now-start) > timeout :
-                            ret        = self.cache
-                            self.cache = ""
-                            return ret
-
+                            return self._consume ()
 
-            except Exception as e :
 
-                if found_eof :
-                    raise e
+            except se.SagaException :
+                # EOF
+                raise
 
+            except Exception as e :
                 raise se.NoSuccess ("read from process failed '%s' : (%s)" \
                                  % (e, self.cache[-256:]))
 
@@ -585,59 +1153,45 @@ class PTYProcess (object) :
         Note that the pattern are interpreted with the re.M (multi-line) and
         re.S (dot matches all) regex flags.
 
-        Performance: the call is doing repeated string regex searches over
-        whatever data it finds.  On complex regexes, and large data, and small
-        read buffers, this method can be expensive.  
+        Performance: the call is doing repeated regex searches over whatever
+        data it finds.  The data are searched in-place in the cache, and are
+        only copied once a pattern matched.  Repeated searches only cover the
+        newly read data where the pattern allows (see :class:`PTYMatcher`).
+        Patterns which can match across lines with unbounded width (like
+        '\\s*$') are searched over all data again after each read, which can
+        be expensive on large data.
 
         Note: the returned data get '\\\\r' stripped.
         """
 
-        with self.rlock :
+        with self.rlock, self.cond :
 
             try :
                 start = time.time ()                       # startup timestamp
-                ret   = []                                 # array of read lines
-                patts = []                                 # compiled patterns
-                data  = self.cache                         # initial data to check
-                self.cache = ""
-
-                if not data : # empty cache?
-                    data = self.read (timeout=_POLLDELAY)
+                patts = []                                 # pattern matchers
 
                 # pre-compile the given pattern, to speed up matching
                 for pattern in patterns :
-                    patts.append (re.compile (pattern, re.MULTILINE | re.DOTALL))
+                    patts.append (PTYMatcher (pattern))
+
+                if not self.cache : # empty cache?
+                    self._check_alive ()
+                    self._fill ()
 
                 # we wait forever -- there are two ways out though: data matches
                 # a pattern, or timeout passes
                 while True :
 
-                  # time.sleep (0.1)
-
-                    # skip non-lines
-                    if  None == data :
-                        data += self.read (timeout=_POLLDELAY)
-
                     # check current data for any matching pattern
-                  # print ">>%s<<" % data
                     for n in range (0, len(patts)) :
 
-                        match = patts[n].search (data)
-                      # print "==%s==" % patterns[n]
+                        end = patts[n].search (self.cache)
 
-                        if match :
+                        if end is not None :
                             # a pattern matched the current data: return a tuple of
                             # pattern index and matching data.  The remainder of the
-                            # data is cached.
-                            ret  = data[0:match.end()]
-                            self.cache = data[match.end():] 
-
-                          # print "~~match!~~ %s" % data[match.start():match.end()]
-                          # print "~~match!~~ %s" % (len(data))
-                          # print "~~match!~~ %s" % (str(match.span()))
-                          # print "~~match!~~ %s" % (ret)
-
-                            return (n, ret.replace('\r', ''))
+                            # data remains cached.
+                            return (n, self._consume (end))
 
                     # if a timeout is given, and actually passed, return a non-match
                     if timeout == 0 :
@@ -646,17 +1200,94 @@ class PTYProcess (object) :
                     if timeout > 0 :
                         now = time.time ()
                         if (now-start) > timeout :
-                            self.cache = data
                             return (None, None)
 
                     # no match yet, still time -- read more data
-                    data += self.read (timeout=_POLLDELAY)
+                    if    timeout < 0 : wait = _WAITDELAY
+                    else              : wait = start + timeout - time.time ()
+                    self._check_alive ()
+                    self._fill (max (0, min (wait, _WAITDELAY)))
 
 
             except Exception as e :
                 if  issubclass (e.__class__, se.SagaException) :
-                    raise se.NoSuccess ("output parsing failed (%s): %s" % (e._plain_message, data))
-                raise se.NoSuccess ("output parsing failed (%s): %s" % (e, data))
+                    raise se.NoSuccess ("output parsing failed (%s): %s" \
+                                     % (e._plain_message, self.cache[-256:]))
+                raise se.NoSuccess ("output parsing failed (%s): %s" \
+                                 % (e, self.cache[-256:]))
+
+
+    # ----------------------------------------------------------------
+    #
+    def expect (self, patterns, callback) :
+        """
+        This is a non-blocking version of :func:`find`: the patterns are
+        searched in whatever data arrive, and once one matches, the call
+        `callback (n, match)` is queued for the reactor's dispatcher thread,
+        with the same arguments :func:`find` would return.  If the child's I/O
+        channel gets closed before any pattern matched, the callback gets
+        `(None, None)`.
+
+        Only one non-blocking find can be pending per process, and
+        :func:`read` and :func:`find` must not be used while it is.  This
+        method requires the I/O reactor (see the 'io_reactor' option).
+        """
+
+        if  not self.reactor :
+            raise se.NotImplemented ("non-blocking find requires the pty I/O reactor")
+
+        with self.cond :
+
+            if  self.expected :
+                raise se.IncorrectState ("another non-blocking find is pending")
+
+            matchers = []
+            for pattern in patterns :
+                matchers.append (PTYMatcher (pattern))
+
+            self.expected = (matchers, callback)
+            self._check_expected ()
+
+            # a pending find needs more data than a paused channel delivers
+            if  self.expected and self.paused :
+                self.paused = False
+                self.reactor.resume (self.parent_out, self)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _check_expected (self) :
+        """ complete the pending non-blocking find, if possible (holds cond) """
+
+        if  not self.expected :
+            return
+
+        matchers, callback = self.expected
+
+        for n in range (0, len (matchers)) :
+
+            end = matchers[n].search (self.cache)
+
+            if  end is not None :
+                self.expected = None
+                self.reactor.call_soon (callback, n, self._consume (end))
+                return
+
+        if  self.hangup or not self.parent_out :
+            self.expected = None
+            self.reactor.call_soon (callback, None, None)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _check_alive (self) :
+        """ raise if the child died -- see :func:`read` """
+
+        if not self.alive (recover=False) :
+            if self.cache :
+                raise se.NoSuccess ("process I/O failed: %s" % self.cache[-256:])
+            else :
+                raise se.NoSuccess ("process I/O failed")
 
 
     # ----------------------------------------------------------------
@@ -675,14 +1306,7 @@ class PTYProcess (object) :
 
             try :
 
-                log = data.replace ('\n', '\\n')
-                log =  log.replace ('\r', '')
-                if  len(log) > _DEBUG_MAX :
-                    self.logger.debug ("write: [%5d] [%5d] (%s ... %s)" \
-                                    % (self.parent_in, len(data), log[:30], log[-30:]))
-                else :
-                    self.logger.debug ("write: [%5d] [%5d] (%s)" \
-                                    % (self.parent_in, len(data), log))
+                self.iolog.io ('write', self.parent_in, data)
 
                 # attempt to write forever -- until we succeeed
                 while data :
@@ -699,7 +1323,7 @@ class PTYProcess (object) :
                         data = data[size:]
 
                         if data :
-                            self.logger.info ("write: [%5d] [%5d]" % (f, size))
+                            self.logger.info ("write: [%5d] [%5d]", f, size)
 
 
             except Exception as e :
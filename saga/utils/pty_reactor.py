@@ -0,0 +1,232 @@
+
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2012-2013, The SAGA Project"
+__license__   = "MIT"
+
+
+import Queue
+import errno
+import select
+import weakref
+import threading
+
+import saga.utils.singleton as sus
+import saga.utils.logger    as sul
+
+
+# events watched on each channel
+_EVENTS = None
+if  hasattr (select, 'epoll') :
+    _EVENTS = select.EPOLLIN  | select.EPOLLPRI | select.EPOLLERR | select.EPOLLHUP
+
+
+# --------------------------------------------------------------------
+#
+def available () :
+    """ the reactor depends on epoll, which is Linux only """
+
+    return hasattr (select, 'epoll')
+
+
+# --------------------------------------------------------------------
+#
+class PTYReactor (object) :
+    """
+    This class implements a single I/O thread which drains the output channels
+    of all :class:`saga.utils.pty_process.PTYProcess` instances.  The channels
+    are registered with one epoll set, and whenever a channel becomes readable,
+    the reactor pulls its data into the cache of the respective process (see
+    :func:`PTYProcess._pull`), which then notifies the threads waiting for
+    that data.  Thus, threads waiting for process output block on condition
+    variables instead of polling their channels, independent of the number of
+    open processes.
+
+    Callbacks for completed non-blocking operations (see
+    :func:`PTYProcess.expect`) are not invoked on the I/O thread, but are
+    queued (:func:`call_soon`) for a second thread, the dispatcher.  Callbacks
+    thus can block for a while (e.g. to write the next command) without
+    stalling the I/O of all other processes -- but they should not wait for
+    the result of other non-blocking operations, as those would get stuck
+    behind them in the dispatcher queue.
+
+    To bound memory, a process can pause its channel (:func:`pause`) while
+    its cache is full, i.e. while its data are not consumed -- the reactor
+    then does not watch that channel, until the process resumes it
+    (:func:`resume`).
+
+    The reactor is a singleton, and its threads are started on creation.  The
+    threads are daemon threads, and live as long as the application.  It only
+    keeps weak references to the processes, so that those still get garbage
+    collected (and finalized) as before.
+    """
+
+    __metaclass__ = sus.Singleton
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self) :
+
+        self.logger    = sul.getLogger ('PTYReactor')
+        self._lock     = threading.Lock ()
+        self._channels = dict ()  # fd: weakref to PTYProcess
+        self._epoll    = select.epoll ()
+        self._calls    = Queue.Queue ()
+
+        self._thread        = threading.Thread (target=self._run,
+                                                name='PTYReactor')
+        self._thread.daemon = True
+        self._thread.start ()
+
+        self._dispatcher        = threading.Thread (target=self._dispatch,
+                                                    name='PTYReactor.dispatch')
+        self._dispatcher.daemon = True
+        self._dispatcher.start ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def register (self, fd, process) :
+        """ watch fd, and pass its data to the given process """
+
+        with self._lock :
+
+            self._channels[fd] = weakref.ref (process)
+            self._epoll.register (fd, _EVENTS)
+
+
+    # ----------------------------------------------------------------
+    #
+    def pause (self, fd, process) :
+        """ 
+        stop watching fd for now, but keep it registered for process -- see
+        :func:`resume`.
+        """
+
+        with self._lock :
+
+            ref = self._channels.get (fd)
+
+            if  ref is None or ref () is not process :
+                return
+
+            try :
+                self._epoll.unregister (fd)
+            except (IOError, OSError, ValueError) :
+                # not watched anyway
+                pass
+
+
+    # ----------------------------------------------------------------
+    #
+    def resume (self, fd, process) :
+        """ watch a paused fd again """
+
+        with self._lock :
+
+            ref = self._channels.get (fd)
+
+            if  ref is None or ref () is not process :
+                return
+
+            try :
+                self._epoll.register (fd, _EVENTS)
+            except (IOError, OSError) as e :
+                if  e.errno != errno.EEXIST :
+                    raise
+
+
+    # ----------------------------------------------------------------
+    #
+    def unregister (self, fd, process=None) :
+        """ 
+        stop watching fd -- needs to be called before fd is closed.  If
+        a process is given, fd is only dropped if it is still registered for
+        that process (fd numbers get reused).
+        """
+
+        with self._lock :
+
+            ref = self._channels.get (fd)
+
+            if  ref is None :
+                return
+
+            if  process is not None and ref () not in [process, None] :
+                return
+
+            del self._channels[fd]
+
+            try :
+                self._epoll.unregister (fd)
+            except (IOError, OSError, ValueError) :
+                # fd was closed before
+                pass
+
+
+    # ----------------------------------------------------------------
+    #
+    def call_soon (self, call, *args) :
+        """ queue call(*args) for the dispatcher thread """
+
+        self._calls.put ((call, args))
+
+
+    # ----------------------------------------------------------------
+    #
+    def _dispatch (self) :
+
+        while True :
+
+            call, args = self._calls.get ()
+
+            try :
+                call (*args)
+
+            except Exception as e :
+                self.logger.exception ("pty reactor: callback failed: %s" % e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _run (self) :
+
+        while True :
+
+            try :
+                events = self._epoll.poll ()
+
+            except (IOError, OSError) as e :
+                if  e.errno == errno.EINTR :
+                    continue
+                raise
+
+            for fd, _ in events :
+
+                with self._lock :
+                    ref = self._channels.get (fd)
+
+                if  not ref :
+                    continue
+
+                process = ref ()
+
+                if  not process :
+                    # process is gone, but was not finalized (yet)
+                    self.unregister (fd)
+                    continue
+
+                try :
+                    if  not process._pull (fd) :
+                        # channel is closed
+                        self.unregister (fd, process)
+
+                except Exception as e :
+                    # don't let a broken channel take down all others
+                    self.logger.warn ("pty reactor: dropping channel %s: %s" % (fd, e))
+                    self.unregister (fd, process)
+
+                del process
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
@@ -7,13 +7,148 @@ __license__   = "MIT"
 import re
 import os
 import sys
+import time
 import errno
-
+import pipes
+import Queue
+import base64
+import hashlib
+import threading
+import subprocess
+import collections
+
+import saga.utils.config            as suc
 import saga.utils.logger            as sul
 import saga.utils.pty_shell_factory as supsf
 import saga.exceptions              as se
 
 _PTY_TIMEOUT = 2.0
+_PTY_PROMPT  = "PROMPT-(\d+)->$"
+_PTY_PS1     = "unset PROMPT_COMMAND ; PS1='PROMPT-$?->'; PS2=''; " \
+             + "export PS1 PS2 2>&1 >/dev/null; true\n"
+_ERR_FILE    = "/tmp/saga-python.ssh-job.stderr.$$"  # stderr for SEPARATE iomode
+_INBAND_EOF  = "SAGA_INBAND_EOF"                    # heredoc delimiter
+
+# base64 (encoder, decoder) commands, in order of preference
+_INBAND_TOOLS = [("base64",         "base64 -d"),
+                 ("openssl base64", "openssl base64 -d")]
+
+# md5 digest commands, in order of preference
+_DIGEST_TOOLS = ["md5sum", "md5 -q", "openssl md5"]
+
+_PARALLEL_BLOCK = 1024 * 1024      # dd block size for parallel transfers
+_PARALLEL_CHUNK = 4                # blocks per transferred chunk
+
+# checksums of a file or tree for sync: 'd' / 'f' / '', then one cksum line per file
+_SYNC_LIST = "if test -d %(path)s ; then echo d ; cd %(path)s && find . -type f -exec cksum {} + ; " \
+             "elif test -f %(path)s ; then echo f ; cksum < %(path)s ; else echo ; fi"
+
+_pty_shell_options = [
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'inband_size',
+    'type'          : int,
+    'default'       : 65536,
+    'valid_options' : None,
+    'documentation' : 'data up to that many bytes are transferred by '
+                      'write_to_remote / read_from_remote over the shell '
+                      'channel itself, instead of via a separate copy process '
+                      '(0 disables).',
+    'env_variable'  : 'SAGA_PTY_INBAND_SIZE'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'parallel_size',
+    'type'          : int,
+    'default'       : 64 * 1024 * 1024,
+    'valid_options' : None,
+    'documentation' : 'files of at least that many bytes are staged to and from '
+                      'ssh hosts in chunks, over several concurrent shell '
+                      'channels (0 disables).',
+    'env_variable'  : 'SAGA_PTY_PARALLEL_SIZE'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'parallel_streams',
+    'type'          : int,
+    'default'       : 4,
+    'valid_options' : None,
+    'documentation' : 'maximum number of concurrent shell channels for staging '
+                      'large files.',
+    'env_variable'  : 'SAGA_PTY_PARALLEL_STREAMS'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'tar_threshold',
+    'type'          : int,
+    'default'       : 100,
+    'valid_options' : None,
+    'documentation' : 'directory trees with more than that many entries are '
+                      'staged to and from ssh hosts as a single tar stream, '
+                      'instead of file by file (0 disables).',
+    'env_variable'  : 'SAGA_PTY_TAR_THRESHOLD'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'tar_compress',
+    'type'          : bool,
+    'default'       : False,
+    'valid_options' : [True, False],
+    'documentation' : 'gzip compress tar streams (useful for slow links).',
+    'env_variable'  : 'SAGA_PTY_TAR_COMPRESS'
+    }
+]
+
+_pty_shell_config = suc.Configurable ('saga.utils.pty', _pty_shell_options).get_config ()
+
+
+# ------------------------------------------------------------------------------
+#
+def _b64_lines (data) :
+    """
+    base64 encode data for in-band transfer, in lines of 1000 characters:
+    lines must be shorter than the tty line limit (MAX_CANON, 1024 on BSD),
+    but fewer lines are processed faster by the tty line discipline.
+    """
+
+    data = base64.b64encode (data)
+
+    return "".join (["%s\n" % data[i:i+1000] for i in range (0, len (data), 1000)])
+
+
+# ------------------------------------------------------------------------------
+#
+# CRC table for the POSIX cksum algorithm (polynomial 0x04C11DB7)
+#
+_CKSUM_TABLE = list ()
+
+for _i in range (0, 256) :
+    _c = _i << 24
+    for _j in range (0, 8) :
+        if  _c & 0x80000000 : _c = (_c << 1) ^ 0x04C11DB7
+        else                : _c = (_c << 1)
+    _CKSUM_TABLE.append (_c & 0xffffffff)
+
+
+# ------------------------------------------------------------------------------
+#
+def _cksum (data) :
+    """ 
+    return the checksum of data as computed by the POSIX 'cksum' utility, as
+    string '<crc> <size>'
+    """
+
+    crc = 0
+    for char in data :
+        crc = ((crc << 8) & 0xffffffff) ^ _CKSUM_TABLE[(crc >> 24) ^ ord (char)]
+
+    size = len (data)
+    while size :
+        crc    = ((crc << 8) & 0xffffffff) ^ _CKSUM_TABLE[(crc >> 24) ^ (size & 0xff)]
+        size >>= 8
+
+    return "%d %d" % ((~crc) & 0xffffffff, len (data))
+
 
 # ------------------------------------------------------------------------------
 #
@@ -26,6 +161,162 @@ STDOUT   = 3    # fetch stdout only, discard stderr
 STDERR   = 4    # fetch stderr only, discard stdout
 
 
+# --------------------------------------------------------------------
+#
+class PTYFuture (object) :
+    """
+    This class represents the result of a non-blocking :class:`PTYShell`
+    operation (see :func:`PTYShell.run_future`).  The result can be waited for
+    (:func:`result`), or callbacks can be registered which get invoked once it
+    is available -- no thread is occupied while the operation is pending.
+
+    Callbacks are usually invoked on the dispatcher thread of the pty I/O
+    reactor (see :class:`saga.utils.pty_reactor.PTYReactor`), and should thus
+    not block on other futures.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self) :
+
+        self._cond      = threading.Condition ()
+        self._done      = False
+        self._result    = None
+        self._exception = None
+        self._callbacks = list ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def done (self) :
+
+        return self._done
+
+
+    # ----------------------------------------------------------------
+    #
+    def result (self, timeout=None) :
+        """ 
+        wait for the operation to complete, and return its result (or raise its
+        exception).  A :class:`saga.exceptions.Timeout` is raised if the
+        operation does not complete within timeout seconds (None waits
+        forever).
+        """
+
+        self._wait (timeout)
+
+        if  self._exception :
+            raise self._exception
+
+        return self._result
+
+
+    # ----------------------------------------------------------------
+    #
+    def exception (self, timeout=None) :
+        """ wait for the operation to complete, and return its exception """
+
+        self._wait (timeout)
+
+        return self._exception
+
+
+    # ----------------------------------------------------------------
+    #
+    def add_done_callback (self, callback) :
+        """ 
+        invoke `callback (future)` once the operation completed (right away if
+        it did already)
+        """
+
+        with self._cond :
+
+            if  not self._done :
+                self._callbacks.append (callback)
+                return
+
+        callback (self)
+
+
+    # ----------------------------------------------------------------
+    #
+    def then (self, call) :
+        """ 
+        return a new future, which completes with `call (result)` once this
+        future completed (or with this future's exception)
+        """
+
+        ret = PTYFuture ()
+
+        def _chain (future) :
+            try :
+                if  future._exception : ret.set_exception (future._exception)
+                else                  : ret.set_result    (call (future._result))
+            except Exception as e :
+                ret.set_exception (e)
+
+        self.add_done_callback (_chain)
+
+        return ret
+
+
+    # ----------------------------------------------------------------
+    #
+    def set_result (self, result) :
+
+        self._complete (result, None)
+
+
+    # ----------------------------------------------------------------
+    #
+    def set_exception (self, exception) :
+
+        self._complete (None, exception)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _complete (self, result, exception) :
+
+        with self._cond :
+
+            if  self._done :
+                raise se.IncorrectState ("future is already completed")
+
+            self._result    = result
+            self._exception = exception
+            self._done      = True
+            self._cond.notify_all ()
+
+            callbacks       = self._callbacks
+            self._callbacks = list ()
+
+        for callback in callbacks :
+            try :
+                callback (self)
+            except Exception as e :
+                sul.getLogger ('PTYFuture').exception ("future callback failed: %s" % e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _wait (self, timeout) :
+
+        with self._cond :
+
+            if  timeout is None :
+                while not self._done :
+                    self._cond.wait ()
+
+            else :
+                stop = time.time () + timeout
+                while not self._done :
+                    wait = stop - time.time ()
+                    if  wait <= 0 :
+                        raise se.Timeout ("operation did not complete within %ss" % timeout)
+                    self._cond.wait (wait)
+
+
 # --------------------------------------------------------------------
 #
 class PTYShell (object) :
@@ -155,6 +446,21 @@ class PTYShell (object) :
     usually 4096), or to lock the pipe on larger writes.
 
 
+    Non-Blocking Operations:
+    ^^^^^^^^^^^^^^^^^^^^^^^^
+
+    :func:`run_future` runs a command like :func:`run_sync`, but returns
+    a :class:`PTYFuture` right away.  Commands are queued, and are run one
+    after the other, driven by the shared pty I/O reactor -- so many shells
+    can have many commands pending without a thread per command::
+
+        futures = [shell.run_future ("STATS %s" % pid) for pid in pids]
+        results = [f.result () for f in futures]
+
+    While non-blocking commands are pending, blocking calls on the same shell
+    wait for them to complete (and thus must not be used in future callbacks).
+
+
     Automated Restart, Timeouts:
     ^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
@@ -175,9 +481,10 @@ class PTYShell (object) :
 
         self.logger = logger
         if  not  self.logger : self.logger = sul.getLogger ('PTYShell') 
-        self.logger.debug ("PTYShell init %s" % self)
+        self.logger.debug ("PTYShell init %s", self)
 
         self.url         = url      # describes the shell to run
+        self.session     = session  # for additional channels
         self.init        = init     # call after reconnect
         self.opts        = opts     # options...
         self.latency     = 0.0      # set by factory
@@ -186,6 +493,14 @@ class PTYShell (object) :
         self.prompt_re   = None
         self.initialized = False
 
+        self._queue      = collections.deque ()  # commands for run_future
+        self._pending    = collections.deque ()  # written, w/o prompt yet
+        self._qcond      = threading.Condition (threading.RLock ())
+        self._busy       = False    # queued or pending commands exist
+        self._expecting  = False    # a prompt search is registered
+        self._inband     = None     # base64 tools for in-band transfer
+        self._digest     = None     # md5 tool for transfer verification
+
         # we need a local dir for file staging caches.  At this point we use
         # $HOME, but should make this configurable (FIXME)
         self.base = os.environ['HOME'] + '/.saga/adaptors/shell/'
@@ -202,16 +517,21 @@ class PTYShell (object) :
         
         self.factory    = supsf.PTYShellFactory   ()
         self.pty_info   = self.factory.initialize (url, session, self.logger)
+
+        start = time.time ()
+
         self.pty_shell  = self.factory.run_shell  (self.pty_info)
 
         self.initialize ()
 
+        self.startup    = time.time () - start  # cost of another channel
+
 
     # ----------------------------------------------------------------
     #
     def __del__ (self) :
 
-        self.logger.debug ("PTYShell del  %s" % self)
+        self.logger.debug ("PTYShell del  %s", self)
         self.finalize (kill_pty=True)
 
 
@@ -244,11 +564,8 @@ class PTYShell (object) :
             # a versatile prompt pattern to account for the custom shell case.
             try :
                 # set and register new prompt
-                self.run_async  ("unset PROMPT_COMMAND ; "
-                                     + "PS1='PROMPT-$?->'; "
-                                     + "PS2=''; "
-                                     + "export PS1 PS2 2>&1 >/dev/null; true\n")
-                self.set_prompt (new_prompt="PROMPT-(\d+)->$")
+                self._run_async (_PTY_PS1)
+                self.set_prompt (new_prompt=_PTY_PROMPT)
 
                 self.logger.debug ("got new shell prompt")
 
@@ -275,6 +592,35 @@ class PTYShell (object) :
 
 
 
+    # ----------------------------------------------------------------
+    #
+    def reset (self) :
+        """
+        Bring the shell back into the state it had after :func:`initialize`:
+        wait for pending commands, restore the default prompt, and change back
+        into the home directory.  Other state (environment, shell functions
+        etc.) is not reset.  This is used by
+        :class:`saga.utils.pty_shell_pool.PTYShellPool` before handing a shell
+        to the next user.
+        """
+
+        # the queue-aware entry points (run_sync, run_async) must not be
+        # called while holding the pty lock: the reactor takes the queue lock
+        # first, and the pty lock second.
+        self._wait_idle ()
+
+        with self.pty_shell.rlock :
+
+            if  self.prompt != _PTY_PROMPT :
+                self._run_async (_PTY_PS1)
+                self.set_prompt (new_prompt=_PTY_PROMPT)
+
+            ret, out, _ = self._run_sync ("cd")
+
+            if  ret != 0 :
+                raise se.NoSuccess ("could not reset shell (%s): %s" % (ret, out))
+
+
     # ----------------------------------------------------------------
     #
     def alive (self, recover=False) :
@@ -418,7 +764,7 @@ class PTYShell (object) :
                             raise se.BadParameter ("Cannot use new prompt, parsing failed (10 retries)")
 
                         self.pty_shell.write ("\n")
-                        self.logger.debug  ("sent prompt trigger again (%d)" % retries)
+                        self.logger.debug  ("sent prompt trigger again (%d)", retries)
                         triggers += 1
                         continue
 
@@ -443,7 +789,7 @@ class PTYShell (object) :
             # those cases where we had to use triggers to actually get the
             # prompt
             if triggers > 0 :
-                self.run_async ('printf "SYNCHRONIZE_PROMPT\n"')
+                self._run_async ('printf "SYNCHRONIZE_PROMPT\n"')
 
                 # FIXME: better timout value?
                 _, match = self.pty_shell.find (["SYNCHRONIZE_PROMPT"], timeout=1.0)  
@@ -486,11 +832,11 @@ class PTYShell (object) :
                 result = prompt_re.match (data)
 
                 if  not result :
-                    self.logger.debug  ("could not parse prompt (%s) (%s)" % (prompt, data))
+                    self.logger.debug  ("could not parse prompt (%s) (%s)", prompt, data)
                     raise se.NoSuccess ("could not parse prompt (%s) (%s)" % (prompt, data))
 
                 if  len (result.groups ()) != 2 :
-                    self.logger.debug  ("prompt does not capture exit value (%s)" % prompt)
+                    self.logger.debug  ("prompt does not capture exit value (%s)", prompt)
                     raise se.NoSuccess ("prompt does not capture exit value (%s)" % prompt)
 
                 txt =     result.group (1)
@@ -558,6 +904,22 @@ class PTYShell (object) :
         expect the prompt regex to capture the exit status of the process.
         """
 
+        self._wait_idle ()
+
+        return self._run_sync (command, iomode, new_prompt)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _run_sync (self, command, iomode=None, new_prompt=None, log=None) :
+        """
+        see :func:`run_sync` -- if ``log`` is given, it is logged instead of
+        the command (which may carry a large in-band payload).  Other than
+        run_sync, this does not wait for queued :func:`run_future` commands
+        (see :func:`_wait_idle`), and can thus be used while holding the pty
+        lock.
+        """
+
         with self.pty_shell.rlock :
 
             # we expect the shell to be in 'ground state' when running a syncronous
@@ -574,28 +936,9 @@ class PTYShell (object) :
                     raise se.BadParameter ("run_sync can only run foreground jobs ('%s')" \
                                         % command)
 
-                redir = ""
-                _err  = "/tmp/saga-python.ssh-job.stderr.$$"
-
-                if  iomode == IGNORE :
-                    redir  =  " 1>>/dev/null 2>>/dev/null"
-
-                if  iomode == MERGED :
-                    redir  =  " 2>&1"
+                redir = self._redirect (iomode)
 
-                if  iomode == SEPARATE :
-                    redir  =  " 2>%s" % _err
-
-                if  iomode == STDOUT :
-                    redir  =  " 2>/dev/null"
-
-                if  iomode == STDERR :
-                    redir  =  " 2>&1 1>/dev/null"
-
-                if  iomode == None :
-                    redir  =  ""
-
-                self.logger.debug    ('run_sync: %s%s'   % (command, redir))
+                self.logger.debug    ('run_sync: %s%s',    log or command, redir)
                 self.pty_shell.write (          "%s%s\n" % (command, redir))
 
 
@@ -615,19 +958,11 @@ class PTYShell (object) :
 
                 ret, txt = self._eval_prompt (match, new_prompt)
 
-                stdout = None
                 stderr = None
 
-                if  iomode == IGNORE :
-                    pass
-
-                if  iomode == MERGED :
-                    stdout =  txt
-
                 if  iomode == SEPARATE :
-                    stdout =  txt
 
-                    self.pty_shell.write ("cat %s\n" % _err)
+                    self.pty_shell.write ("cat %s\n" % _ERR_FILE)
                     _, match = self.pty_shell.find ([self.prompt], timeout=-1.0)  # blocks
 
                     if not match :
@@ -642,20 +977,285 @@ class PTYShell (object) :
                                               % (_ret, _stderr))
                     stderr =  _stderr
 
+                stdout, stderr = self._split_output (iomode, txt, stderr)
 
-                if  iomode == STDOUT :
-                    stdout =  txt
+                return (ret, stdout, stderr)
 
-                if  iomode == STDERR :
-                    stderr =  txt
+            except Exception as e :
+                raise self._translate_exception (e)
 
-                if  iomode == None :
-                    stdout =  txt
 
-                return (ret, stdout, stderr)
+    # ----------------------------------------------------------------
+    #
+    def _redirect (self, iomode) :
+        """ return the command suffix which redirects I/O for iomode """
+
+        if  iomode == IGNORE   : return " 1>>/dev/null 2>>/dev/null"
+        if  iomode == MERGED   : return " 2>&1"
+        if  iomode == SEPARATE : return " 2>%s" % _ERR_FILE
+        if  iomode == STDOUT   : return " 2>/dev/null"
+        if  iomode == STDERR   : return " 2>&1 1>/dev/null"
+
+        return ""
+
+
+    # ----------------------------------------------------------------
+    #
+    def _split_output (self, iomode, txt, stderr=None) :
+        """ 
+        return the (stdout, stderr) tuple for iomode, given the command output
+        txt (and the separately fetched stderr for SEPARATE)
+        """
+
+        if  iomode == IGNORE   : return (None, None)
+        if  iomode == SEPARATE : return (txt,  stderr)
+        if  iomode == STDERR   : return (None, txt)
+
+        return (txt, None)
+
+
+    # ----------------------------------------------------------------
+    #
+    def run_future (self, command, iomode=None, pipeline=False) :
+        """
+        Run a shell command like :func:`run_sync`, but don't wait for it to
+        finish: a :class:`PTYFuture` is returned instead, whose result is the
+        `(ret, stdout, stderr)` tuple :func:`run_sync` would return.
+
+        Commands are queued, and each one is written to the shell once the
+        prompt of the previous one has been found.  That prompt search is done
+        by the pty I/O reactor, so no thread waits for the command.  If
+        `command` is `None`, nothing is written, and the future just collects
+        the output up to the next prompt (like :func:`find_prompt`).
+
+        If `pipeline` is `True`, the command is written right away if the
+        commands before it were pipelined, too, i.e. without waiting for their
+        prompts (see :func:`run_pipelined`).
+
+        Prompt changes (as with the `new_prompt` parameter of
+        :func:`run_sync`) are not supported.  Without the pty I/O reactor (see
+        :class:`saga.utils.pty_process.PTYProcess`), the command is run
+        synchronously, and a completed future is returned.
+        """
+
+        if  command is not None :
+            command = command.strip ()
+            if command.endswith ('&') :
+                raise se.BadParameter ("run_future can only run foreground jobs ('%s')" \
+                                    % command)
+
+        future = PTYFuture ()
+
+        if  not self.pty_shell.reactor :
+
+            try :
+                if  command is None :
+                    ret, out = self.find_prompt ()
+                    future.set_result ((ret, out, None))
+                else :
+                    future.set_result (self.run_sync (command, iomode))
 
             except Exception as e :
-                raise self._translate_exception (e)
+                future.set_exception (e)
+
+            return future
+
+        # SEPARATE needs another command right after this one, to fetch stderr
+        if  iomode == SEPARATE :
+            pipeline = False
+
+        with self._qcond :
+
+            self._queue.append ({'command'  : command, 
+                                 'iomode'   : iomode, 
+                                 'future'   : future, 
+                                 'pipeline' : pipeline})
+            self._pump ()
+
+        return future
+
+
+    # ----------------------------------------------------------------
+    #
+    def run_pipelined (self, commands, iomode=None) :
+        """
+        Run the given shell commands back-to-back, and return a list of
+        :class:`PTYFuture` instances, one per command, in order (see
+        :func:`run_future`).  The commands are written to the shell without
+        waiting for the respective previous prompts, so the whole list costs
+        about one roundtrip (instead of one per command).  Each future
+        completes as soon as the prompt of its command is found.
+
+        All commands get written, independent of the exit codes of previous
+        commands -- commands which depend on the success of earlier ones need
+        to check for that themselves (e.g. `test -d dir && ...`).  Pipelined
+        commands must not read from stdin, as that would swallow the commands
+        written after them.  Commands with SEPARATE iomode are not pipelined.
+        """
+
+        with self._qcond :
+
+            ret = list ()
+            for command in commands :
+                ret.append (self.run_future (command, iomode, pipeline=True))
+
+            return ret
+
+
+    # ----------------------------------------------------------------
+    #
+    def _pump (self) :
+        """ 
+        write the queued commands as far as allowed, and make sure the prompt
+        of the oldest written command is searched for.  Holds `self._qcond`.
+        """
+
+        with self._qcond :
+
+            # a command can be written if no other command is pending, or if
+            # this command and the pending ones are pipelined
+            while self._queue :
+
+                entry = self._queue[0]
+
+                if  self._pending and not (entry['pipeline'] and \
+                                           self._pending[-1]['pipeline']) :
+                    break
+
+                self._queue.popleft ()
+
+                try :
+                    with self.pty_shell.rlock :
+
+                        if  entry['command'] is not None :
+
+                            # only recover the shell in 'ground state'
+                            if not self.pty_shell.alive (recover=not self._pending) :
+                                raise se.IncorrectState ("Can't run command -- shell died:\n%s" \
+                                                      % self.pty_shell.autopsy ())
+
+                            redir = self._redirect (entry['iomode'])
+
+                            self.logger.debug    ('run_future: %s%s',  entry['command'], redir)
+                            self.pty_shell.write (            "%s%s\n" % (entry['command'], redir))
+
+                    self._pending.append (entry)
+
+                except Exception as e :
+                    # this one failed -- carry on with the next command
+                    entry['future'].set_exception (self._translate_exception (e))
+
+            if  self._pending and not self._expecting :
+
+                entry  = self._pending[0]
+                prompt = self.prompt
+
+                # the output of pipelined commands directly follows the
+                # previous prompt, so the prompt can't be anchored at the end
+                # of the line
+                if  entry['pipeline'] and prompt.endswith ('$') :
+                    prompt = prompt[:-1]
+
+                def _found (n, match) :
+                    self._on_prompt (entry, match)
+
+                try :
+                    self.pty_shell.expect ([prompt], _found)
+                    self._expecting = True
+
+                except Exception as e :
+                    self._pending.popleft ()
+                    entry['future'].set_exception (self._translate_exception (e))
+                    return self._pump ()
+
+            self._busy = bool (self._queue or self._pending)
+
+            if  not self._busy :
+                self._qcond.notify_all ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _on_prompt (self, entry, match) :
+        """ 
+        called by the reactor when the oldest pending command found its
+        prompt.  On SEPARATE iomode, this is called a second time, for the
+        stderr output.
+        """
+
+        failed = list ()   # futures to fail
+        result = None      # result for entry['future']
+
+        with self._qcond :
+
+            self._expecting = False
+
+            try :
+                if  not match :
+                    # all pending commands are lost
+                    failed = [e['future'] for e in self._pending]
+                    self._pending.clear ()
+                    raise se.IncorrectState ("run_future failed, no prompt (%s):\n%s" \
+                                          % (entry['command'], self.pty_shell.autopsy ()))
+
+                if  entry['iomode'] == SEPARATE and 'ret' not in entry :
+
+                    # stdout done -- fetch stderr
+                    entry['ret'], entry['txt'] = self._eval_prompt (match)
+
+                    def _found (n, match) :
+                        self._on_prompt (entry, match)
+
+                    with self.pty_shell.rlock :
+                        self.pty_shell.write  ("cat %s\n" % _ERR_FILE)
+                        self.pty_shell.expect ([self.prompt], _found)
+
+                    self._expecting = True
+                    return
+
+                self._pending.popleft ()
+
+                if  entry['iomode'] == SEPARATE :
+
+                    _ret, _stderr = self._eval_prompt (match)
+                    if  _ret :
+                        raise se.IncorrectState ("run_future failed, no stderr (%s: %s)" \
+                                              % (_ret, _stderr))
+
+                    ret            = entry['ret']
+                    stdout, stderr = self._split_output (entry['iomode'], entry['txt'], _stderr)
+
+                else :
+                    ret, txt       = self._eval_prompt (match)
+                    stdout, stderr = self._split_output (entry['iomode'], txt)
+
+                result = (ret, stdout, stderr)
+
+            except Exception as e :
+
+                if  self._pending and self._pending[0] is entry :
+                    self._pending.popleft ()
+
+                e = self._translate_exception (e)
+                for future in failed :
+                    if  future != entry['future'] :
+                        future.set_exception (e)
+                entry['future'].set_exception (e)
+
+            self._pump ()
+
+        if  result :
+            entry['future'].set_result (result)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _wait_idle (self) :
+        """ wait until all commands queued by run_future are done """
+
+        with self._qcond :
+            while self._busy :
+                self._qcond.wait ()
 
 
     # ----------------------------------------------------------------
@@ -673,6 +1273,19 @@ class PTYShell (object) :
         For async execution, we don't care if the command is doing i/o redirection or not.
         """
 
+        self._wait_idle ()
+        self._run_async (command)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _run_async (self, command) :
+        """
+        see :func:`run_async` -- other than that, this does not wait for
+        queued :func:`run_future` commands, and can thus be used while holding
+        the pty lock.
+        """
+
         with self.pty_shell.rlock :
 
             # we expect the shell to be in 'ground state' when running an asyncronous
@@ -725,10 +1338,19 @@ class PTYShell (object) :
         on the remote system.  If that file exists, it is overwritten.
         A NoSuccess exception is raised if writing the file was not possible
         (missing permissions, incorrect path, etc.).
+
+        Data up to ``inband_size`` bytes (see config options) are passed
+        base64 encoded over the shell channel itself, and are verified by
+        checksum.  Larger data are staged via a local temporary file and
+        a separate copy process.
         """
 
         try :
 
+            if  len (src) <= _pty_shell_config['inband_size'].get_value () :
+                if  self._write_inband (src, tgt) :
+                    return
+
             # FIXME: make this relative to the shell's pwd?  Needs pwd in
             # prompt, and updating pwd state on every find_prompt.
 
@@ -755,9 +1377,18 @@ class PTYShell (object) :
         :param src: path to source file to staged from
                     The src path is not an URL, but expected to be a path
                     relative to the shell's URL.
+
+        The content of the remote file is returned as string.  Like for
+        :func:`write_to_remote`, small files are transferred over the shell
+        channel itself.
         """
 
         try :
+
+            if  _pty_shell_config['inband_size'].get_value () :
+                out = self._read_inband (src)
+                if  out is not None :
+                    return out
             # FIXME: make this relative to the shell's pwd?  Needs pwd in
             # prompt, and updating pwd state on every find_prompt.
 
@@ -778,6 +1409,123 @@ class PTYShell (object) :
             raise self._translate_exception (e)
 
 
+    # ----------------------------------------------------------------
+    #
+    def _inband_tools (self) :
+        """
+        Find the base64 encoder and decoder on the remote host (once per shell).
+        Returns None if none is available.
+        """
+
+        if  self._inband is None :
+
+            self._inband = False
+
+            for enc, dec in _INBAND_TOOLS :
+                ret, out, _ = self.run_sync ("printf 'c2FnYQ==\\n' | %s" % dec,
+                                             iomode=STDOUT)
+                if  ret == 0 and out == "saga" :
+                    self._inband = (enc, dec)
+                    break
+
+            self.logger.debug ("in-band transfer tools: %s" % (self._inband,))
+
+        return self._inband or None
+
+
+    # ----------------------------------------------------------------
+    #
+    def _inband_path (self, path) :
+        """ 
+        quote a remote path -- relative paths are relative to $HOME, as for
+        the copy processes
+        """
+
+        if  path.startswith ('/') :
+            return pipes.quote (path)
+
+        return '"$HOME"/' + pipes.quote (path)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _write_inband (self, src, tgt) :
+        """
+        Write src into the remote file tgt, by pasting it base64 encoded into
+        a here-document for the remote decoder.  The remote checksum of the
+        file is compared to the local one.  Returns False if the in-band
+        transfer is not possible or failed, so that the caller can fall back to
+        a copy process.
+        """
+
+        tools = self._inband_tools ()
+
+        if  not tools :
+            return False
+
+        _, dec = tools
+        path   = self._inband_path (tgt)
+
+        # the base64 alphabet does not contain any tty control characters
+        self._wait_idle ()
+        ret, out, _ = self._run_sync ("%s > %s <<'%s' && cksum < %s\n%s%s" \
+                                      % (dec, path, _INBAND_EOF, path,
+                                         _b64_lines (src), _INBAND_EOF),
+                                      log="in-band write to %s (%d bytes)" \
+                                        % (path, len (src)))
+
+        if  ret != 0 :
+            self.logger.debug ("in-band write to %s failed: %s" % (tgt, out))
+            return False
+
+        if  out.strip () != _cksum (src) :
+            self.logger.warn ("in-band write to %s: checksum mismatch (%s != %s)" \
+                           % (tgt, out.strip (), _cksum (src)))
+            return False
+
+        return True
+
+
+    # ----------------------------------------------------------------
+    #
+    def _read_inband (self, src) :
+        """
+        Read the remote file src base64 encoded over the shell channel, and
+        verify its checksum.  Returns None if the in-band transfer is not
+        possible (also if the file is larger than ``inband_size``) or failed.
+        """
+
+        tools = self._inband_tools ()
+
+        if  not tools :
+            return None
+
+        enc, _ = tools
+        path   = self._inband_path (src)
+        size   = _pty_shell_config['inband_size'].get_value ()
+
+        ret, out, _ = self.run_sync ("test $(wc -c < %s) -le %d && cksum < %s && %s < %s" \
+                                     % (path, size, path, enc, path), iomode=STDOUT)
+
+        if  ret != 0 :
+            return None
+
+        try :
+            check, data = out.split ("\n", 1)
+            data        = base64.decodestring (data)
+
+        except Exception as e :
+            self.logger.warn ("in-band read from %s failed: %s" % (src, e))
+            return None
+
+        if  check.strip () != _cksum (data) :
+            self.logger.warn ("in-band read from %s: checksum mismatch (%s != %s)" \
+                           % (src, check.strip (), _cksum (data)))
+            return None
+
+        return data
+
+
     # ----------------------------------------------------------------
     #
     def stage_to_remote (self, src, tgt, cp_flags="") :
@@ -791,12 +1539,29 @@ class PTYShell (object) :
         :param tgt: path to target file to stage to.
                     The tgt path is not an URL, but expected to be a path
                     relative to the shell's URL.
+
+        Large files (see ``parallel_size``) are staged to ssh hosts in chunks,
+        over several shell channels in parallel (see :func:`_stage_parallel`).
+        Large directory trees (see ``tar_threshold``) are staged as a single
+        tar stream (see :func:`_use_tar`).
         """
 
         # FIXME: make this relative to the shell's pwd?  Needs pwd in
         # prompt, and updating pwd state on every find_prompt.
 
         try :
+            if  self._use_tar (cp_flags) and os.path.isdir (src) :
+                if  self._count_local (src) > _pty_shell_config['tar_threshold'].get_value () :
+                    self.factory.run_tar_to (self.pty_info, src, tgt,
+                                             _pty_shell_config['tar_compress'].get_value ())
+                    return
+
+            if  self._use_parallel (cp_flags) and \
+                os.path.isfile (src)           and \
+                os.path.getsize (src) >= _pty_shell_config['parallel_size'].get_value () :
+                if  self._stage_parallel ('to', src, tgt) :
+                    return
+
             self.factory.run_copy_to (self.pty_info, src, tgt, cp_flags)
 
         except Exception as e :
@@ -821,12 +1586,514 @@ class PTYShell (object) :
         # prompt, and updating pwd state on every find_prompt.
 
         try :
+            if  self._use_tar (cp_flags) :
+                if  self._count_remote (src) > _pty_shell_config['tar_threshold'].get_value () :
+                    self.factory.run_tar_from (self.pty_info, src, tgt,
+                                               _pty_shell_config['tar_compress'].get_value ())
+                    return
+
+            if  self._use_parallel (cp_flags) :
+                if  self._stage_parallel ('from', src, tgt) :
+                    return
+
             self.factory.run_copy_from (self.pty_info, src, tgt, cp_flags)
 
         except Exception as e :
             raise self._translate_exception (e)
 
 
+    # ----------------------------------------------------------------
+    #
+    def _use_parallel (self, cp_flags) :
+        """
+        Parallel staging is used for single files on ssh shells -- for local
+        shells, the copy process is a plain 'cp' anyway.
+        """
+
+        return self.pty_info['type'] == 'ssh'                        and \
+               _pty_shell_config['parallel_size'].get_value () > 0    and \
+               not '-r' in cp_flags.split ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _use_tar (self, cp_flags) :
+        """
+        sftp copies directory trees with (at least) one round trip per entry.
+        For trees with many entries, it is much faster to stream a tar archive
+        through a single slave connection.  For local shells, the copy process
+        is a plain 'cp' anyway.
+        """
+
+        return self.pty_info['type'] == 'ssh'                      and \
+               _pty_shell_config['tar_threshold'].get_value () > 0  and \
+               '-r' in cp_flags.split ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _count_local (self, path) :
+        """
+        Count the entries of a local directory tree -- but stop counting once
+        the ``tar_threshold`` is exceeded.
+        """
+
+        limit = _pty_shell_config['tar_threshold'].get_value ()
+        count = 0
+
+        for root, dirs, files in os.walk (path) :
+            count += len (dirs) + len (files)
+            if  count > limit :
+                break
+
+        return count
+
+
+    # ----------------------------------------------------------------
+    #
+    def _count_remote (self, path) :
+        """
+        Count the entries of a remote directory tree (up to ``tar_threshold``
+        + 1).  Returns 0 if the path is not a directory.
+        """
+
+        limit = _pty_shell_config['tar_threshold'].get_value ()
+        path  = self._inband_path (path)
+
+        ret, out, _ = self.run_sync ("test -d %s && find %s | head -n %d | wc -l" \
+                                  % (path, path, limit + 2), iomode=STDOUT)
+
+        if  ret != 0 or not out.strip ().isdigit () :
+            return 0
+
+        # find also lists the directory itself
+        return int (out) - 1
+
+
+    # ----------------------------------------------------------------
+    #
+    def _digest_tool (self) :
+        """
+        Find an md5 tool on the remote host (once per shell).  Returns None if
+        none is available.
+        """
+
+        if  self._digest is None :
+
+            self._digest = False
+
+            for tool in _DIGEST_TOOLS :
+                ret, out, _ = self.run_sync ("printf 'saga' | %s" % tool, iomode=STDOUT)
+                if  ret == 0 and hashlib.md5 ('saga').hexdigest () in out :
+                    self._digest = tool
+                    break
+
+        return self._digest or None
+
+
+    # ----------------------------------------------------------------
+    #
+    def _stage_parallel (self, mode, src, tgt) :
+        """
+        Stage a large file in chunks of ``_PARALLEL_CHUNK`` blocks, which are
+        transferred in-band (see :func:`_write_inband`) over this shell and
+        over up to ``parallel_streams - 1`` additional shells on the same
+        master connection.  Remote chunks are written in place (and read) by
+        'dd', so the file is reassembled on the fly.  The number of streams is
+        derived from the throughput of the first chunk: more channels are only
+        opened if the remaining transfer would take longer than opening them.
+        The result is verified by md5 digest (or by size if no md5 tool is
+        available remotely).
+
+        Returns False if the parallel transfer is not possible, or failed --
+        the caller is expected to fall back to a copy process then.
+        """
+
+        # for staging from remote, a single round trip tells if src is a file
+        # large enough for parallel staging -- everything else (and in
+        # particular any other round trip) is left to the copy process
+        if  mode == 'from' :
+            rpath = self._inband_path (src)
+            ret, out, _ = self.run_sync ("test -f %s && wc -c < %s" % (rpath, rpath),
+                                         iomode=STDOUT)
+            size  = int (out) if ret == 0 and out.strip ().isdigit () else 0
+
+            if  size < _pty_shell_config['parallel_size'].get_value () :
+                return False
+
+        if  not self._inband_tools () :
+            return False
+
+        enc, dec = self._inband_tools ()
+        digest   = self._digest_tool ()
+        block    = _PARALLEL_BLOCK
+        chunk    = _PARALLEL_CHUNK * block
+
+        # like 'cp', we stage *into* existing target directories
+        if  mode == 'to' :
+            lpath = src
+            rpath = self._inband_path (tgt)
+            size  = os.path.getsize (src)
+            ret, out, _ = self.run_sync ("if test -d %s ; then echo d ; else : > %s ; fi" \
+                                      % (rpath, rpath), iomode=STDOUT)
+
+            if  ret == 0 and out.strip () == 'd' :
+                rpath = self._inband_path (os.path.join (tgt, os.path.basename (src)))
+                ret, out, _ = self.run_sync (": > %s" % rpath)
+
+        else :
+            lpath = tgt
+
+            if  os.path.isdir (lpath) :
+                lpath = os.path.join (lpath, os.path.basename (src))
+
+            try :
+                with open (lpath, 'wb') as f :
+                    f.truncate (size)
+
+            except IOError as e :
+                self.logger.debug ("parallel staging failed: %s" % e)
+                return False
+
+        if  ret != 0 :
+            self.logger.debug ("parallel staging failed: %s" % out)
+            return False
+
+        chunks = Queue.Queue ()
+        errors = list ()
+        for n in range (0, (size + chunk - 1) / chunk) :
+            chunks.put (n)
+
+
+        # ------------------------------------------------------------
+        def _transfer (shell, n) :
+
+            with open (lpath, ['r+b', 'rb'][mode == 'to']) as f :
+
+                f.seek (n * chunk)
+
+                if  mode == 'to' :
+                    data = f.read (chunk)
+                    shell._wait_idle ()
+                    ret, out, _ = shell._run_sync ("%s <<'%s' | dd of=%s bs=%d seek=%d conv=notrunc 2>/dev/null\n%s%s" \
+                                                   % (dec, _INBAND_EOF, rpath, block, n * _PARALLEL_CHUNK,
+                                                      _b64_lines (data), _INBAND_EOF),
+                                                   log="in-band write to %s (chunk %d, %d bytes)" \
+                                                     % (rpath, n, len (data)))
+                else :
+                    ret, out, _ = shell.run_sync ("dd if=%s bs=%d skip=%d count=%d 2>/dev/null | %s" \
+                                                  % (rpath, block, n * _PARALLEL_CHUNK,
+                                                     _PARALLEL_CHUNK, enc),
+                                                  iomode=STDOUT)
+                    if  ret == 0 :
+                        f.write (base64.decodestring (out))
+
+            if  ret != 0 :
+                raise se.NoSuccess ("chunk %d failed (%s): %s" % (n, ret, out))
+
+
+        # ------------------------------------------------------------
+        def _worker (shell=None) :
+
+            close = False
+
+            try :
+                if  not shell :
+                    shell = PTYShell (self.url, self.session, self.logger)
+                    close = True
+
+                while not errors :
+                    try :
+                        n = chunks.get_nowait ()
+                    except Queue.Empty :
+                        break
+                    _transfer (shell, n)
+
+            except Exception as e :
+                errors.append (e)
+
+            finally :
+                if  close :
+                    shell.finalize (kill_pty=True)
+
+
+        try :
+            # measure the first chunk on this shell, and derive the number of
+            # streams from the remaining transfer time
+            start = time.time ()
+            _transfer (self, chunks.get ())
+            rate  = chunk / max (time.time () - start, 0.001)
+
+            left    = chunks.qsize ()
+            streams = min (_pty_shell_config['parallel_streams'].get_value (), left,
+                           1 + int ((left * chunk / rate) / max (self.startup, 0.001)))
+
+            self.logger.info ("staging %s %s in %d chunks over %d streams (%.1f MB/s per stream)" \
+                            % (['from', 'to'][mode == 'to'], rpath, left + 1, max (streams, 1),
+                               rate / (1024 * 1024)))
+
+            threads = list ()
+            for i in range (1, streams) :
+                thread = threading.Thread (target=_worker, name='PTYShell.stage.%d' % i)
+                thread.daemon = True
+                thread.start ()
+                threads.append (thread)
+
+            _worker (self)
+
+            for thread in threads :
+                thread.join ()
+
+            if  errors :
+                raise errors[0]
+
+            # verify
+            if  digest :
+                md5 = hashlib.md5 ()
+                with open (lpath, 'rb') as f :
+                    for data in iter (lambda : f.read (chunk), '') :
+                        md5.update (data)
+                ret, out, _ = self.run_sync ("%s < %s" % (digest, rpath), iomode=STDOUT)
+                if  ret != 0 or not md5.hexdigest () in out :
+                    raise se.NoSuccess ("digest mismatch (%s)" % out)
+
+            else :
+                ret, out, _ = self.run_sync ("wc -c < %s" % rpath, iomode=STDOUT)
+                if  ret != 0 or out.strip () != str (os.path.getsize (lpath)) :
+                    raise se.NoSuccess ("size mismatch (%s)" % out)
+
+            return True
+
+        except Exception as e :
+            self.logger.warn ("parallel staging of %s failed: %s" % (rpath, e))
+            return False
+
+
+    # ----------------------------------------------------------------
+    #
+    def stage_to_remote_many (self, pairs, cp_flags="") :
+        """
+        :type  pairs: list of (string, string) tuples
+        :param pairs: (src, tgt) paths of local source files and remote target
+                      files, interpreted as for :func:`stage_to_remote`.
+
+        Stage all given files in a single copy session (i.e. a single sftp
+        process for ssh shells), instead of starting one copy process per
+        file.  A list with one (ret, out) tuple per pair is returned: ``ret``
+        is 0 if the respective file was staged, and ``out`` holds the error
+        output otherwise.  Failing files do not abort the staging of the others.
+        """
+
+        try :
+            return self.factory.run_copy_to_many (self.pty_info, pairs, cp_flags)
+
+        except Exception as e :
+            raise self._translate_exception (e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def stage_from_remote_many (self, pairs, cp_flags="") :
+        """
+        :type  pairs: list of (string, string) tuples
+        :param pairs: (src, tgt) paths of remote source files and local target
+                      files, interpreted as for :func:`stage_from_remote`.
+
+        The counterpart to :func:`stage_to_remote_many`.
+        """
+
+        try :
+            return self.factory.run_copy_from_many (self.pty_info, pairs, cp_flags)
+
+        except Exception as e :
+            raise self._translate_exception (e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def sync_to_remote (self, src, tgt, cp_flags="") :
+        """
+        :type  src: string
+        :param src: path to local source file or directory to sync from.
+
+        :type  tgt: string
+        :param tgt: path to remote target file or directory to sync to.
+
+        Like :func:`stage_to_remote`, but only files which differ (by POSIX
+        checksum and size) between src and tgt are transferred.  The checksums
+        of a whole tree are computed on each side in a single command, and the
+        changed files are staged in a single copy session (see
+        :func:`stage_to_remote_many`).
+
+        Other than 'cp -r', a directory is always synced *as* tgt (not into
+        it), so that repeated syncs update the same tree.  A file is synced
+        into tgt if that is a directory.  Files which only exist on the
+        target side are left alone.
+
+        Returns a dict with the number of source ``files`` and ``bytes``, the
+        number of files ``transferred``, and the number of bytes ``saved``.
+        """
+
+        try :
+            return self._sync ('to', src, tgt, cp_flags)
+
+        except Exception as e :
+            raise self._translate_exception (e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def sync_from_remote (self, src, tgt, cp_flags="") :
+        """
+        :type  src: string
+        :param src: path to remote source file or directory to sync from.
+
+        :type  tgt: string
+        :param tgt: path to local target file or directory to sync to.
+
+        The counterpart to :func:`sync_to_remote`.
+        """
+
+        try :
+            return self._sync ('from', src, tgt, cp_flags)
+
+        except Exception as e :
+            raise self._translate_exception (e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _sync_list (self, path, remote) :
+        """
+        List the checksums of a file, or of all files in a directory tree.
+        Returns a tuple (kind, sums), where kind is 'd' for directories, 'f'
+        for files, and None if the path does not exist.  sums maps the
+        relative paths of all files ('' for a plain file) to 'crc size'
+        strings, as printed by cksum.
+        """
+
+        if  remote :
+            cmd = _SYNC_LIST % {'path' : self._inband_path (path)}
+            ret, out, _ = self.run_sync (cmd, iomode=STDOUT)
+
+        else :
+            cmd  = _SYNC_LIST % {'path' : pipes.quote (path)}
+            proc = subprocess.Popen (['/bin/sh', '-c', cmd],
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            out  = proc.communicate ()[0]
+            ret  = proc.returncode
+
+        if  ret != 0 :
+            raise se.NoSuccess ("cannot checksum %s (%s): %s" % (path, ret, out))
+
+        lines = out.strip ().split ('\n')
+        kind  = lines[0].strip () or None
+        sums  = dict ()
+
+        for line in lines[1:] :
+
+            elems = line.rstrip ('\r').split (' ', 2)
+
+            if  len (elems) == 2 :
+                sums[''] = ' '.join (elems)
+
+            elif len (elems) == 3 and elems[2].startswith ('./') :
+                sums[elems[2][2:]] = ' '.join (elems[:2])
+
+        return kind, sums
+
+
+    # ----------------------------------------------------------------
+    #
+    def _sync (self, mode, src, tgt, cp_flags) :
+        """
+        Compare the checksum lists of src and tgt, and stage the files which
+        differ.  See :func:`sync_to_remote`.
+        """
+
+        if  mode == 'to' :
+            src = os.path.abspath (src)
+
+        else :
+            tgt = os.path.abspath (tgt)
+
+        s_kind, s_sums = self._sync_list (src, remote=(mode == 'from'))
+        t_kind, t_sums = self._sync_list (tgt, remote=(mode == 'to'  ))
+
+        if  not s_kind :
+            raise se.DoesNotExist ("sync source %s does not exist" % src)
+
+        if  s_kind == 'd' and not '-r' in cp_flags.split () :
+            raise se.BadParameter ("sync source %s is a directory" % src)
+
+        if  s_kind == 'f' and t_kind == 'd' :
+            tgt = os.path.join (tgt, os.path.basename (src))
+            t_kind, t_sums = self._sync_list (tgt, remote=(mode == 'to'))
+
+        pairs = list ()
+        dirs  = set  ()
+        total = 0
+        moved = 0
+
+        if  s_kind == 'd' and not t_kind :
+            dirs.add (tgt)
+
+        for rel in sorted (s_sums) :
+
+            size   = int (s_sums[rel].split ()[1])
+            total += size
+
+            if  t_sums.get (rel) == s_sums[rel] :
+                continue
+
+            moved += size
+
+            if  rel :
+                pairs.append ((os.path.join (src, rel), os.path.join (tgt, rel)))
+                dirs.add (os.path.dirname (os.path.join (tgt, rel)))
+            else :
+                pairs.append ((src, tgt))
+
+        # create the target directories in one go
+        if  dirs :
+            if  mode == 'to' :
+                ret, out, _ = self.run_sync ("mkdir -p %s" \
+                            % ' '.join ([self._inband_path (d) for d in sorted (dirs)]))
+                if  ret != 0 :
+                    raise se.NoSuccess ("cannot create %s (%s): %s" % (tgt, ret, out))
+
+            else :
+                for d in sorted (dirs) :
+                    if  not os.path.isdir (d) :
+                        os.makedirs (d)
+
+        if  pairs :
+
+            flags = ' '.join ([f for f in cp_flags.split () if f != '-r'])
+
+            if  mode == 'to' :
+                results = self.stage_to_remote_many   (pairs, flags)
+            else :
+                results = self.stage_from_remote_many (pairs, flags)
+
+            failed = [(pairs[i][0], results[i][1]) for i in range (0, len (pairs)) \
+                                                   if  results[i][0] != 0]
+            if  failed :
+                raise se.NoSuccess ("sync of %d files failed (%s: %s)" \
+                                 % (len (failed), failed[0][0], failed[0][1]))
+
+        stats = {'files'       : len (s_sums),
+                 'bytes'       : total,
+                 'transferred' : len (pairs),
+                 'saved'       : total - moved}
+
+        self.logger.info ("sync %s %s: %d of %d files transferred, %d of %d bytes saved" \
+                       % (['from', 'to'][mode == 'to'], [src, tgt][mode == 'to'],
+                          len (pairs), len (s_sums), total - moved, total))
+
+        return stats
+
+
     # ----------------------------------------------------------------
     #
     def _translate_exception (self, e, msg=None) :
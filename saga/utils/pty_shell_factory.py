@@ -4,15 +4,21 @@ __copyright__ = "Copyright 2012-2013, The SAGA Project"
 __license__   = "MIT"
 
 
+import re
 import os
 import sys
 import pwd
+import time
+import pipes
 import string
 import getpass
+import tempfile
 import threading
+import subprocess
 
 import saga
 import saga.exceptions         as se
+import saga.utils.config       as suc
 import saga.utils.logger       as sul
 import saga.utils.singleton    as sus
 import saga.utils.pty_process  as supp
@@ -47,6 +53,9 @@ _SCHEMAS_GSI = ['gsissh', 'gsiscp', 'gsisftp', 'gsiftp']
 
 _SCHEMAS = _SCHEMAS_SH + _SCHEMAS_SSH + _SCHEMAS_GSI
 
+# terminal control sequences (e.g. bracketed paste mode toggles) in copy output
+_ANSI_ESCAPE = re.compile ("\x1b\[[0-9;?]*[A-Za-z]")
+
 # FIXME: '-o ControlPersist' is only supported for newer ssh versions.  We
 # should add detection, and enable that if available -- for now, just diable it.
 #
@@ -70,6 +79,11 @@ _SCRIPTS = {
         'copy_from'     : "%(sftp_env)s %(sftp_exe)s %(sftp_args)s %(s_flags)s  %(host_str)s",
         'copy_to_in'    : "progress \n put %(cp_flags)s %(src)s %(tgt)s \n exit \n",            
         'copy_from_in'  : "progress \n get %(cp_flags)s %(src)s %(tgt)s \n exit \n",
+        'copy_many_init': "progress",
+        'copy_to_many'  : "put %(cp_flags)s %(src)s %(tgt)s",
+        'copy_from_many': "get %(cp_flags)s %(src)s %(tgt)s",
+        'copy_many_done': "sftp>\s*$",                 # no exit codes
+        'tar'           : "%(ssh_env)s %(ssh_exe)s   %(ssh_args)s -T %(s_flags)s  %(host_str)s %(tar_cmd)s",
     },
     'sh' : { 
         'master'        : "%(sh_env)s %(sh_exe)s  %(sh_args)s",
@@ -78,9 +92,47 @@ _SCRIPTS = {
         'copy_from'     : "%(sh_env)s %(sh_exe)s  %(sh_args)s",
         'copy_to_in'    : "cd ~ && exec %(cp_exe)s %(cp_flags)s %(src)s %(tgt)s",
         'copy_from_in'  : "cd ~ && exec %(cp_exe)s %(cp_flags)s %(src)s %(tgt)s",
+        'copy_many_init': "stty -echo ; unset PROMPT_COMMAND ; PS1='' ; cd ~ ; printf 'SAGA_COPY_%%d_DONE\\n' $?",
+        'copy_to_many'  : "%(cp_exe)s %(cp_flags)s %(src)s %(tgt)s 2>&1 ; printf 'SAGA_COPY_%%d_DONE\\n' $?",
+        'copy_from_many': "%(cp_exe)s %(cp_flags)s %(src)s %(tgt)s 2>&1 ; printf 'SAGA_COPY_%%d_DONE\\n' $?",
+        'copy_many_done': "SAGA_COPY_(\\d+)_DONE\n",   # exit code in group 1
+        'tar'           : "%(sh_env)s %(sh_exe)s  -c %(tar_cmd)s",
     }
 }
 
+# remote ends of tar streams: like 'cp -r', the tree is unpacked *into* an
+# existing target directory, and *as* the target directory otherwise.
+_TAR_EXTRACT = 'cd ~ && if test -d "%(tgt)s" ; then d="%(tgt)s/%(name)s" ; ' \
+               'else d="%(tgt)s" ; fi && mkdir -p "$d" && tar -x%(z)sf - -C "$d"'
+_TAR_CREATE  = 'cd ~ && tar -c%(z)sf - -C "%(src)s" .'
+
+_factory_options = [
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'prefork_size',
+    'type'          : int,
+    'default'       : 0,
+    'valid_options' : None,
+    'documentation' : 'number of initialized slave shells kept in standby per '
+                      'master connection, to speed up shell creation (0 '
+                      'disables prefork).',
+    'env_variable'  : 'SAGA_PTY_PREFORK_SIZE'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'prefork_ttl',
+    'type'          : int,
+    'default'       : 300,
+    'valid_options' : None,
+    'documentation' : 'standby slave shells older than that many seconds are '
+                      'discarded instead of being used.',
+    'env_variable'  : 'SAGA_PTY_PREFORK_TTL'
+    }
+]
+
+_factory_config = suc.Configurable ('saga.utils.pty', _factory_options).get_config ()
+
+
 # ------------------------------------------------------------------------------
 #
 class PTYShellFactory (object) :
@@ -120,6 +172,14 @@ class PTYShellFactory (object) :
     for and used.  'Suitable' means: ssh master for scp and sftp slaves; gsissh
     for gsiscp and gsisftp slaves; and sh master for file slaves
 
+    If ``prefork_size`` is configured, the factory keeps that many initialized
+    slave shells in standby per master (``info['standby']``).  Shells are taken
+    from there by :func:`run_shell`, and the standby list is refilled by
+    a background thread -- thus, a new shell for a known host only needs to
+    run its own prompt setup.  Standby shells older than ``prefork_ttl``
+    seconds are discarded, and replaced by that thread, too.
+    :func:`standby_stats` reports the standby hit rates per master.
+
     """
 
     __metaclass__ = sus.Singleton
@@ -178,6 +238,13 @@ class PTYShellFactory (object) :
                 # authorization, prompt setup, etc
                 self._initialize_pty (info['pty'], info, is_shell=True)
 
+                # prefork state
+                info['standby']        = list ()  # [[pty_process, since], ...]
+                info['standby_hits']   = 0
+                info['standby_misses'] = 0
+                info['standby_thread'] = None
+                info['standby_timer']  = None
+
                 # master was created - register it
                 self.registry[host_s][user_s][type_s] = info
 
@@ -199,122 +266,125 @@ class PTYShellFactory (object) :
     def _initialize_pty (self, pty_shell, info, is_shell=False) :
 
         # is_shell: only for shells we use prompt triggers
+        #
+        # This only talks to the given pty, and only reads static master info,
+        # so it runs w/o holding self.rlock: prompt detection can take a while,
+        # and should not block shell creation for other callers (or hosts), in
+        # particular not behind the prefork thread.
 
-        with self.rlock :
+        shell_pass = info['pass']
+        key_pass   = info['key_pass']
+        logger     = info['logger']
+        latency    = info['latency']
 
-            shell_pass = info['pass']
-            key_pass   = info['key_pass']
-            logger     = info['logger']
-            latency    = info['latency']
+        pty_shell.latency = latency
 
-            pty_shell.latency = latency
+        # if we did not see a decent prompt within 'delay' time, something
+        # went wrong.  Try to prompt a prompt (duh!)  Delay should be
+        # minimum 0.1 second (to avoid flooding of local shells), and at
+        # maximum 1 second (to keep startup time reasonable)
+        # most one second.  We try to get within that range with 10*latency.
+        delay = min (1.0, max (0.1, 50 * latency))
 
-            # if we did not see a decent prompt within 'delay' time, something
-            # went wrong.  Try to prompt a prompt (duh!)  Delay should be
-            # minimum 0.1 second (to avoid flooding of local shells), and at
-            # maximum 1 second (to keep startup time reasonable)
-            # most one second.  We try to get within that range with 10*latency.
-            delay = min (1.0, max (0.1, 50 * latency))
-
-            try :
-                prompt_patterns = ["[Pp]assword:\s*$",                   # password   prompt
-                                   "Enter passphrase for key '.*':\s*$", # passphrase prompt
-                                   "want to continue connecting",        # hostkey confirmation
-                                   ".*HELLO_\\d+_SAGA(.*)$",             # prompt detection helper
-                                   "^(.*[\$#%>])\s*$"]                   # greedy native shell prompt 
+        try :
+            prompt_patterns = ["[Pp]assword:\s*$",                   # password   prompt
+                               "Enter passphrase for key '.*':\s*$", # passphrase prompt
+                               "want to continue connecting",        # hostkey confirmation
+                               ".*HELLO_\\d+_SAGA(.*)$",             # prompt detection helper
+                               "^(.*[\$#%>])\s*$"]                   # greedy native shell prompt 
 
-                # find a prompt
-                n, match = pty_shell.find (prompt_patterns, delay)
+            # find a prompt
+            n, match = pty_shell.find (prompt_patterns, delay)
 
-                # this loop will run until we finally find the shell prompt, or
-                # if we think we have tried enough and give up.  On success
-                # we'll try to set a different prompt, and when we found that,
-                # too, we exit the loop and are be ready to running shell
-                # commands.
-                retries = 0
-                while True :
+            # this loop will run until we finally find the shell prompt, or
+            # if we think we have tried enough and give up.  On success
+            # we'll try to set a different prompt, and when we found that,
+            # too, we exit the loop and are be ready to running shell
+            # commands.
+            retries = 0
+            while True :
 
-                    # --------------------------------------------------------------
-                    if n == None :
+                # --------------------------------------------------------------
+                if n == None :
 
-                        # we found none of the prompts, yet, and need to try
-                        # again.  But to avoid hanging on invalid prompts, we
-                        # print 'HELLO_SAGA', and search for that one, too.
-                        # Well, we only do that on shell prompts, of course
-                        # (sftp doesn't like our echos)
-                        
-                        if  retries > 100 :
-                            raise se.NoSuccess ("Could not detect shell prompt (timeout)")
+                    # we found none of the prompts, yet, and need to try
+                    # again.  But to avoid hanging on invalid prompts, we
+                    # print 'HELLO_SAGA', and search for that one, too.
+                    # Well, we only do that on shell prompts, of course
+                    # (sftp doesn't like our echos)
+                    
+                    if  retries > 100 :
+                        raise se.NoSuccess ("Could not detect shell prompt (timeout)")
 
-                        retries += 1
+                    retries += 1
 
-                        if  is_shell :
-                            pty_shell.write ("printf 'HELLO_%%d_SAGA\\n' %d\n" % retries)
+                    if  is_shell :
+                        pty_shell.write ("printf 'HELLO_%%d_SAGA\\n' %d\n" % retries)
 
 
-                        # FIXME:  consider timeout
-                        n, match = pty_shell.find (prompt_patterns, delay)
+                    # FIXME:  consider timeout
+                    n, match = pty_shell.find (prompt_patterns, delay)
 
 
-                    # --------------------------------------------------------------
-                    elif n == 0 :
-                        logger.info ("got password prompt")
-                        if  not shell_pass :
-                            raise se.AuthenticationFailed ("prompted for unknown password (%s)" \
-                                                          % match)
+                # --------------------------------------------------------------
+                elif n == 0 :
+                    logger.info ("got password prompt")
+                    if  not shell_pass :
+                        raise se.AuthenticationFailed ("prompted for unknown password (%s)" \
+                                                      % match)
 
-                        pty_shell.write ("%s\n" % shell_pass)
-                        n, match = pty_shell.find (prompt_patterns, delay)
+                    pty_shell.write ("%s\n" % shell_pass)
+                    n, match = pty_shell.find (prompt_patterns, delay)
 
 
-                    # --------------------------------------------------------------
-                    elif n == 1 :
-                        logger.info ("got passphrase prompt : %s" % match)
+                # --------------------------------------------------------------
+                elif n == 1 :
+                    logger.info ("got passphrase prompt : %s" % match)
 
-                        start = string.find (match, "'", 0)
-                        end   = string.find (match, "'", start+1)
+                    start = string.find (match, "'", 0)
+                    end   = string.find (match, "'", start+1)
 
-                        if start == -1 or end == -1 :
-                            raise se.AuthenticationFailed ("could not extract key name (%s)" % match)
+                    if start == -1 or end == -1 :
+                        raise se.AuthenticationFailed ("could not extract key name (%s)" % match)
 
-                        key = match[start+1:end]
+                    key = match[start+1:end]
 
-                        if  not key in key_pass    :
-                            raise se.AuthenticationFailed ("prompted for unknown key password (%s)" \
-                                                          % key)
+                    if  not key in key_pass    :
+                        raise se.AuthenticationFailed ("prompted for unknown key password (%s)" \
+                                                      % key)
 
-                        pty_shell.write ("%s\n" % key_pass[key])
-                        n, match = pty_shell.find (prompt_patterns, delay)
+                    pty_shell.write ("%s\n" % key_pass[key])
+                    n, match = pty_shell.find (prompt_patterns, delay)
 
 
-                    # --------------------------------------------------------------
-                    elif n == 2 :
-                        logger.info ("got hostkey prompt")
-                        pty_shell.write ("yes\n")
-                        n, match = pty_shell.find (prompt_patterns, delay)
+                # --------------------------------------------------------------
+                elif n == 2 :
+                    logger.info ("got hostkey prompt")
+                    pty_shell.write ("yes\n")
+                    n, match = pty_shell.find (prompt_patterns, delay)
 
 
-                    # --------------------------------------------------------------
-                    elif n == 3 :
-                        logger.info ("got shell prompt trigger (%s) (%s)" %  (n, match))
+                # --------------------------------------------------------------
+                elif n == 3 :
+                    logger.info ("got shell prompt trigger (%s) (%s)" %  (n, match))
 
-                        # one of the trigger commands got through -- we are
-                        # happy to declare success, ignore any further output,
-                        # and set a 'real' prompt.
-                        break
+                    # one of the trigger commands got through -- we are
+                    # happy to declare success, ignore any further output,
+                    # and set a 'real' prompt.
+                    break
 
 
-                    # --------------------------------------------------------------
-                    elif n == 4 :
-                        logger.info ("got initial shell prompt (%s) (%s)" %  (n, match))
+                # --------------------------------------------------------------
+                elif n == 4 :
+                    logger.info ("got initial shell prompt (%s) (%s)" %  (n, match))
 
-                        # we are done waiting for a prompt
-                        break
-                
-                
-            except Exception as e :
-                print e
-                raise self._translate_exception (e)
+                    # we are done waiting for a prompt
+                    break
+            
+            
+        except Exception as e :
+            print e
+            raise self._translate_exception (e)
 
 
     # --------------------------------------------------------------------------
@@ -326,6 +396,20 @@ class PTYShellFactory (object) :
         is created.  If needed, the existing master connection is revived.  
         """
 
+        sh_slave = self._take_standby (info)
+
+        if  not sh_slave :
+            sh_slave = self._spawn_shell (info)
+
+        self._refill_standby (info)
+
+        return sh_slave
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _spawn_shell (self, info) :
+
         s_cmd = _SCRIPTS[info['type']]['shell'] % info
 
         # at this point, we do have a valid, living master
@@ -337,6 +421,167 @@ class PTYShellFactory (object) :
         return sh_slave
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _take_standby (self, info) :
+        """ get a living, not outdated shell from the standby list, if any """
+
+        if  not _factory_config['prefork_size'].get_value () :
+            return None
+
+        ttl      = _factory_config['prefork_ttl'].get_value ()
+        sh_slave = None
+        expired  = list ()
+
+        with self.rlock :
+
+            while info['standby'] :
+
+                pty, since = info['standby'].pop (0)
+
+                if  time.time () - since < ttl and pty.alive () :
+                    sh_slave = pty
+                    break
+
+                expired.append (pty)
+
+            if  sh_slave : info['standby_hits']   += 1
+            else         : info['standby_misses'] += 1
+
+            info['logger'].debug ("standby shell %s for %s (hit rate %d/%d)" \
+                               % (['miss', 'hit'][bool (sh_slave)], info['host_str'],
+                                  info['standby_hits'],
+                                  info['standby_hits'] + info['standby_misses']))
+
+        for pty in expired :
+            pty.finalize ()
+
+        return sh_slave
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _reap_standby (self, info) :
+        """
+        remove outdated and dead shells from the standby list, and return the
+        time until the next remaining standby shell expires (or None)
+        """
+
+        ttl     = _factory_config['prefork_ttl'].get_value ()
+        now     = time.time ()
+        expired = list ()
+
+        with self.rlock :
+
+            for entry in info['standby'][:] :
+
+                pty, since = entry
+
+                if  now - since >= ttl or not pty.alive () :
+                    info['standby'].remove (entry)
+                    expired.append (pty)
+
+            if  info['standby'] :
+                next_expiry = min ([since for _, since in info['standby']]) + ttl - now
+            else :
+                next_expiry = None
+
+        for pty in expired :
+            pty.finalize ()
+
+        return next_expiry
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _refill_standby (self, info) :
+        """
+        fill up the standby list of the given master in the background.  Once
+        the list is full, a timer is set to reap and replace the standby shells
+        when they expire, so that outdated shells do not linger until the next
+        shell request.
+        """
+
+        size = _factory_config['prefork_size'].get_value ()
+
+        with self.rlock :
+
+            if  not size or info['standby_thread'] :
+                return
+
+            if  info['standby_timer'] :
+                info['standby_timer'].cancel ()
+                info['standby_timer'] = None
+
+            def _refill () :
+
+                try :
+                    while True :
+
+                        next_expiry = self._reap_standby (info)
+
+                        with self.rlock :
+                            # check and exit atomically, so that no refill
+                            # request gets lost
+                            if  len (info['standby']) >= size :
+                                info['standby_thread'] = None
+
+                                if  next_expiry is not None :
+                                    timer = threading.Timer (max (0.0, next_expiry),
+                                                             self._refill_standby, [info])
+                                    timer.daemon          = True
+                                    info['standby_timer'] = timer
+                                    timer.start ()
+                                return
+
+                        sh_slave = self._spawn_shell (info)
+
+                        with self.rlock :
+                            info['standby'].append ([sh_slave, time.time ()])
+
+                except Exception as e :
+                    info['logger'].warn ("could not prefork shell for %s: %s" \
+                                      % (info['host_str'], e))
+                    with self.rlock :
+                        info['standby_thread'] = None
+
+            info['standby_thread']        = threading.Thread (target=_refill,
+                                                  name='PTYShellFactory.prefork')
+            info['standby_thread'].daemon = True
+            info['standby_thread'].start ()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def standby_stats (self) :
+        """
+        Report the number of standby shells taken (hits) and of shells which
+        had to be created on request (misses) per master connection, as dict
+        indexed by (host, user, type) tuples.
+        """
+
+        stats = dict ()
+
+        with self.rlock :
+
+            for host_s in self.registry :
+                for user_s in self.registry[host_s] :
+                    for type_s, info in self.registry[host_s][user_s].items () :
+
+                        hits   = info['standby_hits']
+                        misses = info['standby_misses']
+                        total  = hits + misses
+
+                        stats[(host_s, user_s, type_s)] = {
+                            'hits'     : hits,
+                            'misses'   : misses,
+                            'hit_rate' : float (hits) / total if total else 0.0,
+                            'ready'    : len (info['standby'])
+                        }
+
+        return stats
+
+
     # --------------------------------------------------------------------------
     #
     def run_copy_to (self, info, src, tgt, cp_flags="") :
@@ -395,6 +640,209 @@ class PTYShellFactory (object) :
         info['logger'].debug ("copy done")
 
 
+    # --------------------------------------------------------------------------
+    #
+    def run_tar_to (self, info, src, tgt, compress=False) :
+        """
+        This streams the local directory tree src as tar archive through
+        a (pty-less) slave connection into a remote 'tar -x', which unpacks it
+        at the remote path tgt.  Compared to 'sftp put -r', this saves one
+        round trip per tree entry.
+        """
+
+        z    = ['', 'z'][bool (compress)]
+        name = os.path.basename (os.path.normpath (src))
+        repl = {'tgt' : tgt, 'name' : name, 'z' : z}
+
+        packer = ['tar', '-c%sf' % z, '-', '-C', src, '.']
+        slave  = self._tar_slave (info, _TAR_EXTRACT % repl)
+
+        self._run_tar (info, packer, slave)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run_tar_from (self, info, src, tgt, compress=False) :
+        """
+        The counterpart to :func:`run_tar_to`: a remote 'tar -c' streams the
+        remote directory tree src into a local 'tar -x'.
+        """
+
+        z    = ['', 'z'][bool (compress)]
+        repl = {'src' : src, 'z' : z}
+
+        if  os.path.isdir (tgt) :
+            tgt = os.path.join (tgt, os.path.basename (os.path.normpath (src)))
+
+        if  not os.path.isdir (tgt) :
+            os.makedirs (tgt)
+
+        slave    = self._tar_slave (info, _TAR_CREATE % repl)
+        unpacker = ['tar', '-x%sf' % z, '-', '-C', tgt]
+
+        self._run_tar (info, slave, unpacker)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _tar_slave (self, info, tar_cmd) :
+        """ the slave command line which runs tar_cmd on the remote host """
+
+        repl = dict ({'tar_cmd' : pipes.quote (tar_cmd)}.items () + info.items ())
+
+        return _SCRIPTS[info['type']]['tar'] % repl
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _run_tar (self, info, packer, unpacker) :
+        """
+        Pipe the output of the packer command into the unpacker command.  The
+        tar stream is binary, so (other than the copy slaves) the slave
+        connection does not use a pty.  Both ends must succeed.
+        """
+
+        info['logger'].debug ("tar stream: %s | %s" % (packer, unpacker))
+
+        # error output goes to files, so that it cannot block the pipeline
+        p_err = tempfile.TemporaryFile ()
+        u_err = tempfile.TemporaryFile ()
+
+        try :
+            p_proc = subprocess.Popen (packer,   shell=isinstance (packer, basestring),
+                                       stdout=subprocess.PIPE, stderr=p_err)
+            u_proc = subprocess.Popen (unpacker, shell=isinstance (unpacker, basestring),
+                                       stdin=p_proc.stdout, stdout=u_err,
+                                       stderr=subprocess.STDOUT)
+
+            # the unpacker owns the pipe now
+            p_proc.stdout.close ()
+
+            u_proc.wait ()
+            p_proc.wait ()
+
+            if  p_proc.returncode != 0 or u_proc.returncode != 0 :
+                p_err.seek (0)
+                u_err.seek (0)
+                raise se.NoSuccess._log (info['logger'], "tar stream failed (%s, %s): %s %s" \
+                                      % (p_proc.returncode, u_proc.returncode,
+                                         p_err.read ()[-256:], u_err.read ()[-256:]))
+
+        finally :
+            p_err.close ()
+            u_err.close ()
+
+        info['logger'].debug ("tar stream done")
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run_copy_to_many (self, info, pairs, cp_flags="") :
+        """ 
+        This initiates one slave copy connection, and copies all given (src,
+        tgt) pairs over it.  Src is interpreted as local path, tgt as path on
+        the remote host.  See :func:`_run_copy_many` for the return value.
+        """
+
+        return self._run_copy_many (info, 'to', pairs, cp_flags)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run_copy_from_many (self, info, pairs, cp_flags="") :
+        """ 
+        This initiates one slave copy connection, and copies all given (src,
+        tgt) pairs over it.  Src is interpreted as path on the remote host, tgt
+        as local path.  See :func:`_run_copy_many` for the return value.
+        """
+
+        return self._run_copy_many (info, 'from', pairs, cp_flags)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _run_copy_many (self, info, mode, pairs, cp_flags) :
+        """
+        Run one copy command per (src, tgt) pair on a single copy slave, and
+        wait for the copy prompt (sftp) or completion marker (sh) after each.
+        Returns a list of (ret, out) tuples, one per pair: ret is 0 if the copy
+        succeeded, and out contains the error output otherwise.  A failing
+        copy does not abort the other ones -- but if the copy slave itself
+        fails, a NoSuccess is raised.
+        """
+
+        scripts = _SCRIPTS[info['type']]
+        done    = re.compile (scripts['copy_many_done'], re.MULTILINE)
+        results = list ()
+
+        # at this point, we do have a valid, living master
+        s_cmd    = scripts['copy_%s' % mode] % info
+        cp_slave = saga.utils.pty_process.PTYProcess (s_cmd, info['logger'])
+
+        try :
+            self._initialize_pty (cp_slave, info)
+
+            for pair in [None] + list (pairs) :
+
+                if  pair is None :
+                    s_in = scripts['copy_many_init'] % info
+
+                else :
+                    repl = dict ({'src'      : pair[0], 
+                                  'tgt'      : pair[1], 
+                                  'cp_flags' : cp_flags}.items ()+ info.items ())
+                    s_in = scripts['copy_%s_many' % mode] % repl
+
+                cp_slave.write ("%s\n" % s_in)
+                _, match = cp_slave.find ([scripts['copy_many_done']], timeout=-1)
+
+                if  not match :
+                    raise se.NoSuccess._log (info['logger'], "file copy failed: %s" \
+                                          % cp_slave.cache[-256:])
+
+                if  pair is not None :
+                    results.append (self._eval_copy (done, s_in, match))
+
+            cp_slave.write ("exit\n")
+            cp_slave.wait  ()
+
+        finally :
+            cp_slave.finalize ()
+
+        info['logger'].debug ("copy done (%d files, %d failed)" \
+                           % (len (results), len ([r for r in results if r[0]])))
+
+        return results
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _eval_copy (self, done, s_in, match) :
+        """ 
+        derive (ret, out) from the output of one copy command, up to the
+        completion pattern
+        """
+
+        result = done.search (match)
+        out    = _ANSI_ESCAPE.sub ('', match[:result.start ()])
+
+        if  result.groups () :
+            # the marker reports the exit code
+            return (int (result.group (1)), out.strip ())
+
+        # sftp does not report exit codes -- anything but the command echo and
+        # progress info is an error message
+        errors = list ()
+        for line in out.split ('\n') :
+            line = line.strip ()
+            if  line and line != s_in.strip () and \
+                not line.startswith ('Uploading ') and \
+                not line.startswith ('Fetching ')      :
+                errors.append (line)
+
+        return (int (bool (errors)), '\n'.join (errors))
+
+
     # --------------------------------------------------------------------------
     #
     def _create_master_entry (self, url, session, logger) :
@@ -0,0 +1,343 @@
+
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2012-2013, The SAGA Project"
+__license__   = "MIT"
+
+
+import time
+import weakref
+import threading
+
+import saga.exceptions              as se
+import saga.utils.config            as suc
+import saga.utils.logger            as sul
+import saga.utils.singleton         as sus
+import saga.utils.pty_shell         as sups
+import saga.utils.pty_shell_factory as supsf
+
+
+# --------------------------------------------------------------------
+#
+_pool_options = [
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'pool_size',
+    'type'          : int,
+    'default'       : 10,
+    'valid_options' : None,
+    'documentation' : 'maximum number of pooled shells per host, user, '
+                      'credentials and shell type (ssh allows 10 sessions '
+                      'per master connection by default, see MaxSessions in '
+                      'sshd_config).',
+    'env_variable'  : 'SAGA_PTY_POOL_SIZE'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'pool_idle_timeout',
+    'type'          : int,
+    'default'       : 60,
+    'valid_options' : None,
+    'documentation' : 'pooled shells which are not used for that many seconds '
+                      'are closed.',
+    'env_variable'  : 'SAGA_PTY_POOL_IDLE_TIMEOUT'
+    },
+    {
+    'category'      : 'saga.utils.pty',
+    'name'          : 'pool_timeout',
+    'type'          : int,
+    'default'       : 60,
+    'valid_options' : None,
+    'documentation' : 'number of seconds to wait for a pooled shell to become '
+                      'available if the pool for a host is exhausted.',
+    'env_variable'  : 'SAGA_PTY_POOL_TIMEOUT'
+    }
+]
+
+_pool_config = suc.Configurable ('saga.utils.pty', _pool_options).get_config ()
+
+
+# --------------------------------------------------------------------
+#
+def _session_key (session) :
+    """
+    Identify the credentials of a session by the attributes of its contexts.
+    Shells are authenticated with those credentials, so shells for different
+    contexts must not be shared, even if they go to the same host and user.
+    """
+
+    if  not session :
+        return None
+
+    return tuple ([str (sorted (c.as_dict ().items ())) for c in session.contexts])
+
+
+# --------------------------------------------------------------------
+#
+class PTYShellPool (object) :
+    """
+    This class maintains a bounded pool of :class:`saga.utils.pty_shell.PTYShell`
+    instances per host, user, shell type (the key which is used by
+    :class:`saga.utils.pty_shell_factory.PTYShellFactory` for the master
+    connections) and session credentials (the contexts of the session -- see
+    :func:`_session_key`).  Creating a shell costs (at least) one round trip to the
+    remote host plus the shell startup -- adaptors which create many short
+    lived objects for the same host (like file and directory instances) can
+    instead check out an already running shell, and check it back in when they
+    are done::
+
+        pool  = saga.utils.pty_shell_pool.PTYShellPool ()
+        shell = pool.checkout ("ssh://remote.host.net/", session, logger)
+        try :
+            ret, out, _ = shell.run_sync ("ls /tmp/")
+        finally :
+            pool.checkin (shell)
+
+    On checkout, an idle shell is health-checked (:func:`PTYShell.alive`), and
+    is replaced if it died.  If no idle shell exists, a new one is created --
+    unless the pool for that host holds ``pool_size`` shells already, in which
+    case checkout waits up to ``pool_timeout`` seconds for a shell to be checked
+    in, and raises :class:`saga.Timeout` otherwise.
+
+    That limit only applies to short checkouts (like a shell used for a single
+    copy operation).  Users which hold on to their shell for a long time (like
+    file and directory instances) check out with ``limited=False``: they reuse
+    an idle shell if one exists, and get a new shell otherwise -- they never
+    wait, and their shells do not count against ``pool_size`` while they are
+    checked out.
+
+    On checkin, the shell is reset (:func:`PTYShell.reset`), i.e. it gets its
+    default prompt back and changes into the home directory.  Shells which
+    fail to reset are closed.  Idle shells are closed after
+    ``pool_idle_timeout`` seconds (this is checked whenever the pool is used).
+
+    Shells which are not checked in, but simply dropped by their users, free
+    their pool slot when they get garbage collected.
+
+    The pool is a singleton.
+    """
+
+    __metaclass__ = sus.Singleton
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self) :
+
+        self.logger  = sul.getLogger ('PTYShellPool')
+        self.factory = supsf.PTYShellFactory ()
+        self._cond   = threading.Condition (threading.RLock ())
+        self._pools  = dict ()  # key: {'idle' : [[shell, since], ...],
+                                #       'busy' : {id(shell) : weakref},
+                                #       'held' : {id(shell) : weakref},
+                                #       'new'  : number of shells in creation}
+
+
+    # ----------------------------------------------------------------
+    #
+    def checkout (self, url, session=None, logger=None, opts={}, limited=True) :
+        """
+        Get a shell for the given url -- either an idle one from the pool, or
+        a new one.  Unless `limited` is False, the number of shells per pool
+        is bounded by ``pool_size`` (see class documentation).
+        """
+
+        info = self.factory.initialize (url, session, logger)
+        key  = (str(info['host_str']), str(info['user']), str(info['type']),
+                str(opts.get ('shell')), _session_key (session))
+
+        size    = _pool_config['pool_size'   ].get_value ()
+        timeout = _pool_config['pool_timeout'].get_value ()
+        start   = time.time ()
+
+        self._evict ()
+
+        while True :
+
+            with self._cond :
+
+                pool = self._pools.setdefault (key, {'idle' : list (),
+                                                     'busy' : dict (),
+                                                     'held' : dict (),
+                                                     'new'  : 0})
+                shell = None
+
+                if  pool['idle'] :
+                    # most recently used shell first
+                    shell, _ = pool['idle'].pop ()
+                    self._track (key, shell, limited)
+
+                elif not limited :
+                    # create a new shell outside of the limit (it only counts
+                    # while it is being created)
+                    pool['new'] += 1
+
+                elif len (pool['idle']) + len (pool['busy']) + pool['new'] < size :
+                    # reserve a slot for a new shell
+                    pool['new'] += 1
+
+                else :
+                    left = start + timeout - time.time ()
+                    if  left <= 0 :
+                        raise se.Timeout ("no shell available for %s (pool size %d)" \
+                                       % (url, size))
+                    self._cond.wait (left)
+                    continue
+
+            if  shell :
+
+                # we hand out living shells only
+                try :
+                    if  shell.alive () :
+                        if  logger :
+                            shell.logger = logger
+                        self.logger.debug ("reuse pooled shell %s for %s" % (shell, url))
+                        return shell
+
+                except Exception as e :
+                    pass
+
+                self.logger.debug ("drop dead pooled shell %s" % shell)
+                self._release (shell)
+                shell.finalize (kill_pty=True)
+                continue
+
+            # create a new shell in the slot reserved above
+            try :
+                shell = sups.PTYShell (url, session, logger, opts=opts)
+
+            except Exception as e :
+                with self._cond :
+                    pool['new'] -= 1
+                    self._cond.notify_all ()
+                raise
+
+            with self._cond :
+                pool['new'] -= 1
+                self._track (key, shell, limited)
+                self._cond.notify_all ()
+
+            self.logger.debug ("new pooled shell %s for %s" % (shell, url))
+
+            return shell
+
+
+    # ----------------------------------------------------------------
+    #
+    def checkin (self, shell) :
+        """
+        Return a shell obtained via :func:`checkout` to the pool.  The caller
+        must not use the shell anymore.
+        """
+
+        key = getattr (shell, '_pool_key', None)
+
+        if  key is None :
+            # not ours
+            shell.finalize (kill_pty=True)
+            return
+
+        try :
+            # don't revive dead shells -- they get replaced on checkout
+            reusable = shell.alive ()
+            if  reusable :
+                shell.reset ()
+
+        except Exception as e :
+            self.logger.debug ("cannot reset pooled shell %s: %s" % (shell, e))
+            reusable = False
+
+        size = _pool_config['pool_size'].get_value ()
+
+        with self._cond :
+
+            if  self._release (shell) and reusable :
+
+                # shells which were checked out w/o limit are only kept if
+                # there is room in the pool
+                pool = self._pools[key]
+                if  len (pool['idle']) + len (pool['busy']) + pool['new'] < size :
+                    pool['idle'].append ([shell, time.time ()])
+                    shell = None
+
+        if  shell :
+            shell.finalize (kill_pty=True)
+
+        self._evict ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _track (self, key, shell, limited=True) :
+        """ mark a shell as busy (or as held, if it does not count against the
+            pool size) """
+
+        with self._cond :
+
+            pool = self._pools[key]
+            sid  = id(shell)
+            slot = 'busy'
+
+            if  not limited :
+                slot = 'held'
+
+            shell._pool_key = key
+
+            # if the user drops the shell w/o checkin, we free its slot
+            def _dropped (ref) :
+                with self._cond :
+                    if  pool[slot].get (sid) is ref :
+                        del pool[slot][sid]
+                        self._cond.notify_all ()
+
+            pool[slot][sid] = weakref.ref (shell, _dropped)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _release (self, shell) :
+        """ free the slot of a busy or held shell -- returns False if it was
+            neither """
+
+        with self._cond :
+
+            pool  = self._pools.get (shell._pool_key)
+            found = pool is not None and \
+                    (pool['busy'].pop (id(shell), None) is not None or \
+                     pool['held'].pop (id(shell), None) is not None)
+
+            self._cond.notify_all ()
+
+            return found
+
+
+    # ----------------------------------------------------------------
+    #
+    def _evict (self) :
+        """ close shells which idled for too long """
+
+        timeout = _pool_config['pool_idle_timeout'].get_value ()
+        now     = time.time ()
+        evicted = list ()
+
+        with self._cond :
+
+            for key, pool in self._pools.items () :
+
+                for entry in list (pool['idle']) :
+                    if  now - entry[1] > timeout :
+                        pool['idle'].remove (entry)
+                        evicted.append (entry[0])
+
+                if  not pool['idle'] and not pool['busy'] and \
+                    not pool['held'] and not pool['new'] :
+                    del self._pools[key]
+
+            if  evicted :
+                self._cond.notify_all ()
+
+        for shell in evicted :
+            self.logger.debug ("evict idle pooled shell %s" % shell)
+            shell.finalize (kill_pty=True)
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
@@ -145,22 +145,56 @@ __license__   = "MIT"
 # The (3 times longer) source code with self-tests is available from:
 # http://www.targeted.org/python/recipes/typecheck.py
 #
+#
+# Signature checks can run in one of three modes, selected by the
+# 'saga.utils.signatures.mode' config option (or the SAGA_SIGNATURE_CHECKS
+# environment variable):
+#
+# --------- mode -------     ------------- semantics -------------
+# checked                ==> the checkers are evaluated on each call, by
+#                            a generic invocation proxy
+# compiled               ==> on decoration, a specialized invocation proxy is
+#                            generated for each signature (default)
+# disabled               ==> no checks, the decorators return the methods
+#                            unchanged (i.e. there is no proxy overhead at all)
+#
+# The mode is evaluated when the decorators are applied, i.e. on module import,
+# so it needs to be set before saga is imported.
+#
 ################################################################################
 
 __all__ = [ "takes",    "InputParameterError",   "returns", "ReturnValueError", 
             "optional", "nothing",   "anything", "list_of", "tuple_of", "dict_of",
             "by_regex", "with_attr", "one_of",   "set_of" ]
 
-no_check = False  # set this to True to turn all checks off
-no_return_check = True  # set this to True to turn return value cchecks off
-
-################################################################################
-
 from traceback import extract_stack
 from inspect   import getargspec, isfunction, isbuiltin, isclass
 from types     import NoneType
 from re        import compile as regex
 
+import saga.utils.config as suc
+
+################################################################################
+
+_signature_options = [
+    { 
+    'category'      : 'saga.utils.signatures',
+    'name'          : 'mode', 
+    'type'          : str, 
+    'default'       : 'compiled',
+    'valid_options' : ['checked', 'compiled', 'disabled'],
+    'documentation' : 'how method signatures are checked: by generic checkers, '
+                      'by checkers compiled per signature, or not at all.',
+    'env_variable'  : 'SAGA_SIGNATURE_CHECKS'
+    }
+]
+
+mode = suc.Configurable ('saga.utils.signatures', _signature_options) \
+          .get_config ()['mode'].get_value ()
+
+no_check = (mode == 'disabled')  # set this to True to turn all checks off
+no_return_check = True  # set this to True to turn return value cchecks off
+
 ################################################################################
 # 
 # make sure that signature errors are returnes as saga.BadParameter exceptions
@@ -396,6 +430,97 @@ def raise_type_exception (method, arg0, i, arg, kwname="") :
     raise se.BadParameter (msg)
 
 
+################################################################################
+#
+# compiled checks: for each checker, we create a python expression which
+# evaluates the check inline (for type checks), or which calls the most
+# specific check function available.  The expressions for a signature are then
+# compiled into a single invocation proxy.
+#
+
+def _str_check (reference):
+    "Returns a StrChecker equivalent, which caches results per value type"
+
+    cache = {}
+
+    def str_check (value):
+        t = type (value)
+        try:
+            return cache[t]
+        except KeyError:
+            value_base_names = base_names (t)
+            cache[t] = reference in value_base_names or \
+                       "instance" in value_base_names
+            return cache[t]
+
+    return str_check
+
+
+def _check_expr (checker, name, value, env):
+    "Returns an expression for the given checker and value, and fills env"
+
+    if  isinstance (checker, TypeChecker):
+        env[name] = checker.reference
+        return "isinstance (%s, %s)" % (value, name)
+
+    if  isinstance (checker, TupleChecker) and \
+        not filter (lambda c: not isinstance (c, TypeChecker), checker.reference):
+        env[name] = tuple ([c.reference for c in checker.reference])
+        return "isinstance (%s, %s)" % (value, name)
+
+    if  isinstance (checker, StrChecker):
+        env[name] = _str_check (checker.reference)
+
+    elif isinstance (checker, CallableChecker):
+        env[name] = checker.reference
+
+    else:
+        env[name] = checker.check
+
+    return "%s (%s)" % (name, value)
+
+
+def _compile_takes (method, checkers, kwcheckers):
+    """
+    Returns a specialized invocation proxy for the given method and checkers.
+
+    Note that, unlike the generic proxy, the compiled proxy does not append
+    (and check) default parameters: the generic proxy usually wraps a @returns
+    proxy and thus never sees the defaults anyway -- but in compiled mode, the
+    @returns proxy is skipped.
+    """
+
+    env = {'method'               : method,
+           'raise_type_exception' : raise_type_exception}
+
+    src  = "def takes_invocation_proxy (*pargs, **pkwargs):\n"
+    src += "    n = len (pargs)\n"
+
+    # check the types of the actual call parameters
+    for i, checker in enumerate (checkers):
+        expr = _check_expr (checker, "_c%d" % i, "pargs[%d]" % i, env)
+        src += "    if  n > %d and not %s:\n" % (i, expr)
+        src += "        raise_type_exception (method, pargs[0], %d, pargs[%d])\n" % (i, i)
+
+    for j, (kwname, checker) in enumerate (kwcheckers.iteritems ()):
+        value = "pkwargs.get (%r, None)" % kwname
+        expr  = _check_expr (checker, "_k%d" % j, value, env)
+        src += "    if  not %s:\n" % expr
+        src += "        raise_type_exception (method, pargs and pargs[0], 0, %s, %r)\n" \
+             % (value, kwname)
+
+    src += "    return method (*pargs, **pkwargs)\n"
+
+    # the proxy's frames must be recognized as part of this module, so that
+    # raise_type_exception reports the caller, not the proxy.  The name is in
+    # angle brackets, so that tracebacks do not show lines of this file.
+    exec compile (src, "<%s: takes_invocation_proxy>" % __file__, 'exec') in env
+
+    takes_invocation_proxy = env['takes_invocation_proxy']
+    takes_invocation_proxy.__name__ = method.__name__
+    return takes_invocation_proxy
+
+
 ################################################################################
 
 def takes (*args, **kwargs):
@@ -424,6 +549,11 @@ def takes (*args, **kwargs):
         def takes_proxy (method):
             return method        
 
+    elif mode == 'compiled':
+
+        def takes_proxy (method):
+            return _compile_takes (method, checkers, kwcheckers)
+
     else:
 
         def takes_proxy (method):
@@ -467,7 +597,9 @@ def returns (sometype):
         raise TypeError ("@returns decorator got parameter of unsupported "
                          "type %s" % type_name (sometype))
 
-    if no_check: # no type checking is performed, return decorated method itself
+    if no_check or (no_return_check and mode == 'compiled'):
+        # no type checking is performed, return decorated method itself.  If
+        # return checks are disabled, the compiled mode also skips the proxy.
 
         def returns_proxy (method):
             return method
@@ -0,0 +1,76 @@
+
+"""
+Measure the startup time of short-lived SAGA processes, with eager and with
+lazy adaptor loading (see the 'saga.engine.lazy_adaptor_loading' option).
+
+Each iteration runs a fresh Python interpreter which imports saga, creates the
+default session, and looks up the adaptors for the given job service URL
+schema -- which is what a short-lived command line tool does before it does
+any actual work.
+
+Usage: python engine_startup.py [iterations] [schema]
+"""
+
+import os
+import sys
+import math
+import time
+import subprocess
+
+
+# ------------------------------------------------------------------------------
+#
+_STARTUP = """
+import saga
+import saga.engine.engine
+saga.Session ()
+saga.engine.engine.Engine ().find_adaptors ('saga.job.Service', '%s')
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_startup (lazy, iterations, schema) :
+
+    env = dict (os.environ)
+    env['SAGA_LAZY_ADAPTOR_LOADING'] = str (lazy)
+
+    times = []
+    for i in range (0, iterations) :
+
+        start = time.time ()
+        ret   = subprocess.call ([sys.executable, '-c', _STARTUP % schema], env=env)
+        times.append (time.time () - start)
+
+        if  ret :
+            raise Exception ("startup failed (%s)" % ret)
+
+    vmean = sum (times) / len (times)
+    vsdev = math.sqrt (sum ((x - vmean) ** 2 for x in times) / len (times))
+
+    return (vmean, vsdev, min (times), max (times))
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    iterations = 20
+    schema     = 'fork'
+
+    if  len (sys.argv) > 1 : iterations = int (sys.argv[1])
+    if  len (sys.argv) > 2 : schema     =      sys.argv[2]
+
+    print "\nBenchmark : engine startup : %s:// (%d iterations)\n" % (schema, iterations)
+
+    results = {}
+    for lazy in [False, True] :
+        results[lazy] = benchmark_startup (lazy, iterations, schema)
+        print "  lazy=%-5s : mean %8.4fs  sdev %8.4fs  min %8.4fs  max %8.4fs" \
+            % ((lazy,) + results[lazy])
+
+    print "\n  speedup    : %8.2f\n" % (results[False][0] / results[True][0])
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
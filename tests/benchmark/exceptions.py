@@ -0,0 +1,106 @@
+
+"""
+Measure the cost of raising and catching SAGA exceptions.
+
+SAGA exceptions only keep a cheap stack summary on construction, and render
+traceback and messages on first access.  This benchmark measures raise/catch
+alone, raise/catch with message or traceback rendering, exception stacking as
+done on adaptor binding, and -- for reference -- raise/catch with an eagerly
+rendered traceback (which was the previous behavior).  Exceptions are raised
+at a configurable call depth, to mimic the stacks found in adaptor code.
+
+Usage: python exceptions.py [iterations] [depth]
+"""
+
+import sys
+import time
+
+import saga
+import saga.utils.exception as sue
+
+
+# ------------------------------------------------------------------------------
+#
+def nested (depth, func) :
+
+    if  depth :
+        return nested (depth - 1, func)
+
+    return func ()
+
+
+# ------------------------------------------------------------------------------
+#
+def raise_catch () :
+
+    try :
+        raise saga.NoSuccess ("operation failed")
+    except saga.SagaException as e :
+        return e
+
+
+def raise_catch_str () :
+
+    return str (raise_catch ())
+
+
+def raise_catch_traceback () :
+
+    return raise_catch ().traceback
+
+
+def raise_catch_eager () :
+
+    e = raise_catch ()
+    e._traceback = sue.get_traceback (1)
+    return e
+
+
+def stack_exceptions () :
+
+    exception = saga.NoSuccess ("binding adaptor failed")
+    for i in range (0, 3) :
+        exception._add_exception (raise_catch ())
+
+    try :
+        raise exception._get_exception_stack ()
+    except saga.SagaException as e :
+        return e
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark (func, iterations, depth) :
+
+    start = time.time ()
+    for i in range (0, iterations) :
+        nested (depth, func)
+
+    return (time.time () - start) / iterations
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    iterations = 10000
+    depth      = 20
+
+    if  len (sys.argv) > 1 : iterations = int (sys.argv[1])
+    if  len (sys.argv) > 2 : depth      = int (sys.argv[2])
+
+    print "\nBenchmark : exceptions (%d iterations, depth %d)\n" % (iterations, depth)
+
+    for name, func in [('raise/catch',           raise_catch),
+                       ('raise/catch + str',     raise_catch_str),
+                       ('raise/catch + trace',   raise_catch_traceback),
+                       ('stack (3 exceptions)',  stack_exceptions),
+                       ('eager traceback (ref)', raise_catch_eager)] :
+
+        print "  %-22s : %8.2f us" % (name, benchmark (func, iterations, depth) * 1e6)
+
+    print
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
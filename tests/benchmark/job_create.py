@@ -0,0 +1,57 @@
+
+import os
+import sys
+import saga
+
+import saga.utils.misc as sumisc
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_pre (test_cfg, bench_cfg, session) :
+
+    if  not 'job_service_url' in test_cfg :
+        sumisc.benchmark_eval ('no job service URL configured')
+
+    HOST = test_cfg['job_service_url']
+
+    js = saga.job.Service ("%s" % HOST, session=session) 
+    jd = saga.job.Description()
+
+    jd.executable = '/bin/sleep'
+    jd.arguments  = ['1']
+
+    return {'js' : js, 'jd' : jd}
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_core (args={}) :
+
+    # only job object creation, no submission -- this measures the API and
+    # engine overhead per job object
+    js = args['js']
+    jd = args['jd']
+
+    j  = js.create_job (jd)
+
+    return args
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_post (args={}) :
+
+    pass
+
+
+# ------------------------------------------------------------------------------
+#
+try:
+
+    sumisc.benchmark_init ('job.create', benchmark_pre, benchmark_core, benchmark_post)
+
+except saga.SagaException, ex:
+    print "An exception occured: (%s) %s " % (ex.type, (str(ex)))
+    print " \n*** Backtrace:\n %s" % ex.traceback
+
+
@@ -0,0 +1,75 @@
+
+"""
+Benchmark the job submission throughput of the shell job adaptor, with the
+classic and the lean launch path of the remote wrapper script, and with
+synchronous and asynchronous job submission.
+
+Usage: python job_submit.py [url] [jobs]
+"""
+
+import sys
+import time
+
+import saga
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark (url, n_jobs) :
+
+    js = saga.job.Service (url)
+    jd = saga.job.Description ()
+
+    jd.executable = '/bin/sleep'
+    jd.arguments  = ['1']
+
+    jobs  = list ()
+    start = time.time ()
+    for i in range (0, n_jobs) :
+        job = js.create_job (jd)
+        job.run ()
+        jobs.append (job)
+    submit = time.time () - start
+
+    for job in jobs :
+        job.wait ()
+
+    js.close ()
+
+    return submit
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    url    = "fork://localhost/"
+    n_jobs = 100
+
+    if  len (sys.argv) > 1 : url    = sys.argv[1]
+    if  len (sys.argv) > 2 : n_jobs = int (sys.argv[2])
+
+    print "\nBenchmark : job submission throughput (%s, %d jobs)\n" % (url, n_jobs)
+
+    adaptor = saga.engine.engine.Engine ().get_adaptor ('saga.adaptor.shell_job')
+    lean    = adaptor.lean_launch
+    asynch  = adaptor.async_submit
+
+    for name, mode, submit_mode in [('classic',       False, False),
+                                    ('lean',          True,  False),
+                                    ('classic async', False, True ),
+                                    ('lean async',    True,  True )] :
+
+        adaptor.lean_launch  = mode
+        adaptor.async_submit = submit_mode
+        submit = benchmark (url, n_jobs)
+
+        print "  %-14s : %8.3fs  (%7.1f jobs/s)" % (name, submit, n_jobs / submit)
+
+    adaptor.lean_launch  = lean
+    adaptor.async_submit = asynch
+    print
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
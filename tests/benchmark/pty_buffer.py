@@ -0,0 +1,178 @@
+
+"""
+Benchmark the PTYProcess I/O cache (saga.utils.pty_process.PTYBuffer) on large
+shell outputs.
+
+The first part feeds the given amount of shell output (lines with '\\r\\n' line
+endings, as delivered by a pty) in memory into the cache, and consumes it
+again, in three patterns:
+
+  - 'accumulate' : all output is collected before it is consumed, as on
+                   PTYProcess.find() for a command with large output
+  - 'sized reads': the output is consumed in small pieces while it arrives,
+                   as on PTYProcess.read(size=n)
+  - 'drain'      : the output is cached first, and then consumed in small
+                   pieces (as on PTYProcess.read(size=n) after a find()).  As
+                   this is quadratic for the string based cache, it is run on
+                   (at most) 10 MB.
+
+All patterns are run against PTYBuffer, and against the string based cache
+handling PTYProcess used before (for reference).
+
+The second part runs a process which prints the same amount of output, and
+drains it through PTYProcess.read(), with fixed and with adaptive read sizes.
+
+Usage: python pty_buffer.py [megabytes]
+"""
+
+import sys
+import time
+
+import saga.utils.pty_process as supp
+
+
+_LINE = ("x" * 98) + "\r\n"
+
+
+# ------------------------------------------------------------------------------
+#
+class LegacyBuffer (object) :
+    """ the string based cache handling PTYProcess used before """
+
+    def __init__ (self) :
+        self.cache = ""
+
+    def __len__ (self) :
+        return len (self.cache)
+
+    def append (self, data) :
+        self.cache += data.replace ('\r', '')
+
+    def consume (self, size=None) :
+        if  size is None :
+            ret, self.cache = self.cache, ""
+        else :
+            ret        = self.cache[:size]
+            self.cache = self.cache[size:]
+        return ret
+
+
+# ------------------------------------------------------------------------------
+#
+def accumulate (buf, chunk, n) :
+
+    data = ""
+    for i in range (0, n) :
+        buf.append (chunk)
+        data += buf.consume ()  # PTYProcess.find used to re-concatenate...
+    return len (data)
+
+
+def accumulate_new (buf, chunk, n) :
+
+    for i in range (0, n) :
+        buf.append (chunk)      # ... PTYBuffer keeps the data in place
+    return len (buf.consume ())
+
+
+def sized_reads (buf, chunk, n, size=4096) :
+
+    total = 0
+    for i in range (0, n) :
+        buf.append (chunk)
+        while len (buf) >= size :
+            total += len (buf.consume (size))
+    return total + len (buf.consume ())
+
+
+def drain (buf, chunk, n, size=4096) :
+
+    for i in range (0, n) :
+        buf.append (chunk)
+
+    total = 0
+    while len (buf) :
+        total += len (buf.consume (size))
+    return total
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_memory (megabytes) :
+
+    chunk = _LINE * 655                         # ~64kB per pty read
+    n     = (megabytes << 20) / len (chunk)
+
+    print "  in memory, %d MB in %d chunks of %d bytes\n" % (megabytes, n, len(chunk))
+
+    for name, func in [('accumulate',  None), ('sized reads', sized_reads),
+                       ('drain',       drain)] :
+
+        for impl in [LegacyBuffer, supp.PTYBuffer] :
+
+            f = func
+            if  not f :
+                if  impl == LegacyBuffer : f = accumulate
+                else                     : f = accumulate_new
+
+            m = n
+            if  f == drain :
+                m = min (n, (10 << 20) / len (chunk))
+
+            start = time.time ()
+            f (impl (), chunk, m)
+            stop  = time.time ()
+
+            mb = float (m * len (chunk)) / (1 << 20)
+            print "    %-12s  %-13s : %8.3fs  (%7.1f MB/s)" \
+                % (name, impl.__name__, stop - start, mb / (stop - start))
+
+    print
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_pty (megabytes) :
+
+    lines = (megabytes << 20) / (len (_LINE) - 1)
+    cmd   = "yes '%s' | head -n %d; sleep 10" % (_LINE[:-2], lines)
+    size  = lines * (len (_LINE) - 1)  # CRs get stripped
+
+    print "  pty, %d MB through PTYProcess.read()\n" % megabytes
+
+    for name, chunksize_max in [('fixed',    supp._CHUNKSIZE),
+                                ('adaptive', supp._CHUNKSIZE_MAX)] :
+
+        pty = supp.PTYProcess (['/bin/sh', '-c', cmd])
+        pty.chunksize_max = chunksize_max
+
+        total = 0
+        start = time.time ()
+        while total < size :
+            total += len (pty.read (timeout=1.0))
+        stop  = time.time ()
+
+        pty.finalize ()
+
+        print "    %-12s  %-13s : %8.3fs  (%7.1f MB/s)" \
+            % ('read', name, stop - start, megabytes / (stop - start))
+
+    print
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    megabytes = 100
+
+    if  len (sys.argv) > 1 : megabytes = int (sys.argv[1])
+
+    print "\nBenchmark : pty I/O buffer (%d MB)\n" % megabytes
+
+    benchmark_memory (megabytes)
+    benchmark_pty    (megabytes)
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
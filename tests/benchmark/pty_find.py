@@ -0,0 +1,125 @@
+
+"""
+Benchmark the incremental pattern matching of PTYProcess.find()
+(saga.utils.pty_process.PTYMatcher) on long shell outputs.
+
+The first part feeds the given amount of shell output into a PTYBuffer, in
+chunks as delivered by a pty, and searches for a shell prompt after each chunk
+-- the prompt only shows up at the very end.  The search is done once over all
+data after each chunk (as PTYProcess.find() did before), and once
+incrementally.  As the full search is quadratic, it is run on (at most) 10 MB.
+
+The second part runs a process which prints the same amount of output, followed
+by a prompt, and waits for that prompt with PTYProcess.find().
+
+Usage: python pty_find.py [megabytes]
+"""
+
+import re
+import sys
+import time
+
+import saga.utils.pty_process as supp
+
+
+_LINE   = ("x" * 98) + "\r\n"
+_PROMPT = "PROMPT-(\d+)->$"
+
+
+# ------------------------------------------------------------------------------
+#
+def search_full (buf, chunk, n) :
+
+    regex = re.compile (_PROMPT, re.MULTILINE | re.DOTALL)
+
+    for i in range (0, n) :
+        buf.append (chunk)
+        buf.search (regex)
+
+    buf.append ("PROMPT-0->")
+    return buf.search (regex)
+
+
+def search_incremental (buf, chunk, n) :
+
+    matcher = supp.PTYMatcher (_PROMPT)
+
+    for i in range (0, n) :
+        buf.append (chunk)
+        matcher.search (buf)
+
+    buf.append ("PROMPT-0->")
+    return matcher.search (buf)
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_memory (megabytes) :
+
+    chunk = _LINE * 41                          # ~4kB per pty read
+    n     = (megabytes << 20) / len (chunk)
+
+    print "  in memory, %d MB in %d chunks of %d bytes\n" % (megabytes, n, len(chunk))
+
+    for name, func in [('full',        search_full), 
+                       ('incremental', search_incremental)] :
+
+        m = n
+        if  func == search_full :
+            m = min (n, (10 << 20) / len (chunk))
+
+        start = time.time ()
+        end   = func (supp.PTYBuffer (), chunk, m)
+        stop  = time.time ()
+
+        assert (end is not None)
+
+        mb = float (m * len (chunk)) / (1 << 20)
+        print "    %-12s : %8.3fs  (%7.1f MB/s)" \
+            % (name, stop - start, mb / (stop - start))
+
+    print
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_pty (megabytes) :
+
+    lines = (megabytes << 20) / (len (_LINE) - 1)
+    cmd   = "yes '%s' | head -n %d; echo 'PROMPT-0->'; sleep 10" \
+          % (_LINE[:-2], lines)
+
+    print "  pty, %d MB through PTYProcess.find()\n" % megabytes
+
+    pty   = supp.PTYProcess (['/bin/sh', '-c', cmd])
+
+    start = time.time ()
+    n, match = pty.find ([_PROMPT], timeout=-1)
+    stop  = time.time ()
+
+    pty.finalize ()
+
+    assert (n == 0)
+
+    print "    %-12s : %8.3fs  (%7.1f MB/s)" \
+        % ('find', stop - start, megabytes / (stop - start))
+
+    print
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    megabytes = 100
+
+    if  len (sys.argv) > 1 : megabytes = int (sys.argv[1])
+
+    print "\nBenchmark : pty pattern matching (%d MB)\n" % megabytes
+
+    benchmark_memory (megabytes)
+    benchmark_pty    (megabytes)
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
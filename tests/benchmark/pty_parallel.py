@@ -0,0 +1,112 @@
+
+"""
+Benchmark the throughput of PTYShell staging for large files: once via the
+copy process (sftp for ssh URLs, cp for sh URLs), and once in parallel chunks
+over the shell channels (see PTYShell._stage_parallel), with 1 and with N
+streams.
+
+Usage: python pty_parallel.py [url] [size_mb] [streams]
+
+For example, to compare localhost sh and ssh:
+
+    python pty_parallel.py fork://localhost/ 256 4
+    python pty_parallel.py ssh://localhost/  256 4
+"""
+
+import os
+import sys
+import time
+
+import saga
+import saga.utils.pty_shell as sups
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark (shell, src, streams) :
+    """
+    stage src to the remote host and back, and return the time for both
+    directions.  streams == 0 uses the copy process.
+    """
+
+    rem  = "%s.remote" % src
+    back = "%s.back"   % src
+
+    sizes   = sups._pty_shell_config['parallel_size']
+    option  = sups._pty_shell_config['parallel_streams']
+    old_size, old_streams = sizes.get_value (), option.get_value ()
+
+    try :
+        if  streams :
+            sizes.set_value  (1)
+            option.set_value (streams)
+
+            start = time.time ()
+            assert (shell._stage_parallel ('to', src, rem))
+            write = time.time () - start
+
+            start = time.time ()
+            assert (shell._stage_parallel ('from', rem, back))
+            read  = time.time () - start
+
+        else :
+            sizes.set_value (0)
+
+            start = time.time ()
+            shell.stage_to_remote (src, rem)
+            write = time.time () - start
+
+            start = time.time ()
+            shell.stage_from_remote (rem, back)
+            read  = time.time () - start
+
+    finally :
+        sizes.set_value  (old_size)
+        option.set_value (old_streams)
+
+    assert (os.path.getsize (back) == os.path.getsize (src))
+
+    shell.run_sync ("rm -f %s" % rem)
+    os.remove (back)
+
+    return write, read
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    url     = "fork://localhost/"
+    size    = 128
+    streams = 4
+
+    if  len (sys.argv) > 1 : url     = sys.argv[1]
+    if  len (sys.argv) > 2 : size    = int (sys.argv[2])
+    if  len (sys.argv) > 3 : streams = int (sys.argv[3])
+
+    print "\nBenchmark : pty staging throughput (%s, %d MB)\n" % (url, size)
+
+    shell = sups.PTYShell (saga.Url (url), saga.Session (default=True))
+    src   = "/tmp/saga-benchmark-parallel.%d" % os.getpid ()
+
+    with open (src, 'wb') as f :
+        for i in range (0, size) :
+            f.write (os.urandom (1024 * 1024))
+
+    try :
+        for name, n in [('copy',                         0),
+                        ('parallel, 1 stream',           1),
+                        ('parallel, %d streams' % streams, streams)] :
+
+            write, read = benchmark (shell, src, n)
+
+            print "  %-22s : to %8.3fs (%6.1f MB/s)  from %8.3fs (%6.1f MB/s)" \
+                % (name, write, size / write, read, size / read)
+
+        print
+
+    finally :
+        os.remove (src)
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
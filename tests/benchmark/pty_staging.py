@@ -0,0 +1,77 @@
+
+"""
+Benchmark the latency of PTYShell.write_to_remote() and read_from_remote() for
+small payloads (like job scripts or the shell job wrapper), once in-band over
+the shell channel, and once via a separate copy process (sftp for ssh URLs).
+
+Usage: python pty_staging.py [url] [iterations]
+"""
+
+import os
+import sys
+import time
+
+import saga
+import saga.utils.pty_shell as sups
+
+
+_SIZES = [1024, 20 * 1024, 64 * 1024]
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark (shell, size, iterations) :
+
+    data = os.urandom (size)
+    tgt  = "/tmp/saga-benchmark-staging.%d" % os.getpid ()
+
+    start = time.time ()
+    for i in range (0, iterations) :
+        shell.write_to_remote (data, tgt)
+    write = (time.time () - start) / iterations
+
+    start = time.time ()
+    for i in range (0, iterations) :
+        assert (shell.read_from_remote (tgt) == data)
+    read  = (time.time () - start) / iterations
+
+    shell.run_sync ("rm -f %s" % tgt)
+
+    return write, read
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    url        = "fork://localhost/"
+    iterations = 20
+
+    if  len (sys.argv) > 1 : url        = sys.argv[1]
+    if  len (sys.argv) > 2 : iterations = int (sys.argv[2])
+
+    print "\nBenchmark : pty staging latency (%s, %d iterations)\n" % (url, iterations)
+
+    shell  = sups.PTYShell (saga.Url (url), saga.Session (default=True))
+    option = sups._pty_shell_config['inband_size']
+    inband = option.get_value ()
+
+    for size in _SIZES :
+
+        print "  %6d bytes" % size
+
+        for name, limit in [('in-band', max (inband, size)),
+                            ('copy',    0)] :
+
+            option.set_value (limit)
+            write, read = benchmark (shell, size, iterations)
+
+            print "    %-8s : write %8.3fs  read %8.3fs" % (name, write, read)
+
+        print
+
+    option.set_value (inband)
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
@@ -0,0 +1,95 @@
+
+"""
+Compare the per-call overhead of the signature check modes (see
+saga.utils.signatures): 'checked', 'compiled' and 'disabled'.
+
+As the mode is evaluated on import, each mode is measured in a fresh Python
+interpreter.  The workload consists of typical attribute and Url accesses,
+and of job object creation (against a job service URL, if given).
+
+Usage: python signatures.py [iterations] [job_service_url]
+"""
+
+import os
+import sys
+import subprocess
+
+
+# ------------------------------------------------------------------------------
+#
+_WORKLOAD = """
+import time
+import saga
+
+n   = %(n)d
+url = '%(url)s'
+
+jd  = saga.job.Description ()
+u   = saga.Url ('ssh://user@host.net:22/tmp/data/')
+
+start = time.time ()
+for i in range (0, n) :
+    jd.executable = '/bin/sleep'
+    jd.arguments  = ['1']
+    e = jd.executable
+attr = time.time () - start
+
+start = time.time ()
+for i in range (0, n) :
+    h = u.host
+    u.path = '/tmp/data/%%d' %% i
+    s = str (u)
+urls = time.time () - start
+
+jobs = 0.0
+if  url :
+    js    = saga.job.Service (url)
+    start = time.time ()
+    for i in range (0, n) :
+        js.create_job (jd)
+    jobs  = time.time () - start
+
+print "%%f %%f %%f" %% (attr, urls, jobs)
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def benchmark_mode (mode, iterations, url) :
+
+    env = dict (os.environ)
+    env['SAGA_SIGNATURE_CHECKS'] = mode
+
+    proc = subprocess.Popen ([sys.executable, '-c', 
+                              _WORKLOAD % {'n' : iterations, 'url' : url}],
+                             env=env, stdout=subprocess.PIPE)
+    out  = proc.communicate ()[0]
+
+    if  proc.returncode :
+        raise Exception ("benchmark failed for mode %s (%s)" % (mode, proc.returncode))
+
+    return [float (x) for x in out.split ()[-3:]]
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__' :
+
+    iterations = 10000
+    url        = ''
+
+    if  len (sys.argv) > 1 : iterations = int (sys.argv[1])
+    if  len (sys.argv) > 2 : url        =      sys.argv[2]
+
+    print "\nBenchmark : signature checks (%d iterations)\n" % iterations
+    print "  %-10s  %12s  %12s  %12s" % ('mode', 'attributes', 'urls', 'create_job')
+
+    for mode in ['checked', 'compiled', 'disabled'] :
+        (attr, urls, jobs) = benchmark_mode (mode, iterations, url)
+        print "  %-10s  %11.3fs  %11.3fs  %11.3fs" % (mode, attr, urls, jobs)
+
+    print
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
@@ -4,5 +4,18 @@ __copyright__ = "Copyright 2012-2013, The SAGA Project"
 __license__   = "MIT"
 
 
+import os
+import atexit
+import shutil
+import tempfile
+
+# the unit tests must not write the adaptor manifest to $HOME -- this needs to
+# be set before saga (and thus the engine) gets loaded
+if  not 'SAGA_ADAPTOR_MANIFEST' in os.environ :
+    _manifest_dir = tempfile.mkdtemp ()
+    atexit.register (shutil.rmtree, _manifest_dir, True)
+    os.environ['SAGA_ADAPTOR_MANIFEST'] = '%s/adaptors.manifest' % _manifest_dir
+
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
@@ -146,6 +146,54 @@ class TestFile(unittest.TestCase):
         except saga.SagaException as ex:
             assert False, "Unexpected exception: %s" % ex
 
+    # -------------------------------------------------------------------------
+    #
+    def test_file_copy_sync_same_host(self):
+        """ Testing if a SYNC copy within one host raises BadParameter.
+        """
+        try:
+            tc = sutc.TestConfig()
+            filename1 = deepcopy(saga.Url(tc.filesystem_url))
+            filename1.path += "/%s" % self.uniquefilename1
+            f1 = saga.filesystem.File(filename1, saga.filesystem.CREATE)
+
+            filename2 = deepcopy(saga.Url(tc.filesystem_url))
+            filename2.path += "/%s" % self.uniquefilename2
+
+            f1.copy(filename2, saga.filesystem.SYNC)
+            assert False, "Expected BadParameter exception but got none."
+
+        except saga.BadParameter:
+            assert True
+        except saga.SagaException as ex:
+            assert False, "Expected BadParameter exception, but got %s" % ex
+
+    # -------------------------------------------------------------------------
+    #
+    def test_many_directories_open(self):
+        """ Testing if we can keep more directories open than the shell pool holds.
+        """
+        import saga.utils.pty_shell_pool as supsp
+
+        size    = supsp._pool_config['pool_size']
+        timeout = supsp._pool_config['pool_timeout']
+        old_timeout = timeout.get_value()
+        timeout.set_value(5)
+
+        try:
+            tc = sutc.TestConfig()
+            dirs = []
+            for i in range(0, size.get_value() / 2 + 2):
+                dirs.append(saga.filesystem.Directory(tc.filesystem_url))
+
+            for d in dirs:
+                assert d.is_dir(d.url)
+
+        except saga.SagaException as ex:
+            assert False, "Unexpected exception: %s" % ex
+        finally:
+            timeout.set_value(old_timeout)
+
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
@@ -6,6 +6,7 @@ __license__   = "MIT"
 import time
 import saga
 import saga.utils.test_config as sutc
+import saga.utils.pty_shell   as sups
 
 from copy import deepcopy
 
@@ -129,6 +130,49 @@ def test_job_run():
         _silent_close_js(js)
 
 
+# ------------------------------------------------------------------------------
+#
+def test_job_run_async():
+    """ Test job.run() with asynchronous submission - expecting state: PENDING/RUNNING
+    """
+    js = None
+    j  = None
+    try:
+        tc = sutc.TestConfig()
+
+        # the submit mode is specific to the shell adaptor
+        js_url = saga.Url(tc.js_url)
+        if js_url.scheme not in ['fork', 'local', 'ssh', 'gsissh']:
+            return
+
+        js_url.query = 'submit=async'
+        js = saga.job.Service(js_url, tc.session)
+        jd = saga.job.Description()
+        jd.executable = '/bin/sleep'
+        jd.arguments = ['2']
+
+        # add options from the test .cfg file if set
+        jd = sutc.add_tc_params_to_jd(tc=tc, jd=jd)
+
+        j = js.create_job(jd)
+
+        j.run()
+        assert (j.state in [saga.job.RUNNING, saga.job.PENDING]), "j.state: %s" % j.state
+
+        j.wait()
+        assert j.state == saga.job.DONE, "%s != %s" % (j.state, saga.job.DONE)
+
+    except saga.NotImplemented as ni:
+        assert tc.notimpl_warn_only, "%s " % ni
+        if tc.notimpl_warn_only:
+            print "%s " % ni
+    except saga.SagaException as se:
+        assert False, "Unexpected exception: %s" % se
+    finally:
+        _silent_cancel(j)
+        _silent_close_js(js)
+
+
 # ------------------------------------------------------------------------------
 #
 def test_job_wait():
@@ -163,6 +207,284 @@ def test_job_wait():
         _silent_close_js(js)
 
 
+# ------------------------------------------------------------------------------
+#
+def test_job_wait_notified():
+    """ Test job.wait() and state callbacks driven by state notifications
+    """
+    js      = None
+    j       = None
+    adaptor = None
+    try:
+        tc = sutc.TestConfig()
+
+        # notifications are specific to the shell adaptor
+        if saga.Url(tc.js_url).scheme not in ['fork', 'local', 'ssh', 'gsissh']:
+            return
+
+        adaptor = saga.engine.engine.Engine().get_adaptor('saga.adaptor.shell_job')
+        adaptor.notifications = True
+
+        js = saga.job.Service(tc.js_url, tc.session)
+        jd = saga.job.Description()
+        jd.executable = '/bin/sleep'
+        jd.arguments = ['2']
+
+        # add options from the test .cfg file if set
+        jd = sutc.add_tc_params_to_jd(tc=tc, jd=jd)
+
+        j = js.create_job(jd)
+
+        states = []
+        j.add_callback(saga.job.STATE, lambda obj, key, val: states.append(val) or True)
+
+        j.run()
+        assert j.wait(60)
+        assert j.state == saga.job.DONE, "%s != %s" % (j.state, saga.job.DONE)
+        assert saga.job.DONE in states, states
+
+    except saga.NotImplemented as ni:
+        assert tc.notimpl_warn_only, "%s " % ni
+        if tc.notimpl_warn_only:
+            print "%s " % ni
+    except saga.SagaException as se:
+        assert False, "Unexpected exception: %s" % se
+    finally:
+        if adaptor:
+            adaptor.notifications = False
+        _silent_cancel(j)
+        _silent_close_js(js)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_job_events_rotate():
+    """ Test that the job event log is rotated, and still followed afterwards
+    """
+    js      = None
+    j       = None
+    adaptor = None
+    shell   = None
+    try:
+        tc = sutc.TestConfig()
+
+        # the event log is specific to the shell adaptor
+        if saga.Url(tc.js_url).scheme not in ['fork', 'local', 'ssh', 'gsissh']:
+            return
+
+        # grow the event log beyond its limit -- the job service purges on
+        # startup, which rotates the log
+        events = ".saga/adaptors/shell_job/events"
+        shell  = sups.PTYShell(saga.Url(tc.js_url), tc.session)
+        shell.run_sync("cd")
+        ret, out, _ = shell.run_sync("mkdir -p `dirname %s` && awk 'BEGIN{for(i=0;i<120000;i++) "
+                                     "print \"0:PADDING\"}' >> %s && wc -c < %s" \
+                                     % (events, events, events))
+        assert ret == 0 and int(out) > 1024 * 1024, out
+
+        adaptor = saga.engine.engine.Engine().get_adaptor('saga.adaptor.shell_job')
+        adaptor.notifications  = True
+        adaptor.purge_on_start = True
+
+        js = saga.job.Service(tc.js_url, tc.session)
+
+        ret, out, _ = shell.run_sync("wc -c < %s && test -f %s.1" % (events, events))
+        assert ret == 0 and int(out) < 1024 * 1024, out
+
+        jd = saga.job.Description()
+        jd.executable = '/bin/sleep'
+        jd.arguments = ['2']
+
+        # add options from the test .cfg file if set
+        jd = sutc.add_tc_params_to_jd(tc=tc, jd=jd)
+
+        j = js.create_job(jd)
+
+        states = []
+        j.add_callback(saga.job.STATE, lambda obj, key, val: states.append(val) or True)
+
+        j.run()
+        assert j.wait(60)
+        assert j.state == saga.job.DONE, "%s != %s" % (j.state, saga.job.DONE)
+        assert saga.job.DONE in states, states
+
+    except saga.NotImplemented as ni:
+        assert tc.notimpl_warn_only, "%s " % ni
+        if tc.notimpl_warn_only:
+            print "%s " % ni
+    except saga.SagaException as se:
+        assert False, "Unexpected exception: %s" % se
+    finally:
+        if adaptor:
+            adaptor.notifications  = False
+            adaptor.purge_on_start = adaptor.opts['purge_on_start'].get_value()
+        if shell:
+            shell.finalize(True)
+        _silent_cancel(j)
+        _silent_close_js(js)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_job_state_snapshot():
+    """ Test job states, times and exit codes fetched via the state snapshot
+    """
+    js   = None
+    jobs = []
+    try:
+        tc = sutc.TestConfig()
+        js = saga.job.Service(tc.js_url, tc.session)
+        jd = saga.job.Description()
+        jd.executable = '/bin/sh'
+        jd.arguments = ['-c', '"exit 3"']
+
+        # add options from the test .cfg file if set
+        jd = sutc.add_tc_params_to_jd(tc=tc, jd=jd)
+
+        for i in range(0, 5):
+            j = js.create_job(jd)
+            j.run()
+            jobs.append(j)
+
+        for j in jobs:
+            j.wait()
+
+        for j in jobs:
+            assert j.state == saga.job.FAILED, "%s != %s" % (j.state, saga.job.FAILED)
+            assert j.exit_code == 3, "%s != 3" % j.exit_code
+            assert j.started and j.finished, "%s / %s" % (j.started, j.finished)
+
+    except saga.NotImplemented as ni:
+        assert tc.notimpl_warn_only, "%s " % ni
+        if tc.notimpl_warn_only:
+            print "%s " % ni
+    except saga.SagaException as se:
+        assert False, "Unexpected exception: %s" % se
+    finally:
+        for j in jobs:
+            _silent_cancel(j)
+        _silent_close_js(js)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_job_journal_store():
+    """ Test job states, times, exit codes and job listing with the journal store
+    """
+    js      = None
+    jobs    = []
+    adaptor = None
+    try:
+        tc = sutc.TestConfig()
+
+        # the journal store is specific to the shell adaptor
+        if saga.Url(tc.js_url).scheme not in ['fork', 'local', 'ssh', 'gsissh']:
+            return
+
+        adaptor = saga.engine.engine.Engine().get_adaptor('saga.adaptor.shell_job')
+        adaptor.journal_store = True
+
+        js = saga.job.Service(tc.js_url, tc.session)
+        jd = saga.job.Description()
+        jd.executable = '/bin/sh'
+        jd.arguments = ['-c', '"exit 3"']
+
+        # add options from the test .cfg file if set
+        jd = sutc.add_tc_params_to_jd(tc=tc, jd=jd)
+
+        for i in range(0, 5):
+            j = js.create_job(jd)
+            j.run()
+            jobs.append(j)
+
+        for j in jobs:
+            j.wait()
+
+        ids = js.list()
+        for j in jobs:
+            assert j.state == saga.job.FAILED, "%s != %s" % (j.state, saga.job.FAILED)
+            assert j.exit_code == 3, "%s != 3" % j.exit_code
+            assert j.started and j.finished, "%s / %s" % (j.started, j.finished)
+            assert j.id in ids, "%s not in %s" % (j.id, ids)
+
+    except saga.NotImplemented as ni:
+        assert tc.notimpl_warn_only, "%s " % ni
+        if tc.notimpl_warn_only:
+            print "%s " % ni
+    except saga.SagaException as se:
+        assert False, "Unexpected exception: %s" % se
+    finally:
+        if adaptor:
+            adaptor.journal_store = False
+        for j in jobs:
+            _silent_cancel(j)
+        _silent_close_js(js)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_job_lean_launch():
+    """ Test job run, exit codes, suspend/resume and cancel with lean launches
+    """
+    js      = None
+    j       = None
+    adaptor = None
+    try:
+        tc = sutc.TestConfig()
+
+        # lean launches are specific to the shell adaptor
+        if saga.Url(tc.js_url).scheme not in ['fork', 'local', 'ssh', 'gsissh']:
+            return
+
+        adaptor = saga.engine.engine.Engine().get_adaptor('saga.adaptor.shell_job')
+        adaptor.lean_launch = True
+
+        js = saga.job.Service(tc.js_url, tc.session)
+        jd = saga.job.Description()
+        jd.executable = '/bin/sh'
+        jd.arguments = ['-c', '"exit 3"']
+
+        # add options from the test .cfg file if set
+        jd = sutc.add_tc_params_to_jd(tc=tc, jd=jd)
+
+        j = js.create_job(jd)
+        j.run()
+        j.wait()
+        assert j.state == saga.job.FAILED, "%s != %s" % (j.state, saga.job.FAILED)
+        assert j.exit_code == 3, "%s != 3" % j.exit_code
+
+        jd.executable = '/bin/sleep'
+        jd.arguments = ['10']
+
+        j = js.create_job(jd)
+        j.run()
+        assert j.state == saga.job.RUNNING, "%s != %s" % (j.state, saga.job.RUNNING)
+
+        j.suspend()
+        assert j.state == saga.job.SUSPENDED
+        assert j.state == j.get_state()
+
+        j.resume()
+        assert j.state == saga.job.RUNNING
+        assert j.state == j.get_state()
+
+        j.cancel()
+        assert j.state == saga.job.CANCELED
+        assert j.state == j.get_state()
+
+    except saga.NotImplemented as ni:
+        assert tc.notimpl_warn_only, "%s " % ni
+        if tc.notimpl_warn_only:
+            print "%s " % ni
+    except saga.SagaException as se:
+        assert False, "Unexpected exception: %s" % se
+    finally:
+        if adaptor:
+            adaptor.lean_launch = False
+        _silent_cancel(j)
+        _silent_close_js(js)
+
+
 # ------------------------------------------------------------------------------
 #
 def test_job_multiline_run():
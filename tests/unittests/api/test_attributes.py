@@ -0,0 +1,78 @@
+
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2012-2013, The SAGA Project"
+__license__   = "MIT"
+
+
+import saga
+import saga.attributes as sa
+
+
+# ------------------------------------------------------------------------------
+#
+class _Fruits (sa.Attributes) :
+
+    def __init__ (self) :
+
+        self._attributes_extensible  (False)
+        self._attributes_camelcasing (True)
+
+        self._attributes_register    ('Apple',  'Appel', sa.STRING, sa.SCALAR, sa.WRITEABLE)
+        self._attributes_register    ('Plums',  [],      sa.STRING, sa.VECTOR, sa.WRITEABLE)
+        self._attributes_register    ('Cherry', 'red',   sa.ENUM,   sa.SCALAR, sa.WRITEABLE)
+        self._attributes_set_enums   ('Cherry', ['red', 'black'])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_attribute_schema () :
+    """ Test that attribute schemas are shared, but values are not """
+
+    f1 = _Fruits ()
+    f2 = _Fruits ()
+
+    d1 = f1._attributes_t_init ()
+    d2 = f2._attributes_t_init ()
+
+    # static properties are shared between instances of the same class
+    assert d1['attributes']['apple'].schema is d2['attributes']['apple'].schema
+    assert f1.apple == f2.apple == 'Appel'
+
+    # values, mutable defaults, enums and callbacks are not
+    f1.apple = 'Apfel'
+    f1.plums.append ('Pruim')
+    f1.add_callback ('apple', lambda obj, key, val : True)
+
+    assert f1.apple == 'Apfel'
+    assert f2.apple == 'Appel'
+    assert f1.plums == ['Pruim']
+    assert f2.plums == []
+    assert f1.attribute_exists ('Apple')
+    assert not f2.attribute_exists ('Apple')
+    assert len (d1['attributes']['apple']['callbacks']) == 1
+    assert len (d2['attributes']['apple']['callbacks']) == 0
+
+    # finalizing an attribute does not affect other instances
+    f1._attributes_set_final ('Apple')
+    assert     f1.attribute_is_readonly ('Apple')
+    assert not f2.attribute_is_readonly ('Apple')
+
+    # enum checks are per instance
+    f2._attributes_set_enums ('Cherry', ['yellow'])
+    f2.cherry = 'yellow'
+    try :
+        f1.cherry = 'yellow'
+        assert False, "expected BadParameter"
+    except saga.BadParameter :
+        pass
+
+    # copies share the schema, but not the values
+    f3 = f1._attributes_deep_copy (_Fruits ())
+    f3.plums.append ('Pflaume')
+    assert f3.apple == 'Apfel'
+    assert f1.plums == ['Pruim']
+    assert f3.plums == ['Pruim', 'Pflaume']
+
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
+
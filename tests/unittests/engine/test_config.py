@@ -107,6 +107,31 @@ def test_get_set_value():
     assert(getConfig().get_option('saga.test', 'ttycolor').get_value()
       == True)
 
+def test_update_keeps_values():
+    """ Test that registering new options does not reset existing values
+    """
+    class _OtherConfigurable(Configurable):
+        def __init__(self):
+            Configurable.__init__(self, 'saga.test.other', [{
+                'category'      : 'saga.test.other',
+                'name'          : 'foo',
+                'type'          : str,
+                'default'       : 'bar',
+                'documentation' : 'A late option',
+                'env_variable'  : None
+                }])
+
+    _TestConfigurable()
+    getConfig().get_option('saga.test', 'ttycolor').set_value(False)
+
+    _OtherConfigurable()
+    assert(getConfig().get_option('saga.test.other', 'foo').get_value()
+      == 'bar')
+    assert(getConfig().get_option('saga.test', 'ttycolor').get_value()
+      == False)
+
+    getConfig().get_option('saga.test', 'ttycolor').set_value(True)
+
 def test_env_vars():
     """ Test if environment variables are handled properly
     """
@@ -7,7 +7,12 @@ __license__   = "MIT"
 """ Unit tests for saga.engine.engine.py
 """
 
-import os, sys
+import gc, os, sys
+import time
+import shutil
+import tempfile
+import saga
+import saga.engine.registry
 from   saga.engine.engine import Engine
 
 def test_singleton():
@@ -106,6 +111,178 @@ def test_load_broken_adaptor():
     # restore sys.path
     sys.path = old_sys_path
 
+def test_load_adaptor_lazy():
+    """ Test that adaptors are only loaded on first use in lazy mode
+    """
+    # store old sys.path and registry
+    old_sys_path = sys.path
+    old_registry = saga.engine.registry.adaptor_registry
+    old_index    = saga.engine.registry.adaptor_index
+    path = os.path.split(os.path.abspath(__file__))[0]
+    sys.path.append(path)
+
+    lazy     = Engine().get_config()['lazy_adaptor_loading']
+    manifest = Engine().get_config()['adaptor_manifest']
+    ttl      = Engine().get_config()['bind_cache_ttl']
+    old_manifest = manifest.get_value()
+    old_ttl      = ttl.get_value()
+    lazy.set_value(True)
+    manifest.set_value('')
+    ttl.set_value(5.0)
+
+    try:
+        saga.engine.registry.adaptor_registry = ["mockadaptor_enabled"]
+        saga.engine.registry.adaptor_index    = {
+            "mockadaptor_enabled" : {'types'   : ['saga.job.Job'],
+                                     'schemas' : ['mock']}}
+
+        Engine()._adaptor_registry = {}
+        Engine()._load_adaptors()
+
+        # nothing is loaded before the adaptor is needed
+        assert Engine()._adaptor_registry == {}
+        assert Engine().find_adaptors('saga.job.Service', 'mock') == []
+        assert Engine()._adaptor_registry == {}
+
+        # the first lookup for the served type and schema loads the adaptor
+        assert Engine().find_adaptors('saga.job.Job', 'mock') == ['saga.adaptor.mock']
+        assert len(Engine().loaded_adaptors()['saga.job.Job']['mock']) == 1
+
+        # loading the adaptor does not reset the engine configuration
+        assert Engine().get_config()['bind_cache_ttl'].get_value() == 5.0
+
+    finally:
+        lazy.set_value(False)
+        manifest.set_value(old_manifest)
+        ttl.set_value(old_ttl)
+        saga.engine.registry.adaptor_registry = old_registry
+        saga.engine.registry.adaptor_index    = old_index
+        sys.path = old_sys_path
+
+def test_bind_cache():
+    """ Test that failed adaptor bindings are remembered, and can be invalidated
+    """
+    # store old sys.path
+    old_sys_path = sys.path
+    path = os.path.split(os.path.abspath(__file__))[0]
+    sys.path.append(path)
+
+    Engine()._load_adaptors(["mockadaptor_enabled"])
+    key = ('saga.job.Job', 'mock', None, None)
+
+    # the mock job c'tor is broken, so binding fails
+    try:
+        Engine().bind_adaptor(None, 'saga.job.Job', 'mock', None)
+        assert False
+    except saga.NoSuccess:
+        assert True
+
+    (good, bad) = Engine()._get_bind_cache(key)
+    assert good == None
+    assert 'saga.adaptor.mock' in bad
+
+    # the known bad adaptor is skipped, but its error is still reported
+    try:
+        Engine().bind_adaptor(None, 'saga.job.Job', 'mock', None)
+        assert False
+    except saga.NoSuccess:
+        assert True
+
+    Engine().invalidate_bindings(schema='mock')
+    assert Engine()._get_bind_cache(key) == (None, {})
+
+    # restore sys.path
+    sys.path = old_sys_path
+
+def test_bind_cache_session_key():
+    """ Test that sessions get stable, unique binding cache keys
+    """
+    url = saga.Url('mock://localhost/')
+
+    s1 = saga.Session(default=False)
+    k1 = Engine()._get_bind_key('saga.job.Job', 'mock', [url, s1])
+    assert k1 == Engine()._get_bind_key('saga.job.Job', 'mock', [url, s1])
+
+    # all default sessions share their contexts, and thus their key
+    d1 = Engine()._get_bind_key('saga.job.Job', 'mock', [url, saga.Session()])
+    d2 = Engine()._get_bind_key('saga.job.Job', 'mock', [url, saga.Session()])
+    assert d1 == d2
+
+    # a new session never inherits the key of a collected one
+    keys = [k1, d1]
+    del s1
+    for i in range(0, 10):
+        gc.collect()
+        s2 = saga.Session(default=False)
+        keys.append(Engine()._get_bind_key('saga.job.Job', 'mock', [url, s2]))
+        del s2
+    assert len(set(keys)) == len(keys), keys
+
+def test_bind_cache_sweep():
+    """ Test that expired binding cache entries are dropped for new keys
+    """
+    ttl = Engine().get_config()['bind_cache_ttl']
+    old_ttl = ttl.get_value()
+    ttl.set_value(0.5)
+
+    try:
+        old = ('saga.job.Job', 'mock', 'old.host', None)
+        new = ('saga.job.Job', 'mock', 'new.host', None)
+
+        Engine()._set_bind_cache(old, 'saga.adaptor.mock', None)
+        assert old in Engine()._bind_cache
+
+        time.sleep(1.0)
+        Engine()._set_bind_cache(new, 'saga.adaptor.mock', None)
+        assert old not in Engine()._bind_cache
+        assert new in Engine()._bind_cache
+
+    finally:
+        Engine().invalidate_bindings(schema='mock')
+        ttl.set_value(old_ttl)
+
+def test_adaptor_manifest():
+    """ Test that cpi checks are skipped for adaptors listed in the manifest
+    """
+    # store old sys.path and registry
+    old_sys_path = sys.path
+    old_registry = saga.engine.registry.adaptor_registry
+    path = os.path.split(os.path.abspath(__file__))[0]
+    sys.path.append(path)
+
+    tmpdir   = tempfile.mkdtemp()
+    manifest = Engine().get_config()['adaptor_manifest']
+    old_manifest = manifest.get_value()
+    manifest.set_value('%s/adaptors.manifest' % tmpdir)
+
+    checks = []
+    def _check_cpi(module_name, cpi_type, cpi_class):
+        checks.append(cpi_type)
+        return True
+    Engine()._check_cpi = _check_cpi
+
+    try:
+        saga.engine.registry.adaptor_registry = ["mockadaptor_enabled"]
+
+        # the first load checks the cpis, and writes the manifest
+        Engine()._adaptor_registry = {}
+        Engine()._load_adaptors()
+        assert checks == ['saga.job.Job']
+        assert os.path.exists('%s/adaptors.manifest' % tmpdir)
+
+        # the second load uses the manifest
+        Engine()._adaptor_registry = {}
+        Engine()._load_adaptors()
+        assert checks == ['saga.job.Job']
+        assert len(Engine().loaded_adaptors()['saga.job.Job']['mock']) == 1
+
+    finally:
+        del Engine()._check_cpi
+        manifest.set_value(old_manifest)
+        saga.engine.registry.adaptor_registry = old_registry
+        sys.path = old_sys_path
+        shutil.rmtree(tmpdir)
+
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
@@ -18,5 +18,27 @@ def test_ExceptionBase():
     except ExceptionBase, eb:
         assert (str(eb) == 'ExceptionBase: message'), "'%s' != '%s'" % (str(eb), 'message')
 
+def test_lazy_traceback():
+    """ Test if tracebacks are rendered lazily, and correctly
+    """
+    def _get_traceback():
+        return get_traceback(0)
+
+    def _get_stack():
+        return format_stack(get_stack(0))
+
+    tb, st = _get_traceback(), _get_stack()
+    assert (tb == st), "%s != %s" % (tb, st)
+
+    # the exception c'tor skips the frame which constructs the exception
+    def _get_exception():
+        return ExceptionBase('message')
+
+    eb = _get_exception()
+    assert (eb._traceback == None)
+    assert ('test_lazy_traceback' in eb.traceback), eb.traceback
+    assert ('in _get_exception' not in eb.traceback), eb.traceback
+    assert (eb._traceback != None)
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
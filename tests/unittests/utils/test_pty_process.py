@@ -4,6 +4,7 @@ __copyright__ = "Copyright 2013, The SAGA Project"
 __license__   = "MIT"
 
 
+import re
 import os
 import time
 import signal
@@ -131,3 +132,181 @@ def test_ptyprocess_restart () :
     pty.finalize ()
     assert (not pty.alive ())
 
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyprocess_transcript () :
+    """ Test pty_process I/O transcript on autopsy"""
+    txt = "______1______2_____3_____\n"
+    pty = supp.PTYProcess ("cat")
+    pty.write (txt)
+    out = pty.read (size=len(txt), timeout=1.0)
+    pty.finalize ()
+
+    autopsy = pty.autopsy ()
+    assert ('transcript' in autopsy), autopsy
+    assert ('write [   26] ______1______2_____3_____\\n' in autopsy), autopsy
+    assert ('read  ['                                   in autopsy), autopsy
+
+    # the transcript is bounded
+    iolog = supp.PTYLog (pty.logger, size=2)
+    for i in range (0, 5) :
+        iolog.io ('read', 0, str(i))
+    assert ([e[2] for e in iolog.transcript] == ['3', '4']), iolog.dump ()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyprocess_buffer () :
+    """ Test pty_process I/O buffer"""
+    buf = supp.PTYBuffer ()
+    buf.append ("abc\r\ndef\r\n")
+    assert (len (buf)     == 8)
+    assert (buf[:]        == "abc\ndef\n")
+    assert (buf[-4:]      == "def\n")
+    assert (buf.consume (2) == "ab")
+    assert (buf[0]        == "c")
+
+    # searches apply to the unconsumed data, also for anchors
+    end = buf.search (re.compile ("^def$", re.MULTILINE))
+    assert (end == 5), end
+    assert (buf.consume (end) == "c\ndef")
+
+    # consumed space gets reclaimed
+    for i in range (0, 1000) :
+        buf.append ("x" * 100)
+        buf.consume (90)
+    assert (len (buf._buf) < 2 * len (buf) + 2 * 1024)
+    assert (buf.consume () == "x" * (10 * 1000 + 1))
+    assert (len (buf) == 0 and buf[:] == "")
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyprocess_matcher () :
+    """ Test pty_process incremental pattern matching"""
+    patterns = ['PROMPT-(\d+)->$', 'ab(?=cd)', '[\$#>]\s*$', '^x{2,3}$']
+    data     = "foo\nbar $ \nxx\nPROMPT-0-> \nPROMPT-1->\nab\ncd abcd"
+    for pattern in patterns :
+        regex   = re.compile (pattern, re.MULTILINE | re.DOTALL)
+        matcher = supp.PTYMatcher (pattern)
+        buf     = supp.PTYBuffer ()
+        for i in range (0, len (data)) :
+            buf.append (data[i])
+            end   = matcher.search (buf)
+            match = regex.search (data[:i+1])
+            if  match :
+                assert (end == match.end ()), (pattern, i, end, match.end ())
+                break
+            assert (end is None), (pattern, i, end)
+
+    assert (supp.PTYMatcher ('PROMPT-(\d+)->$').width   is None)
+    assert (supp.PTYMatcher ('PROMPT-(\d+)->$').newline is False)
+    assert (supp.PTYMatcher ('ab(?=cd)').width          == 4)
+    assert (supp.PTYMatcher ('[\$#>]\s*$').newline      is True)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyprocess_reactor () :
+    """ Test pty_process I/O of concurrent processes"""
+    import threading
+    ptys = [supp.PTYProcess ("cat") for i in range (0, 10)]
+    errs = []
+
+    def echo (pty, n) :
+        try :
+            for i in range (0, 20) :
+                pty.write ("%d:%d\n" % (n, i))
+                m, match = pty.find (["%d:%d\n" % (n, i)], timeout=5.0)
+                assert (m == 0), match
+        except Exception as e :
+            errs.append (e)
+
+    threads = [threading.Thread (target=echo, args=(ptys[n], n)) for n in range (0, 10)]
+    for t in threads : t.start ()
+    for t in threads : t.join  ()
+
+    fds = [p.parent_out for p in ptys]
+    for p in ptys    : p.finalize ()
+
+    assert (not errs), errs
+
+    # finalized channels are not watched anymore
+    if  ptys[0].reactor :
+        for fd in fds :
+            assert (fd not in ptys[0].reactor._channels)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyprocess_expect () :
+    """ Test pty_process non-blocking find"""
+    import threading
+    pty = supp.PTYProcess ("cat")
+
+    if  not pty.reactor :
+        return
+
+    done = threading.Event ()
+    res  = []
+
+    def found (n, match) :
+        res.append ((n, match))
+        done.set ()
+
+    pty.expect (["b+\n"], found)
+    pty.write ("aaa\nbbb\nccc\n")
+    done.wait (5.0)
+    assert (res == [(0, "aaa\nbbb\n")]), res
+
+    # the remainder stays cached
+    assert (pty.find (["ccc\n"], timeout=1.0) == (0, "ccc\n"))
+
+    # a closed channel fails the pending search
+    done.clear ()
+    pty.expect (["never"], found)
+    pty.finalize ()
+    done.wait (5.0)
+    assert (res[-1] == (None, None)), res
+
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyprocess_backpressure () :
+    """ Test that the reactor stops draining unconsumed pty output"""
+    pty = supp.PTYProcess ("yes 0123456789")
+
+    if  not pty.reactor :
+        pty.finalize ()
+        return
+
+    try :
+        pty.cache_max = 1 << 16
+
+        # the child outputs forever, but the cache stops growing
+        time.sleep (1.0)
+        assert (pty.paused)
+        size = len (pty.cache)
+        time.sleep (0.5)
+        assert (len (pty.cache) == size), (size, len (pty.cache))
+        assert (size <= pty.cache_max + pty.chunksize_max), size
+
+        # consuming the cache re-arms the channel, and data arrive again
+        data = pty.read (size=size - 1000)
+        assert (len (data) == size - 1000)
+        assert (data.startswith ("0123456789\n"))
+        time.sleep (0.5)
+        assert (len (pty.cache) > 1000)
+
+        # a blocking find still gets data from a paused channel
+        pty.cache_max = 1 << 12
+        size = len (pty.cache)
+        m, match = pty.find (["NEVER"], timeout=1.0)
+        assert (m is None)
+        assert (len (pty.cache) > size), (size, len (pty.cache))
+
+    finally :
+        pty.finalize ()
@@ -7,9 +7,12 @@ __license__   = "MIT"
 import os
 import time
 import signal
+import threading
 import saga
-import saga.utils.pty_shell   as sups
-import saga.utils.test_config as sutc
+import saga.utils.pty_shell         as sups
+import saga.utils.pty_shell_pool    as supsp
+import saga.utils.pty_shell_factory as supsf
+import saga.utils.test_config       as sutc
 
 
 # ------------------------------------------------------------------------------
@@ -115,4 +118,436 @@ def test_ptyshell_file_stage () :
     assert (ret == 0)    , "%s"       % (repr(ret))
     assert (out == "")   , "%s == ''" % (repr(out))
 
+    # binary data, in-band and (above inband_size) via copy process
+    size = sups._pty_shell_config['inband_size'].get_value ()
+    for data in [os.urandom (1000), os.urandom (size + 1)] :
+        shell.write_to_remote   (data, "/tmp/saga-test-staging")
+        out = shell.read_from_remote ("/tmp/saga-test-staging")
+        assert (data == out) , "%s == %s" % (len(out), len(data))
 
+    ret, out, _ = shell.run_sync ("rm /tmp/saga-test-staging")
+    assert (ret == 0)    , "%s"       % (repr(ret))
+
+    # shell meta characters in remote paths are not expanded
+    path = '/tmp/saga-test-staging.$HOME.`id`."'
+    shell.write_to_remote   (txt, path)
+    out = shell.read_from_remote (path)
+    assert (txt == out)  , "%s == %s" % (repr(out), repr(txt))
+    assert (os.path.exists (path)), "%s does not exist" % path
+    os.remove (path)
+
+    assert (sups._cksum ("saga\n") == "3326238217 5")
+
+
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_file_stage_many () :
+    """ Test pty_shell staging of many files in one session """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    base  = "/tmp/saga-test-staging-many.%d" % os.getpid ()
+    os.mkdir (base)
+    ret, out, _ = shell.run_sync ("mkdir -p %s.remote" % base)
+    assert (ret == 0)    , "%s"       % (repr(ret))
+
+    for i in range (0, 5) :
+        with open ("%s/%d" % (base, i), 'w') as f :
+            f.write (str(i))
+
+    # the last file does not exist
+    pairs   = [("%s/%d" % (base, i), "%s.remote/%d" % (base, i)) for i in range (0, 6)]
+    results = shell.stage_to_remote_many (pairs)
+    assert ([r[0] == 0 for r in results] == [True] * 5 + [False]), results
+
+    pairs   = [("%s.remote/%d" % (base, i), "%s/%d.back" % (base, i)) for i in range (0, 5)]
+    results = shell.stage_from_remote_many (pairs)
+    assert ([r[0] for r in results] == [0] * 5), results
+
+    for i in range (0, 5) :
+        with open ("%s/%d.back" % (base, i)) as f :
+            assert (f.read () == str(i))
+
+    os.system ("rm -rf %s" % base)
+    ret, out, _ = shell.run_sync ("rm -rf %s.remote" % base)
+    assert (ret == 0)    , "%s"       % (repr(ret))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_file_stage_parallel () :
+    """ Test pty_shell chunked staging of large files """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    # parallel staging is only used for ssh shells -- test the transfer itself
+    base   = "/tmp/saga-test-staging-parallel.%d" % os.getpid ()
+    data   = os.urandom (9 * 1024 * 1024 + 17)
+    option = sups._pty_shell_config['parallel_size']
+    size   = option.get_value ()
+
+    with open (base, 'wb') as f :
+        f.write (data)
+
+    try :
+        option.set_value (1)
+        assert (shell._stage_parallel ('to',   base, "%s.remote" % base))
+        assert (shell._stage_parallel ('from', "%s.remote" % base, "%s.back" % base))
+
+        with open ("%s.back" % base, 'rb') as f :
+            assert (f.read () == data)
+
+        # like 'cp', existing target directories get the file staged into
+        os.mkdir ("%s.dir" % base)
+        name = os.path.basename (base)
+        assert (shell._stage_parallel ('to',   base, "%s.dir" % base))
+        assert (shell._stage_parallel ('from', "%s.remote" % base, "%s.dir" % base))
+
+        for path in ["%s.dir/%s" % (base, name), "%s.dir/%s.remote" % (base, name)] :
+            with open (path, 'rb') as f :
+                assert (f.read () == data), path
+
+        # files below the threshold are left to the copy process
+        option.set_value (len (data) + 1)
+        assert (not shell._stage_parallel ('from', "%s.remote" % base, "%s.back" % base))
+
+    finally :
+        option.set_value (size)
+        os.system ("rm -rf %s %s.back %s.dir" % (base, base, base))
+        shell.run_sync ("rm -f %s.remote" % base)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_file_stage_tar () :
+    """ Test pty_shell staging of directory trees as tar stream """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    # tar streams are only used for ssh shells -- test the transfer itself
+    base  = "/tmp/saga-test-staging-tar.%d" % os.getpid ()
+    os.makedirs ("%s/tree/sub" % base)
+    for i in range (0, 20) :
+        with open ("%s/tree/sub/%d" % (base, i), 'w') as f :
+            f.write (str(i))
+
+    assert (shell._count_local  ("%s/tree" % base) == 21)
+    assert (shell._count_remote ("%s/tree" % base) == 21)
+    assert (shell._count_remote ("%s/none" % base) ==  0)
+
+    try :
+        # a new target is the copy, an existing one receives the copy
+        for compress in [False, True] :
+            shell.factory.run_tar_to   (shell.pty_info, "%s/tree" % base,
+                                        "%s/remote" % base, compress)
+            shell.factory.run_tar_from (shell.pty_info, "%s/remote" % base,
+                                        "%s/tree" % base, compress)
+
+            for i in range (0, 20) :
+                with open ("%s/tree/remote/sub/%d" % (base, i)) as f :
+                    assert (f.read () == str(i))
+
+            os.system ("rm -rf %s/remote %s/tree/remote" % (base, base))
+
+        try :
+            shell.factory.run_tar_from (shell.pty_info, "%s/none" % base,
+                                        "%s/back" % base)
+            assert (False), "expected NoSuccess"
+        except saga.NoSuccess :
+            pass
+
+    finally :
+        os.system ("rm -rf %s" % base)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_file_sync () :
+    """ Test pty_shell incremental sync of directory trees """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    base  = "/tmp/saga-test-sync.%d" % os.getpid ()
+    os.makedirs ("%s/tree/sub" % base)
+    for i in range (0, 5) :
+        with open ("%s/tree/sub/%d" % (base, i), 'w') as f :
+            f.write (str(i) * 100)
+
+    try :
+        stats = shell.sync_to_remote ("%s/tree" % base, "%s/remote" % base, "-r")
+        assert (stats == {'files' : 5, 'bytes' : 500, 'transferred' : 5, 'saved' : 0}), stats
+
+        # the target is updated, not nested
+        with open ("%s/tree/sub/0" % base, 'w') as f :
+            f.write ("changed")
+        stats = shell.sync_to_remote ("%s/tree" % base, "%s/remote" % base, "-r")
+        assert (stats == {'files' : 5, 'bytes' : 407, 'transferred' : 1, 'saved' : 400}), stats
+        assert (not os.path.exists ("%s/remote/tree" % base))
+
+        with open ("%s/remote/sub/0" % base) as f :
+            assert (f.read () == "changed")
+
+        # single files are synced into target directories
+        stats = shell.sync_from_remote ("%s/remote/sub/1" % base, "%s/tree" % base)
+        assert (stats['transferred'] == 1), stats
+        stats = shell.sync_from_remote ("%s/remote/sub/1" % base, "%s/tree" % base)
+        assert (stats['transferred'] == 0 and stats['saved'] == 100), stats
+
+        # directories need -r
+        try :
+            shell.sync_from_remote ("%s/remote" % base, "%s/back" % base)
+            assert (False), "expected BadParameter"
+        except saga.BadParameter :
+            pass
+
+    finally :
+        os.system ("rm -rf %s" % base)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_future () :
+    """ Test pty_shell which runs non-blocking commands """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    if  not shell.pty_shell.reactor :
+        return
+
+    futures = [shell.run_future ("printf \"%d\"; false" % i) for i in range (0, 10)]
+
+    for i in range (0, 10) :
+        ret, out, _ = futures[i].result (10.0)
+        assert (ret == 1)      , "%s"       % (repr(ret))
+        assert (out == str(i)) , "%s == %s" % (repr(out), repr(str(i)))
+
+    future = shell.run_future ("(printf \"x\" 1>&2)", iomode=sups.SEPARATE)
+    ret, out, err = future.result (10.0)
+    assert (ret == 0)    , "%s"        % (repr(ret))
+    assert (out == "")   , "%s == ''"  % (repr(out))
+    assert (err == "x")  , "%s == 'x'" % (repr(err))
+
+    # blocking calls wait for pending commands
+    future = shell.run_future ("sleep 1")
+    ret, out, _ = shell.run_sync ("true")
+    assert (future.done ())
+
+    assert (shell.alive ())
+    shell.run_async ("exit")
+    time.sleep (1)
+    assert (not shell.alive ())
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_lock_order () :
+    """ Test that pty_shell never waits for its queue while holding the pty """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    # the reactor takes the command queue lock first, and the pty lock second
+    # (see PTYShell._pump) -- any other order can deadlock.  Record all queue
+    # lock acquisitions by threads which hold the pty lock.
+    violations = list ()
+
+    class _Checked (object) :
+
+        def __init__ (self, cond) :
+            self._cond = cond
+
+        def __enter__ (self) :
+            if  shell.pty_shell.rlock._is_owned () :
+                violations.append (threading.current_thread ().name)
+            return self._cond.__enter__ ()
+
+        def __exit__ (self, *args) :
+            return self._cond.__exit__ (*args)
+
+        def __getattr__ (self, name) :
+            return getattr (self._cond, name)
+
+    shell._qcond = _Checked (shell._qcond)
+
+    shell.run_sync  ("true")
+    shell.run_async ("true")
+    shell.find_prompt ()
+    shell.set_prompt (shell.prompt)
+    shell.reset ()
+    shell.write_to_remote ("saga", "/tmp/saga-test-lock-order.%d" % os.getpid ())
+    shell.run_sync  ("rm -f /tmp/saga-test-lock-order.%d" % os.getpid ())
+
+    assert (not violations), "queue locked under pty lock (%s)" % violations
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_pipelined () :
+    """ Test pty_shell which runs pipelined commands """
+    conf  = sutc.TestConfig()
+    shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+
+    futures = shell.run_pipelined (["printf \"%d\"; test %d -lt 5" % (i, i) \
+                                    for i in range (0, 10)])
+
+    for i in range (0, 10) :
+        ret, out, _ = futures[i].result (10.0)
+        assert (ret == int (i >= 5)) , "%s"       % (repr(ret))
+        assert (out == str(i))       , "%s == %s" % (repr(out), repr(str(i)))
+
+    assert (shell.alive ())
+    shell.run_async ("exit")
+    time.sleep (1)
+    assert (not shell.alive ())
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_pool () :
+    """ Test pty_shell reuse via the shell pool """
+    conf  = sutc.TestConfig()
+    pool  = supsp.PTYShellPool ()
+    shell = pool.checkout (saga.Url(conf.js_url), conf.session)
+
+    _,   home, _ = shell.run_sync ("cd && pwd")
+    ret, out,  _ = shell.run_sync ("cd /tmp")
+    assert (ret == 0)       , "%s"       % (repr(ret))
+    pool.checkin (shell)
+
+    # the same shell is handed out again, but was reset
+    other = pool.checkout (saga.Url(conf.js_url), conf.session)
+    assert (other is shell)
+    ret, out, _ = other.run_sync ("pwd")
+    assert (out == home)    , "%s == %s" % (repr(out), repr(home))
+
+    # dead shells are replaced
+    other.run_async ("exit")
+    time.sleep (1)
+    pool.checkin (other)
+
+    other = pool.checkout (saga.Url(conf.js_url), conf.session)
+    assert (other is not shell)
+    assert (other.alive ())
+    pool.checkin (other)
+
+    # shells are not shared between sessions with different credentials
+    ctx = saga.Context ('UserPass')
+    ctx.user_pass = 'secret'
+    session = saga.Session (default=False)
+    session.add_context (ctx)
+
+    third = pool.checkout (saga.Url(conf.js_url), session)
+    assert (third is not other)
+    pool.checkin (third)
+
+    shell = pool.checkout (saga.Url(conf.js_url), conf.session)
+    assert (shell is other)
+    pool.checkin (shell)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_pool_unlimited () :
+    """ Test that long lived pool checkouts do not count against the pool size """
+    conf    = sutc.TestConfig()
+    pool    = supsp.PTYShellPool ()
+    size    = supsp._pool_config['pool_size']
+    timeout = supsp._pool_config['pool_timeout']
+    old_size    = size.get_value ()
+    old_timeout = timeout.get_value ()
+
+    shells = []
+    try :
+        size.set_value (1)
+        timeout.set_value (1)
+
+        # held shells are created beyond the pool size, w/o waiting ...
+        for i in range (0, 2) :
+            shells.append (pool.checkout (saga.Url(conf.js_url), conf.session,
+                                          limited=False))
+        assert (shells[0] is not shells[1])
+
+        # ... and leave room for a limited checkout
+        shells.append (pool.checkout (saga.Url(conf.js_url), conf.session))
+        assert (shells[2].alive ())
+
+    finally :
+        size.set_value (old_size)
+        timeout.set_value (old_timeout)
+        for shell in shells :
+            pool.checkin (shell)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_prefork () :
+    """ Test pty_shell creation from prefork standby shells """
+    conf   = sutc.TestConfig()
+    option = supsf._factory_config['prefork_size']
+    size   = option.get_value ()
+
+    try :
+        option.set_value (2)
+
+        shell = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+        time.sleep (5)   # give the standby refill some time
+
+        before = sum ([s['hits'] for s in supsf.PTYShellFactory ().standby_stats ().values ()])
+        other  = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+        after  = sum ([s['hits'] for s in supsf.PTYShellFactory ().standby_stats ().values ()])
+        assert (after == before + 1), "%s == %s + 1" % (after, before)
+
+        ret, out, _ = other.run_sync ("printf 'standby'")
+        assert (ret == 0)         , "%s"       % (repr(ret))
+        assert (out == 'standby') , "%s"       % (repr(out))
+
+    finally :
+        option.set_value (size)
+
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_prefork_reap () :
+    """ Test that expired standby shells get replaced w/o shell requests """
+    conf     = sutc.TestConfig()
+    size     = supsf._factory_config['prefork_size']
+    ttl      = supsf._factory_config['prefork_ttl']
+    old_size = size.get_value ()
+    old_ttl  = ttl.get_value ()
+
+    def _standby () :
+        factory = supsf.PTYShellFactory ()
+        with factory.rlock :
+            return [pty for host in factory.registry.values ()
+                        for user in host.values ()
+                        for info in user.values ()
+                        for pty, _ in info['standby']]
+
+    def _wait_for (check, timeout) :
+        start = time.time ()
+        while time.time () - start < timeout :
+            if  check () :
+                return True
+            time.sleep (0.5)
+        return False
+
+    try :
+        size.set_value (1)
+        ttl.set_value  (10)
+
+        shell  = sups.PTYShell (saga.Url(conf.js_url), conf.session)
+        assert (_wait_for (_standby, 30)), "no standby shells"
+        before = _standby ()
+
+        # let the standby shells expire, and get replaced
+        def _replaced () :
+            after = _standby ()
+            return after and not [pty for pty in before if pty in after]
+
+        assert (_wait_for (_replaced, 60)), "expired standby shells were kept"
+
+    finally :
+        size.set_value (old_size)
+        ttl.set_value  (old_ttl)
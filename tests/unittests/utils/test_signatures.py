@@ -21,5 +21,75 @@ def test_signatures () :
     except Exception as e : 
         assert False, "should have seen a BadParameter exception, not %s" % e
 
+def test_signature_modes () :
+    """ Test that checked and compiled signatures flag the same violations """
+
+    import saga.utils.signatures as sus
+
+    old_mode     = sus.mode
+    old_no_check = sus.no_check
+
+    try :
+        sus.no_check = False
+
+        for mode in ['checked', 'compiled'] :
+
+            sus.mode = mode
+
+            @sus.takes   (int, 
+                          sus.optional ((basestring, float)), 
+                          sus.optional (sus.one_of (1, 2)))
+            @sus.returns (int)
+            def f (i, s=None, o=1) :
+                return i
+
+            assert f (1)            == 1
+            assert f (1, 'a')       == 1
+            assert f (1, 1.0, 2)    == 1
+            assert f (1, None, o=2) == 1
+
+            for args in [('a',), (1, 1), (1, 'a', 3)] :
+                try :
+                    f (*args)
+                    assert False, "%s: should have seen a BadParameter exception" % mode
+                except saga.BadParameter as e :
+                    assert True
+
+    finally :
+        sus.mode     = old_mode
+        sus.no_check = old_no_check
+
+def test_signature_caller () :
+    """ Test that signature violations report the caller, in all modes """
+
+    import saga.utils.signatures as sus
+
+    old_mode     = sus.mode
+    old_no_check = sus.no_check
+
+    try :
+        sus.no_check = False
+
+        for mode in ['checked', 'compiled'] :
+
+            sus.mode = mode
+
+            @sus.takes   (int)
+            @sus.returns (int)
+            def f (i) :
+                return i
+
+            try :
+                f ('a')
+                assert False, "%s: should have seen a BadParameter exception" % mode
+            except saga.BadParameter as e :
+                assert 'test_signature_caller' in str (e), "%s: %s" % (mode, e)
+                assert 'test_signatures.py'    in str (e), "%s: %s" % (mode, e)
+
+    finally :
+        sus.mode     = old_mode
+        sus.no_check = old_no_check
+
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 